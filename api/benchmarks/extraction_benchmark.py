@@ -0,0 +1,134 @@
+"""
+Benchmark: text extraction per file format, and event-loop stall while parsing.
+
+Generates a synthetic document per format (txt, md, html, docx, pdf) and
+reports, for each:
+  - parse time in this process (with html.parser vs lxml for HTML),
+  - wall time and worst event-loop stall for N concurrent uploads parsed
+    inline on the loop (the old behaviour) vs in the extraction worker pool.
+
+A heartbeat task ticks every 5 ms during the concurrent runs; its worst delay
+is the longest time the loop could not serve any other request.
+
+Run from the api/ directory:
+    python -m benchmarks.extraction_benchmark --paragraphs 2000 --files 4
+"""
+import argparse
+import asyncio
+import io
+import time
+
+from service.features import file_processing_service as extraction_module
+from service.features.file_processing_service import SpooledUpload, file_processing_service
+
+HEARTBEAT_INTERVAL = 0.005
+SENTENCE = "The quarterly handbook describes onboarding, travel policy and security practices for every team. "
+
+
+async def _heartbeat(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        expected = time.perf_counter() + HEARTBEAT_INTERVAL
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+def _paragraphs(count: int):
+    for index in range(count):
+        yield f"Section {index}. " + SENTENCE * 4 + f"See https://example.com/docs/{index} for details."
+
+
+def build_samples(paragraphs: int) -> dict:
+    """filename -> file bytes, one synthetic document per supported format."""
+    text = "\n\n".join(_paragraphs(paragraphs))
+    rows = "".join(f"<tr><td>Item {i}</td><td>{i * 3}</td><td>Owner {i % 7}</td></tr>" for i in range(paragraphs // 10))
+    html = (
+        "<html><body>"
+        + "".join(f"<h2>Section {i}</h2><p>{SENTENCE * 4}<a href='https://example.com/{i}'>link {i}</a></p>" for i in range(paragraphs))
+        + f"<table><tr><th>Item</th><th>Count</th><th>Owner</th></tr>{rows}</table></body></html>"
+    )
+    markdown_text = "\n\n".join(f"## Section {i}\n\n{SENTENCE * 4} [link {i}](https://example.com/{i})" for i in range(paragraphs))
+    samples = {"sample.txt": text.encode(), "sample.md": markdown_text.encode(), "sample.html": html.encode()}
+
+    from docx import Document
+    document = Document()
+    for index, paragraph in enumerate(_paragraphs(paragraphs)):
+        document.add_paragraph(paragraph)
+        if index % 100 == 99:
+            table = document.add_table(rows=20, cols=4)
+            for row_index, row in enumerate(table.rows):
+                for col_index, cell in enumerate(row.cells):
+                    cell.text = f"r{row_index}c{col_index}"
+    buffer = io.BytesIO()
+    document.save(buffer)
+    samples["sample.docx"] = buffer.getvalue()
+
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    line_y = 800
+    for paragraph in _paragraphs(paragraphs):
+        for start in range(0, len(paragraph), 90):
+            pdf.drawString(40, line_y, paragraph[start:start + 90])
+            line_y -= 14
+            if line_y < 40:
+                pdf.showPage()
+                line_y = 800
+    pdf.save()
+    samples["sample.pdf"] = buffer.getvalue()
+    return samples
+
+
+def _time_in_process(filename: str, contents: bytes) -> float:
+    started = time.perf_counter()
+    file_processing_service.extract_text(filename, contents)
+    return time.perf_counter() - started
+
+
+async def _run_concurrent(mode: str, filename: str, contents: bytes, files: int) -> dict:
+    async def extract():
+        if mode == "inline":
+            await asyncio.sleep(0)  # yield like an awaiting handler would
+            file_processing_service.extract_text(filename, contents)
+        else:
+            await file_processing_service.extract_text_from_upload(SpooledUpload.from_bytes(filename, contents))
+
+    stop = asyncio.Event()
+    lags: list = []
+    heartbeat = asyncio.create_task(_heartbeat(stop, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(extract() for _ in range(files)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await heartbeat
+    return {"wall_s": elapsed, "max_loop_stall_ms": max(lags, default=0.0) * 1000}
+
+
+async def main(paragraphs: int, files: int):
+    samples = build_samples(paragraphs)
+    # Start the worker processes before timing anything
+    await file_processing_service.extract_text_from_upload(SpooledUpload.from_bytes("warmup.txt", b"warm up"))
+
+    for filename, contents in samples.items():
+        parse_ms = _time_in_process(filename, contents) * 1000
+        line = f"{filename:>12} ({len(contents) / 1024:7.0f} KB): parse {parse_ms:8.1f} ms"
+        if filename.endswith(".html") and extraction_module.HTML_PARSER == "lxml":
+            extraction_module.HTML_PARSER = "html.parser"
+            line += f" (html.parser {_time_in_process(filename, contents) * 1000:.1f} ms)"
+            extraction_module.HTML_PARSER = "lxml"
+        print(line)
+        for mode in ("inline", "pool"):
+            result = await _run_concurrent(mode, filename, contents, files)
+            print(
+                f"{'':>14}{mode:>6}: {files} files in {result['wall_s']:.2f}s | "
+                f"max loop stall {result['max_loop_stall_ms']:.1f} ms"
+            )
+    file_processing_service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=2000, help="Paragraphs per generated document")
+    parser.add_argument("--files", type=int, default=4, help="Concurrent uploads per format")
+    args = parser.parse_args()
+    asyncio.run(main(args.paragraphs, args.files))
@@ -0,0 +1,77 @@
+"""
+Benchmark: login latency and event-loop stall under concurrent password checks.
+
+Compares verifying passwords inline on the event loop (the old behaviour) with
+the bounded password-hashing pool used by `authenticate_user`. A heartbeat task
+ticks every 5 ms while the logins run; its worst delay is the longest time the
+loop was unable to serve any other request.
+
+Run from the api/ directory:
+    python -m benchmarks.password_hashing_benchmark --logins 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from service.infrastructure.auth_service import (
+    _verify_password_with_salt,
+    get_password_hash,
+    verify_password_async,
+)
+
+HEARTBEAT_INTERVAL = 0.005
+
+
+async def _heartbeat(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        expected = time.perf_counter() + HEARTBEAT_INTERVAL
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def _run(mode: str, logins: int, hashed: str) -> dict:
+    async def login() -> float:
+        started = time.perf_counter()
+        if mode == "inline":
+            await asyncio.sleep(0)  # yield like an awaiting handler would
+            _verify_password_with_salt("correct horse battery staple", hashed)
+        else:
+            await verify_password_async("correct horse battery staple", hashed)
+        return time.perf_counter() - started
+
+    stop = asyncio.Event()
+    lags: list = []
+    heartbeat = asyncio.create_task(_heartbeat(stop, lags))
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await heartbeat
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "wall_s": elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+        "max_loop_stall_ms": max(lags, default=0.0) * 1000,
+    }
+
+
+async def main(logins: int):
+    hashed = get_password_hash("correct horse battery staple")
+    for mode in ("inline", "pool"):
+        result = await _run(mode, logins, hashed)
+        print(
+            f"{result['mode']:>6}: {logins} logins in {result['wall_s']:.2f}s | "
+            f"p50 {result['p50_ms']:.1f} ms | p95 {result['p95_ms']:.1f} ms | "
+            f"max loop stall {result['max_loop_stall_ms']:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=50, help="Concurrent login attempts")
+    args = parser.parse_args()
+    asyncio.run(main(args.logins))
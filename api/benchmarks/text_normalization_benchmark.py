@@ -0,0 +1,134 @@
+"""
+Benchmark: Markdown-to-speech cleanup, Markdown stripping and URL linkifying
+on multi-MB inputs.
+
+Generates two inputs of the requested size:
+  - "answer": dense Markdown (headings, lists, emphasis, inline and fenced
+    code, links, emojis and abbreviations on nearly every line),
+  - "document": mostly plain prose paragraphs with occasional bold text,
+and reports throughput in MB/s on each for:
+  - the previous sequential implementation (one `re.sub` / `str.replace` pass
+    per construct, emoji pattern compiled per call), kept here as a baseline,
+  - the current cleaners in lib.text_normalization.
+
+Run from the api/ directory:
+    python -m benchmarks.text_normalization_benchmark --megabytes 4 --rounds 3
+"""
+import argparse
+import re
+import time
+
+from lib.text_normalization import linkify_urls, markdown_to_speech, strip_markdown
+
+BLOCK = (
+    "### Overview 📘\n\n"
+    "The **travel policy** covers _domestic_ and *international* trips, e.g. client visits, "
+    "conferences etc. Use `expense-tool` for claims, i.e. within 30 days.\n"
+    "- Book through the portal 🚀\n"
+    "- Economy class vs. business class: see www.example.com/travel\n"
+    "1. Submit receipts\n"
+    "2. Wait for approval.Managers review weekly.\n\n"
+    "```python\nsubmit(claim)\n```\n\n"
+    "> Details at https://example.com/handbook/travel and [the FAQ](https://example.com/faq).\n\n"
+)
+PARAGRAPH = (
+    "The travel policy covers domestic and international trips for every team in the company. " * 3
+    + "Claims are reviewed by the **finance team** within two weeks.\n\n"
+)
+
+
+def _legacy_clean_for_tts(text: str) -> str:
+    """The cleanup as it was before lib.text_normalization (sequential passes)."""
+    text = re.sub(r'\*\*(.+?)\*\*', r'\1', text)
+    text = re.sub(r'__(.+?)__', r'\1', text)
+    text = re.sub(r'\*(.+?)\*', r'\1', text)
+    text = re.sub(r'_(.+?)_', r'\1', text)
+    text = re.sub(r'^#{1,6}\s+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'`(.+?)`', r'\1', text)
+    text = re.sub(r'```[a-z]*\n?(.+?)\n?```', r'\1', text, flags=re.DOTALL)
+    text = re.sub(r'^\s*[-•●◦▪]\s*', '', text, flags=re.MULTILINE)
+    text = re.sub(r'^\s*\d+\.\s*', '', text, flags=re.MULTILINE)
+    emoji_pattern = re.compile(
+        "["
+        "\U0001F600-\U0001F64F"
+        "\U0001F300-\U0001F5FF"
+        "\U0001F680-\U0001F6FF"
+        "\U0001F1E0-\U0001F1FF"
+        "\U00002702-\U000027B0"
+        "\U000024C2-\U0001F251"
+        "]+",
+        flags=re.UNICODE
+    )
+    text = emoji_pattern.sub('', text)
+    text = text.replace(' e.g. ', ' for example ')
+    text = text.replace(' i.e. ', ' that is ')
+    text = text.replace(' etc.', ' and so on.')
+    text = text.replace(' vs. ', ' versus ')
+    text = text.replace(' vs ', ' versus ')
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = re.sub(r' {2,}', ' ', text)
+    return text.strip()
+
+
+def _legacy_remove_markdown_formatting(text: str) -> str:
+    text = re.sub(r'\*\*(.+?)\*\*', r'\1', text)
+    text = re.sub(r'__(.+?)__', r'\1', text)
+    text = re.sub(r'\*(.+?)\*', r'\1', text)
+    text = re.sub(r'_(.+?)_', r'\1', text)
+    text = re.sub(r'^#{1,6}\s+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'`(.+?)`', r'\1', text)
+    text = re.sub(r'```[a-z]*\n(.+?)\n```', r'\1', text, flags=re.DOTALL)
+    return text.strip()
+
+
+def _legacy_linkify(text: str) -> str:
+    def replace_link(match):
+        url = match.group(0)
+        href = url if url.startswith('http') else f'https://{url}'
+        return f'[{url}]({href})'
+
+    pattern = re.compile(r'(?<!\]\()(https?://[^\s<>"]+|www\.[^\s<>"]+)')
+    return pattern.sub(replace_link, text)
+
+
+def build_sample(block: str, megabytes: float) -> str:
+    repeats = max(1, int(megabytes * 1024 * 1024 / len(block.encode())))
+    return block * repeats
+
+
+def _throughput(func, text: str, rounds: int) -> float:
+    """Best MB/s over the given rounds."""
+    size_mb = len(text.encode()) / (1024 * 1024)
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - started)
+    return size_mb / best
+
+
+def main(megabytes: float, rounds: int):
+    cases = [
+        ("markdown to speech", _legacy_clean_for_tts, markdown_to_speech),
+        ("strip markdown", _legacy_remove_markdown_formatting, strip_markdown),
+        ("linkify urls", _legacy_linkify, linkify_urls),
+    ]
+    for sample_name, block in (("answer", BLOCK), ("document", PARAGRAPH)):
+        text = build_sample(block, megabytes)
+        print(f"{sample_name}: {len(text.encode()) / (1024 * 1024):.1f} MB, best of {rounds} rounds")
+        for name, legacy, current in cases:
+            before = _throughput(legacy, text, rounds)
+            after = _throughput(current, text, rounds)
+            print(f"{name:>20}: previous {before:7.1f} MB/s | current {after:7.1f} MB/s | {after / before:4.1f}x")
+        print()
+
+    print("Sample output (markdown to speech):")
+    print(markdown_to_speech(BLOCK))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megabytes", type=float, default=4, help="Size of the generated Markdown input")
+    parser.add_argument("--rounds", type=int, default=3, help="Timed runs per implementation (best is reported)")
+    args = parser.parse_args()
+    main(args.megabytes, args.rounds)
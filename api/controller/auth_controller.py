@@ -1,13 +1,15 @@
 from datetime import timedelta
+from typing import Optional
 from fastapi import HTTPException, status
 from schema.user_schema import UserCreate, UserLogin, UserAPIKeysUpdate
 from schema.token_schema import Token
 from service.infrastructure.auth_service import (
     authenticate_user, 
-    create_access_token, 
-    get_password_hash
+    create_user_access_token, 
+    get_password_hash_async
 )
 from service.infrastructure.user_service import user_service
+from service.infrastructure.rate_limit_service import rate_limit_service, RateLimitExceeded
 from lib.config import settings
 import logging
 
@@ -29,7 +31,7 @@ class AuthController:
                 )
             
             # Hash password
-            hashed_password = get_password_hash(user_data.password)
+            hashed_password = await get_password_hash_async(user_data.password)
             
             # Create user
             user = await user_service.create_user(
@@ -56,10 +58,26 @@ class AuthController:
                 detail="Internal server error during registration"
             )
     
-    async def login_for_access_token(self, user_credentials: UserLogin) -> Token:
+    async def login_for_access_token(self, user_credentials: UserLogin, client_ip: Optional[str] = None) -> Token:
         """
-        Handle user login and token generation
+        Handle user login and token generation.
+        Attempts are rate limited per client IP before any password hashing happens.
         """
+        if client_ip:
+            try:
+                await rate_limit_service.consume(
+                    f"login_ip:{client_ip}",
+                    settings.login_attempts_per_minute,
+                    settings.login_attempts_burst
+                )
+            except RateLimitExceeded as e:
+                logger.warning(f"Too many login attempts from {client_ip}")
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many login attempts. Please try again later.",
+                    headers={"Retry-After": str(e.retry_after)},
+                )
+
         try:
             # Authenticate user (awaiting async function)
             user = await authenticate_user(user_credentials.username, user_credentials.password)
@@ -73,10 +91,7 @@ class AuthController:
             
             # Create access token
             access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-            access_token = create_access_token(
-                data={"sub": user["user_id"]},
-                expires_delta=access_token_expires
-            )
+            access_token = create_user_access_token(user, expires_delta=access_token_expires)
             
             logger.info(f"User {user_credentials.username} logged in successfully")
             
@@ -104,7 +119,15 @@ class AuthController:
                     detail="User not found"
                 )
             
-            return {"message": "API keys updated successfully"}
+            # Re-issue the token with the new key version so every worker reloads the keys
+            user = await user_service.get_principal(user_id)
+            response = {"message": "API keys updated successfully"}
+            if user:
+                response["access_token"] = create_user_access_token(
+                    user, expires_delta=timedelta(minutes=settings.access_token_expire_minutes)
+                )
+                response["token_type"] = "bearer"
+            return response
             
         except HTTPException:
             raise
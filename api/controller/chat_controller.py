@@ -1,7 +1,7 @@
 from fastapi import HTTPException, status
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from schema.chat_schema import CreateSessionRequest
-from service.features.chat_session_service import chat_session_service
+from service.features.chat_session_service import chat_session_service, InvalidCursorError
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,16 +23,17 @@ class ChatController:
                 detail="Failed to create chat session"
             )
     
-    async def get_user_sessions(self, user: Dict[str, Any]) -> Dict[str, Any]:
-        """Get all chat sessions for the user."""
+    async def get_user_sessions(self, user: Dict[str, Any], limit: int, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Get one page of chat sessions for the user."""
         username = user.get("username")
         
         try:
-            sessions = await chat_session_service.get_user_sessions(username)
-            return {
-                "sessions": sessions,
-                "total": len(sessions)
-            }
+            return await chat_session_service.list_user_sessions(username, limit=limit, cursor=cursor)
+        except InvalidCursorError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
         except Exception as e:
             logger.error(f"Error getting sessions for user {username}: {e}")
             raise HTTPException(
@@ -53,6 +54,26 @@ class ChatController:
         
         return session
     
+    async def get_session_messages(self, session_id: str, user: Dict[str, Any], limit: int, before: Optional[int] = None) -> Dict[str, Any]:
+        """Get one page of messages from a chat session."""
+        username = user.get("username")
+        
+        try:
+            page = await chat_session_service.get_messages_page(session_id, username, limit=limit, before=before)
+        except Exception as e:
+            logger.error(f"Error getting messages for session {session_id}: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to retrieve messages"
+            )
+        if page is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Session not found"
+            )
+        
+        return page
+    
     async def delete_session(self, session_id: str, user: Dict[str, Any]) -> Dict[str, str]:
         """Delete a chat session."""
         username = user.get("username")
@@ -1,39 +1,71 @@
-from fastapi import HTTPException, status, UploadFile
+from fastapi import HTTPException, status, UploadFile, BackgroundTasks
 from typing import Dict, Any, Optional, List
+from contextlib import asynccontextmanager
+import asyncio
 import uuid
 
-from schema.rag_schema import DocumentPayload, QueryRequest, QueryResponse, SourceDocument
+from schema.rag_schema import DocumentPayload, QueryRequest, QueryResponse, SourceDocument, PrefetchRequest
 from service.rag.rag_service import rag_service
+from service.rag.prefetch_service import prefetch_service
+from service.rag.llm_gateway import llm_gateway
+from service.rag.ingestion_store_service import ingestion_store_service
 from service.features.file_processing_service import file_processing_service
 from service.features.user_documents_service import user_documents_service
 from service.features.chat_session_service import chat_session_service
+from service.features.conversation_summary_service import conversation_summary_service
+from service.features.document_description_service import document_description_service
+from service.infrastructure.rate_limit_service import rate_limit_service, RateLimitExceeded
 import logging
 
 logger = logging.getLogger(__name__)
 
 from lib.config import settings
+from lib.tracing import tracer
+
+# Files parsed at once during a batch upload
+BATCH_EXTRACTION_CONCURRENCY = 4
 
 class RAGController:
 
-    def _resolve_and_log_key(self, api_keys: Dict[str, str], key_key: str, setting_key: Optional[str], provider_name: str, username: str) -> Optional[str]:
+    def _description_keys(self, user: Dict[str, Any]) -> Dict[str, str]:
         """
-        Helper to resolve API key priority (User > System) and log the source.
+        The user's own LLM keys for description generation. Server keys are
+        left out: the gateway falls back to them itself, and only fails over to
+        them for users without keys of their own.
         """
-        user_key = api_keys.get(key_key)
-        if user_key:
-            logger.info(f"KEYS: Using USER provided {provider_name} API Key for user '{username}'")
-            return user_key
-        
-        if setting_key:
-            logger.info(f"KEYS: Using SYSTEM default {provider_name} API Key (User key not found)")
-            return setting_key
-            
-        logger.warning(f"KEYS: No {provider_name} API Key found (User or System)")
-        return None
+        api_keys = user.get('api_keys', {})
+        return {name: api_keys[name] for name in ('groq_api_key', 'google_api_key') if api_keys.get(name)}
 
-    async def delete_documents(self, filenames: list, user: Dict[str, Any]) -> Dict[str, Any]:
+    @asynccontextmanager
+    async def _llm_quota(self, user: Dict[str, Any], provider: str):
+        """
+        Applies the per-user and per-API-key rate and concurrency limits to an
+        LLM-backed request. The key is resolved with User > System priority,
+        like the gateway's primary provider, so users on their own key do not
+        draw from the shared system key's budget.
+        """
+        api_keys = user.get('api_keys', {})
+        if provider == 'groq':
+            api_key = api_keys.get('groq_api_key') or settings.groq_api_key
+        else:
+            api_key = api_keys.get('google_api_key') or settings.google_api_key
+
+        try:
+            async with rate_limit_service.llm_quota(user.get('username'), api_key):
+                yield
+        except RateLimitExceeded as e:
+            logger.warning(f"Rate limited user '{user.get('username')}' ({e.scope.split(':')[0]} limit), retry after {e.retry_after}s")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests. Please wait a moment and try again.",
+                headers={"Retry-After": str(e.retry_after)},
+            )
+
+    async def delete_documents(self, filenames: list, user: Dict[str, Any], retained_content_hashes: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Deletes documents and their associated index data for a user.
+        Stored ingestions of files no other document references are removed too,
+        except those in retained_content_hashes (files being re-uploaded).
         """
         username = user.get('username')
         logger.info(f"User '{username}' requesting deletion of {len(filenames)} documents: {filenames}")
@@ -43,20 +75,16 @@ class RAGController:
             from service.rag.pinecone_service import pinecone_service
             from service.rag.parent_chunks_service import parent_chunks_service
 
-            # 1. Get the documents to retrieve metadata (chunk_ids, parent_ids) before deletion
-            existing_docs = await user_documents_service.get_user_documents(username)
-            target_docs = [doc for doc in existing_docs if doc.get('filename') in filenames]
+            # 1. Get the chunk and parent IDs of the documents before deletion
+            target_ids = await user_documents_service.get_document_ids(username, filenames)
             
-            if not target_docs:
+            if not target_ids["filenames"]:
                 logger.warning(f"No documents found for deletion matching: {filenames}")
                 return {"deleted": 0, "message": "No matching documents found."}
             
             # 2. Collect IDs
-            chunk_ids = []
-            parent_ids = []
-            for doc in target_docs:
-                chunk_ids.extend(doc.get('chunk_ids', []))
-                parent_ids.extend(doc.get('parent_ids', []))
+            chunk_ids = target_ids["chunk_ids"]
+            parent_ids = target_ids["parent_ids"]
             
             # 3. Delete from Vector Store (Pinecone)
             # Delete child chunks by ID
@@ -77,6 +105,13 @@ class RAGController:
                 
             # 5. Delete from User Documents Collection (MongoDB)
             docs_deleted = await user_documents_service.delete_documents(username, filenames)
+            prefetch_service.invalidate(username)
+
+            # 6. Drop stored ingestions whose file no document references anymore
+            released = set(target_ids["content_hashes"]) - set(retained_content_hashes or [])
+            if released:
+                released -= await user_documents_service.referenced_content_hashes(list(released))
+                await ingestion_store_service.forget(list(released))
             
             logger.info(f"Deletion complete. Docs: {docs_deleted}, Vectors: {vectors_deleted}, Parents: {parents_deleted}")
             
@@ -95,28 +130,36 @@ class RAGController:
             )
 
     async def orchestrate_rag_flow(
-        self, query_request: QueryRequest, user: Dict[str, Any], session_id: Optional[str] = None, documents: Optional[List[str]] = None
+        self, query_request: QueryRequest, user: Dict[str, Any], session_id: Optional[str] = None, documents: Optional[List[str]] = None,
+        background_tasks: Optional[BackgroundTasks] = None
     ) -> QueryResponse:
         """
         Orchestrates the full Modular RAG pipeline from query to generation.
+        The request is admitted only within the user's and API key's rate and
+        concurrency limits (429 with Retry-After otherwise).
+        """
+        async with self._llm_quota(user, llm_gateway.provider_for_model(query_request.model)):
+            return await self._run_rag_flow(query_request, user, session_id, documents, background_tasks)
+
+    async def _run_rag_flow(
+        self, query_request: QueryRequest, user: Dict[str, Any], session_id: Optional[str] = None, documents: Optional[List[str]] = None,
+        background_tasks: Optional[BackgroundTasks] = None
+    ) -> QueryResponse:
+        """
+        Runs the RAG pipeline. Independent stages run concurrently; saving the
+        turn to the chat session is deferred to background_tasks when provided.
         """
         query = query_request.query
         top_k = query_request.top_k
         response_style = query_request.response_style or "auto"
         retrieval_multiplier = query_request.retrieval_multiplier or 2
         username = user.get('username')
-        api_keys = user.get('api_keys', {})
+        # Only the user's own keys: the gateway falls back to server keys itself,
+        # and must be able to tell the two apart. Copied, as the user record is cached.
+        api_keys = dict(user.get('api_keys', {}))
         
         # Add model to api_keys context
         api_keys['model'] = query_request.model
-        
-        # Resolve and inject keys into api_keys dict so services use the prioritized one
-        api_keys['google_api_key'] = self._resolve_and_log_key(
-            api_keys, 'google_api_key', settings.google_api_key, 'Google', username
-        )
-        api_keys['groq_api_key'] = self._resolve_and_log_key(
-            api_keys, 'groq_api_key', settings.groq_api_key, 'Groq', username
-        )
 
         logger.info(f"User '{username}' query: '{query[:50]}...' | style: '{response_style}' | top_k: {top_k} | multiplier: {retrieval_multiplier}")
         logger.info(f"Document filter: {documents} (type: {type(documents)})")
@@ -128,40 +171,36 @@ class RAGController:
         if documents:
             logger.info(f"Filtering to {len(documents)} documents: {documents}")
 
-        try:
-            # Get chat history if session_id is provided
-            chat_history = []
+        # Retrieval pool size; prefetch must use the same one to be reusable
+        retrieval_pool_size = min(top_k * retrieval_multiplier, 50)  # Cap at 50 for performance
+
+        async def load_history() -> Dict[str, Any]:
+            # Running summary + last few turns of the session
+            history = {"summary": "", "recent_messages": []}
             if session_id:
-                session = await chat_session_service.get_session(session_id, username)
-                if session and session.get('messages'):
-                    chat_history = session['messages']
-                    logger.info(f"Loaded {len(chat_history)} messages from chat history")
-            
+                with tracer.span("rag.chat_history"):
+                    history = await conversation_summary_service.load_history(session_id, username)
+                if history["recent_messages"]:
+                    logger.info(f"Loaded {len(history['recent_messages'])} recent messages from chat history (summary: {len(history['summary'])} chars)")
+            return history
+
+        async def retrieve() -> List[Dict[str, Any]]:
+            # Reuse a speculative retrieval from the user's draft if it is close enough
+            prefetched_chunks = prefetch_service.lookup(query, username, retrieval_pool_size, documents)
+            if prefetched_chunks is not None:
+                with tracer.span("rag.prefetch_hit", chunks=len(prefetched_chunks)):
+                    return prefetched_chunks
+
             # 1. [Pre-Retrieval Module] Enhance the query (e.g., with HyDE)
             try:
                 enhanced_query = await rag_service.pre_retrieval_module(query, api_keys=api_keys)
             except Exception as e:
                 logger.warning(f"Pre-retrieval failed: {e}. Using original query.")
                 enhanced_query = query
-            
-            # Get user documents to provide high-level context
-            user_docs = await user_documents_service.get_user_documents(username)
-            
-            # Filter based on selected documents if provided
-            if documents:
-                user_docs = [doc for doc in user_docs if doc.get('filename') in documents]
-                
-            current_doc_descriptions = [
-                f"{doc.get('title', 'Untitled')}: {doc.get('description', 'No description')}" 
-                for doc in user_docs 
-                if doc.get('description')
-            ]
 
             # 2. [Retrieval Module] Retrieve documents with enhanced diversity and relevance filtering
             # Use retrieval_multiplier to cast a wider net for better quality selection
-            retrieval_pool_size = min(top_k * retrieval_multiplier, 50)  # Cap at 50 for performance
-            
-            retrieved_chunks = await rag_service.retrieval_module(
+            return await rag_service.retrieval_module(
                 enhanced_query, 
                 top_k=retrieval_pool_size, 
                 username=username, 
@@ -169,6 +208,20 @@ class RAGController:
                 similarity_threshold=0.3  # Filter out very low relevance matches
             )
 
+        # Dependency graph: history, user documents and (HyDE -> retrieval) are independent
+        # of each other and start together; rerank waits on retrieval, generation on all three.
+        # Tasks copy the current context, so their spans nest under this request's trace.
+        history_task = asyncio.create_task(load_history())
+        user_docs_task = asyncio.create_task(user_documents_service.get_catalog(username))
+        retrieval_task = asyncio.create_task(retrieve())
+
+        try:
+            retrieved_chunks, catalog = await asyncio.gather(retrieval_task, user_docs_task)
+
+            # Filter based on selected documents if provided; descriptions are memoized on the catalog
+            user_docs = catalog.select(documents)
+            current_doc_descriptions = catalog.descriptions(documents)
+
             # Handle case where no documents are retrieved
             # NEW STRATEGY: If no chunks found, but user has documents, let the LLM answer using 
             # the document descriptions/summaries. This allows for general questions about what documents exist.
@@ -204,15 +257,17 @@ class RAGController:
                 )
             
             # If we have descriptions but no chunks, we proceed to generation
-
+            history = await history_task
 
             # 4. [Generation Module] Generate the answer from the refined context with chat history and response style
             final_answer = await rag_service.generation_module(
                 query=query, 
                 context_chunks=final_context_chunks, 
-                chat_history=chat_history, 
+                chat_history=history["recent_messages"], 
                 document_descriptions=current_doc_descriptions,
-                api_keys=api_keys
+                api_keys=api_keys,
+                conversation_summary=history["summary"],
+                overview_cache_key=catalog.overview_key(documents)
             )
             
             # 5. Format the sources for the final response
@@ -242,18 +297,16 @@ class RAGController:
             # Skip appending sources to the final answer for visibility in chat
 
 
-            # Save to chat session if session_id provided
+            # Save to chat session if session_id provided. Persistence and title generation
+            # run after the response is sent when the route hands us its BackgroundTasks.
             if session_id:
-                # Add user message
-                await chat_session_service.add_message(session_id, username, "user", query)
-                
-                # Check if we need to update title (first message heuristic done in service now or helper)
-                # Pass API keys for title generation
-                await chat_session_service.update_session_title_if_needed(session_id, username, query, api_keys)
-
-                # Add assistant message with sources
                 sources_dict = [s.model_dump() for s in sources]
-                await chat_session_service.add_message(session_id, username, "assistant", final_answer, sources_dict)
+                if background_tasks is not None:
+                    background_tasks.add_task(self._persist_turn, session_id, username, query, final_answer, sources_dict, api_keys)
+                else:
+                    await self._persist_turn(session_id, username, query, final_answer, sources_dict, api_keys)
+
+            logger.info(f"RAG stage timings (ms) for user '{username}': {tracer.stage_timings()}")
                 
             return QueryResponse(answer=final_answer, sources=sources)
             
@@ -263,66 +316,234 @@ class RAGController:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="An error occurred while processing your query. Please try again.",
             )
+        finally:
+            # Early returns and failures must not leave stages running
+            for task in (history_task, user_docs_task, retrieval_task):
+                if not task.done():
+                    task.cancel()
+
+    async def _persist_turn(
+        self, session_id: str, username: str, query: str, answer: str, sources: List[Dict[str, Any]], api_keys: Dict[str, str]
+    ):
+        """Saves a question/answer turn; naming the session and refreshing its summary run in the background."""
+        try:
+            if await chat_session_service.record_turn(session_id, username, query, answer, sources, api_keys):
+                # Refresh the running summary in the background, outside the request path
+                conversation_summary_service.schedule_update(session_id, username, api_keys)
+        except Exception as e:
+            logger.error(f"Error saving turn to session {session_id}: {e}")
+
+    async def prefetch_retrieval(
+        self, prefetch_request: PrefetchRequest, user: Dict[str, Any], documents: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Starts a speculative retrieval for a draft query. The work runs in the
+        background; the final /rag/query reuses it if the question is close enough.
+        """
+        username = user.get('username')
+        retrieval_multiplier = prefetch_request.retrieval_multiplier or 2
+        retrieval_pool_size = min(prefetch_request.top_k * retrieval_multiplier, 50)
+
+        if documents is not None and len(documents) == 0:
+            documents = None
+
+        scheduled = prefetch_service.schedule_prefetch(
+            prefetch_request.query, username, retrieval_pool_size, documents
+        )
+        return {"scheduled": scheduled}
+
+    async def _read_upload(self, file: UploadFile) -> Dict[str, Any]:
+        """
+        Reads an upload and looks it up in the ingestion store by content hash.
+        On a hit extraction is skipped: "content" is the stored text preview and
+        "ingestion" holds the stored chunks, embeddings and description.
+        """
+        # Uploads wait for room in the shared byte budget, then stream to a size-capped
+        # spool (413 past UPLOAD_MAX_MB) that is hashed on the way in
+        async with file_processing_service.upload_budget.reserve(file_processing_service.declared_size(file)):
+            with await file_processing_service.spool_upload(file) as upload:
+                ingestion = await ingestion_store_service.lookup(upload.content_hash, rag_service.index_pipeline)
+                if ingestion:
+                    data = {"title": file_processing_service.document_title(file.filename), "content": ingestion["preview"]}
+                else:
+                    data = await file_processing_service.extract_text_from_upload(upload)
+                return {**data, "content_hash": upload.content_hash, "ingestion": ingestion}
 
     async def upload_and_index_file(
         self, file: UploadFile, user: Dict[str, Any]
     ) -> Dict[str, str]:
         """
-        Controller logic to handle file upload, extract text, generate description, and then index it.
+        Controller logic to handle file upload, extract text, and then index it.
+        The document is queryable once indexed; its description is generated in the background.
+        A file already ingested before (same bytes, any user) reuses the stored
+        text, embeddings and description instead.
         """
         logger.info(f"User '{user.get('username')}' uploaded file: '{file.filename}' for indexing.")
-        api_keys = user.get('api_keys', {})
 
-        # 1. Extract text from the uploaded file
-        extracted_data = await file_processing_service.extract_text_from_file(file)
+        # 1. Extract text from the uploaded file (or find it in the ingestion store)
+        extracted_data = await self._read_upload(file)
+        ingestion = extracted_data["ingestion"]
 
         # 1.1 Deduplication Check: Remove existing document with same name
-        existing_docs = await user_documents_service.get_user_documents(user.get('username'))
-        if any(doc.get('filename') == file.filename for doc in existing_docs):
+        if await user_documents_service.get_document(user.get('username'), file.filename):
             logger.info(f"Document '{file.filename}' already exists. Replacing it...")
-            await self.delete_documents([file.filename], user)
-
-        # 2. Generate a description using Gemini or Groq
-        from service.rag.gemini_service import gemini_service
-        from service.rag.groq_service import groq_service
-        
-        # Resolve keys to decide which service to use
-        # We prefer Groq for description if available (User or System)
-        groq_key = self._resolve_and_log_key(api_keys, 'groq_api_key', settings.groq_api_key, 'Groq', user.get('username'))
-        
-        if groq_key:
-             description = await groq_service.generate_description(
-                content=extracted_data["content"],
-                title=extracted_data["title"],
-                api_key=groq_key
-            )
-        else:
-            # Fallback to Gemini
-            google_key = self._resolve_and_log_key(api_keys, 'google_api_key', settings.google_api_key, 'Google', user.get('username'))
-            description = await gemini_service.generate_description(
-                content=extracted_data["content"],
-                title=extracted_data["title"],
-                api_key=google_key
-            )
+            await self.delete_documents([file.filename], user, retained_content_hashes=[extracted_data["content_hash"]])
 
-        # 3. Create a DocumentPayload from the extracted content and description
+        # 2. Index straight away with an extractive placeholder description; the
+        #    LLM description (Groq preferred, Gemini as failover) follows in the background
+        #    unless the ingestion store already has one
+        stored_description = ingestion.get("description") if ingestion else None
+        description_job = None if stored_description else document_description_service.new_job_id()
         doc_payload = DocumentPayload(
             title=extracted_data["title"],
             content=extracted_data["content"],
             metadata={
                 "source_filename": file.filename,
-                "description": description
+                "description": stored_description or document_description_service.placeholder(extracted_data["content"])
             }
         )
 
-        # 4. Reuse the existing indexing logic
-        return await self.process_and_index_document(doc_payload, user, file.filename)
+        # 3. Reuse the existing indexing logic
+        result = await self.process_and_index_document(
+            doc_payload, user, file.filename, description_job=description_job,
+            content_hash=extracted_data["content_hash"], ingestion=ingestion
+        )
+        if result.get("document") and description_job:
+            document_description_service.schedule(
+                user.get('username'),
+                [(file.filename, extracted_data["title"], extracted_data["content"], description_job, extracted_data["content_hash"])],
+                self._description_keys(user)
+            )
+        return result
+
+    async def upload_and_index_files(
+        self, files: List[UploadFile], user: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Batch upload: extracts all files in parallel, indexes them with pooled
+        embeddings and bulk writes, and reports a result per file. One file
+        failing never fails the others. Descriptions are generated afterwards in
+        the background, several per LLM call.
+        """
+        username = user.get('username')
+        if len(files) > settings.batch_upload_max_files:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Too many files: at most {settings.batch_upload_max_files} per batch.",
+            )
+        logger.info(f"User '{username}' uploaded a batch of {len(files)} files for indexing.")
+
+        results: Dict[str, Dict[str, Any]] = {}
+        # A filename repeated within the batch would replace itself; the last copy wins
+        unique_files: Dict[str, UploadFile] = {}
+        for file in files:
+            unique_files[file.filename] = file
+
+        # 1. Extract text from all files in parallel; files in the ingestion store skip extraction
+        semaphore = asyncio.Semaphore(BATCH_EXTRACTION_CONCURRENCY)
+
+        async def extract(file: UploadFile) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    return await self._read_upload(file)
+                except HTTPException as e:
+                    results[file.filename] = {"filename": file.filename, "status": "failed", "error": e.detail}
+                    return None
+
+        with tracer.span("rag.batch_extract", files=len(unique_files)):
+            extracted = await asyncio.gather(*(extract(file) for file in unique_files.values()))
+        ready = [
+            (filename, data) for filename, data in zip(unique_files, extracted)
+            if data is not None and data["content"].strip()
+        ]
+        for filename, data in zip(unique_files, extracted):
+            if data is not None and not data["content"].strip():
+                results[filename] = {"filename": filename, "status": "failed", "error": "No text could be extracted"}
+
+        if ready:
+            # 2. Replace documents that already exist under the same names, in one pass
+            existing = await user_documents_service.get_document_ids(username, [filename for filename, _ in ready])
+            if existing["filenames"]:
+                logger.info(f"Replacing {len(existing['filenames'])} existing documents from batch upload")
+                await self.delete_documents(
+                    existing["filenames"], user, retained_content_hashes=[data["content_hash"] for _, data in ready]
+                )
+
+            # 3. Placeholder descriptions now; LLM descriptions are generated after indexing
+            #    (stored ones are reused for files from the ingestion store)
+            stored_descriptions = [data["ingestion"].get("description") if data["ingestion"] else None for _, data in ready]
+            descriptions = [
+                stored or document_description_service.placeholder(data["content"])
+                for (_, data), stored in zip(ready, stored_descriptions)
+            ]
+            description_jobs = [None if stored else document_description_service.new_job_id() for stored in stored_descriptions]
+
+            # 4. Index everything with pooled embeddings and bulk writes
+            index_results = await rag_service.indexing_module_batch([
+                {
+                    "content": data["content"],
+                    "title": data["title"],
+                    # CRITICAL: Inject username into metadata for multi-tenant isolation
+                    "metadata": {"source_filename": filename, "description": description, "username": username},
+                    "content_hash": data["content_hash"],
+                    "ingestion": data["ingestion"]
+                }
+                for (filename, data), description in zip(ready, descriptions)
+            ])
+
+            # 5. Record the indexed documents in one write
+            to_store = [
+                {
+                    "title": data["title"],
+                    "filename": filename,
+                    "chunk_ids": index_result["chunk_ids"],
+                    "parent_ids": index_result["parent_ids"],
+                    "description": description,
+                    "description_job": description_job,
+                    "content_hash": data["content_hash"]
+                }
+                for (filename, data), description, description_job, index_result in zip(ready, descriptions, description_jobs, index_results)
+                if index_result["chunk_ids"]
+            ]
+            stored = {record["filename"]: record for record in await user_documents_service.add_documents(username, to_store)}
+            for filename, _ in ready:
+                record = stored.get(filename)
+                if record:
+                    results[filename] = {"filename": filename, "status": "indexed", "chunks": record["chunks"], "document": record}
+                else:
+                    results[filename] = {"filename": filename, "status": "failed", "error": "Indexing failed"}
+            if stored:
+                prefetch_service.invalidate(username)
+                # 6. Describe the stored documents in the background, several per LLM call
+                document_description_service.schedule(
+                    username,
+                    [
+                        (filename, data["title"], data["content"], description_job, data["content_hash"])
+                        for (filename, data), description_job in zip(ready, description_jobs)
+                        if filename in stored and description_job
+                    ],
+                    self._description_keys(user)
+                )
 
-    async def process_and_index_document(self, doc_payload: DocumentPayload, user: Dict[str, Any], filename: Optional[str] = None) -> Dict[str, Any]:
+        ordered = [results[filename] for filename in unique_files]
+        indexed = sum(1 for result in ordered if result["status"] == "indexed")
+        logger.info(f"Batch upload for '{username}': {indexed}/{len(ordered)} files indexed")
+        return {
+            "message": f"Indexed {indexed} of {len(ordered)} files",
+            "indexed": indexed,
+            "failed": len(ordered) - indexed,
+            "results": ordered
+        }
+
+    async def process_and_index_document(
+        self, doc_payload: DocumentPayload, user: Dict[str, Any], filename: Optional[str] = None, description_job: Optional[str] = None,
+        content_hash: Optional[str] = None, ingestion: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """
         Orchestrates the indexing process:
         1. Run the core RAG indexing module (Chunking -> Embedding -> Pinecone).
         2. Save document metadata to MongoDB (User Documents) with the generated IDs.
+        Uploaded files pass their content_hash, and their ingestion store hit if any.
         """
         username = user.get('username')
         
@@ -342,7 +563,9 @@ class RAGController:
             indexing_input = {
                 "content": doc_payload.content,
                 "title": doc_payload.title,
-                "metadata": doc_payload.metadata
+                "metadata": doc_payload.metadata,
+                "content_hash": content_hash,
+                "ingestion": ingestion
             }
             
             # 2. Run Indexing Module
@@ -366,9 +589,12 @@ class RAGController:
                 filename=filename,
                 chunk_ids=chunk_ids,
                 parent_ids=parent_ids,
-                description=doc_payload.metadata.get("description")
+                description=doc_payload.metadata.get("description"),
+                description_job=description_job,
+                content_hash=content_hash
             )
             
+            prefetch_service.invalidate(username)
             logger.info(f"Document '{filename}' successfully processed and stored for user '{username}'.")
             
             return {
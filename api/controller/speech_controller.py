@@ -3,13 +3,18 @@ Speech Controller
 Handles speech-related business logic for ASR and TTS endpoints.
 """
 
-from fastapi import HTTPException, status, UploadFile
-from typing import Dict, Any
+from fastapi import HTTPException, status, UploadFile, WebSocket, WebSocketDisconnect
+from typing import AsyncIterator, Dict, Any, Optional
 from service.features.speech_service import speech_service
+from service.infrastructure.auth_service import get_user_from_token
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Seconds a streaming text-to-speech connection may stay open before authenticating
+WEBSOCKET_AUTH_TIMEOUT = 10
+
 
 class SpeechController:
     """Controller for handling speech recognition and synthesis requests."""
@@ -94,6 +99,108 @@ class SpeechController:
                 detail=f"Failed to convert text to speech: {str(e)}"
             )
     
+    async def stream_text_to_speech(self, websocket: WebSocket, **kwargs) -> None:
+        """
+        Controller logic for streaming text-to-speech over a WebSocket.
+        Text is received while it is still being generated and audio is sent
+        back sentence by sentence.
+        
+        Client messages are JSON text frames:
+            {"token": "<access token>"}   first, authenticates the connection
+            {"text": "..."}               any number, the text in order
+            {"done": true}                the text is complete
+        The server sends the audio as binary frames forming one WAV stream,
+        then {"done": true}, and closes. Failures are reported as
+        {"error": "..."} before closing with an error code.
+        
+        Args:
+            websocket: The client connection
+            **kwargs: Additional TTS parameters
+        """
+        await websocket.accept()
+        try:
+            user = await self._authenticate(websocket)
+        except WebSocketDisconnect:
+            return
+        if user is None:
+            await self._close_with_error(websocket, status.WS_1008_POLICY_VIOLATION, "Could not validate credentials")
+            return
+        
+        username = user.get('username', 'unknown')
+        api_keys = user.get('api_keys', {})
+        sarvam_key = api_keys.get('sarvam_api_key')
+        
+        logger.info(f"User '{username}' requested streaming text-to-speech")
+        
+        audio = speech_service.stream_text_to_speech(self._receive_text(websocket), api_key=sarvam_key, **kwargs)
+        audio_sent = False
+        try:
+            async for data in audio:
+                await websocket.send_bytes(data)
+                audio_sent = True
+        except WebSocketDisconnect:
+            logger.info(f"User '{username}' disconnected during streaming text-to-speech")
+            return
+        except ValueError as e:
+            await self._close_with_error(websocket, status.WS_1003_UNSUPPORTED_DATA, str(e))
+            return
+        except Exception as e:
+            logger.error(f"Streaming text-to-speech failed for user '{username}': {e}")
+            await self._close_with_error(websocket, status.WS_1011_INTERNAL_ERROR, f"Failed to convert text to speech: {str(e)}")
+            return
+        finally:
+            await audio.aclose()
+        
+        if not audio_sent:
+            await self._close_with_error(websocket, status.WS_1003_UNSUPPORTED_DATA, "Text cannot be empty")
+            return
+        logger.info(f"Streaming text-to-speech finished for user '{username}'")
+        await websocket.send_json({"done": True})
+        await websocket.close()
+    
+    async def _authenticate(self, websocket: WebSocket) -> Optional[Dict[str, Any]]:
+        """Resolves the user from the first message, or None if it is not a valid token."""
+        try:
+            message = await asyncio.wait_for(self._receive_message(websocket), timeout=WEBSOCKET_AUTH_TIMEOUT)
+        except (asyncio.TimeoutError, ValueError):
+            return None
+        token = message.get("token")
+        if not isinstance(token, str):
+            return None
+        return await get_user_from_token(token)
+    
+    async def _receive_message(self, websocket: WebSocket) -> Dict[str, Any]:
+        """Receives one JSON object message."""
+        try:
+            message = await websocket.receive_json()
+        except (KeyError, ValueError):
+            # Binary frames have no text; json.JSONDecodeError is a ValueError
+            raise ValueError("Messages must be JSON text frames")
+        if not isinstance(message, dict):
+            raise ValueError("Messages must be JSON objects")
+        return message
+    
+    async def _receive_text(self, websocket: WebSocket) -> AsyncIterator[str]:
+        """Yields the text messages until the client marks the text as complete."""
+        while True:
+            message = await self._receive_message(websocket)
+            if message.get("done"):
+                return
+            text = message.get("text")
+            if not isinstance(text, str):
+                raise ValueError('Expected {"text": "..."} or {"done": true}')
+            if text:
+                yield text
+    
+    async def _close_with_error(self, websocket: WebSocket, code: int, detail: str) -> None:
+        """Reports an error to the client and closes the connection."""
+        try:
+            await websocket.send_json({"error": detail})
+            await websocket.close(code=code)
+        except (WebSocketDisconnect, RuntimeError):
+            # The client is already gone
+            pass
+    
     async def check_service_status(self) -> Dict[str, Any]:
         """
         Check if the speech service is available.
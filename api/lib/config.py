@@ -11,6 +11,12 @@ class Settings(BaseSettings):
     jwt_algorithm: str = os.getenv("JWT_ALGORITHM", "HS256")
     access_token_expire_minutes: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
     
+    # Password Hashing & Login Protection
+    password_hash_workers: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    login_attempts_per_minute: float = float(os.getenv("LOGIN_ATTEMPTS_PER_MINUTE", "10"))
+    login_attempts_burst: float = float(os.getenv("LOGIN_ATTEMPTS_BURST", "5"))
+    trust_forwarded_for: bool = os.getenv("TRUST_FORWARDED_FOR", "false").lower() == "true"
+    
     # API Keys
     pinecone_api_key: Optional[str] = os.getenv("PINECONE_API_KEY")
     google_api_key: Optional[str] = os.getenv("GOOGLE_API_KEY")
@@ -20,6 +26,44 @@ class Settings(BaseSettings):
     # Embedding Configuration
     embedding_dim: int = int(os.getenv("EMBEDDING_DIM", "768"))  # For FastEmbed (BGE Base)
     
+    # Uploads (per-file size limit; bytes of uploads parsed at once across all requests)
+    upload_max_bytes: int = int(float(os.getenv("UPLOAD_MAX_MB", "50")) * 1024 * 1024)
+    upload_inflight_budget_bytes: int = int(float(os.getenv("UPLOAD_INFLIGHT_BUDGET_MB", "64")) * 1024 * 1024)
+    batch_upload_max_files: int = int(os.getenv("BATCH_UPLOAD_MAX_FILES", "100"))
+    
+    # Text Extraction (worker processes, 0 = threads; per-file timeout)
+    extraction_workers: int = int(os.getenv("EXTRACTION_WORKERS", "2"))
+    extraction_timeout_seconds: float = float(os.getenv("EXTRACTION_TIMEOUT_SECONDS", "120"))
+    # Disk cache of extracted text by (file sha256, extractor version); 0 MB disables it
+    extraction_cache_dir: str = os.getenv("EXTRACTION_CACHE_DIR", "data/extraction_cache")
+    extraction_cache_max_mb: float = float(os.getenv("EXTRACTION_CACHE_MAX_MB", "256"))
+    
+    # Ingestion Store (reuse extraction, embeddings and descriptions of identical files)
+    ingestion_store_enabled: bool = os.getenv("INGESTION_STORE_ENABLED", "true").lower() == "true"
+    
+    # Generation Context Budget (0 = per-model default)
+    context_token_budget: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "0"))
+    
+    # LLM Gateway
+    llm_hedging_enabled: bool = os.getenv("LLM_HEDGING_ENABLED", "true").lower() == "true"
+    llm_failover_enabled: bool = os.getenv("LLM_FAILOVER_ENABLED", "true").lower() == "true"
+    
+    # Rate Limiting (backend: memory | mongo)
+    rate_limit_enabled: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    rate_limit_backend: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    rate_limit_user_per_minute: float = float(os.getenv("RATE_LIMIT_USER_PER_MINUTE", "20"))
+    rate_limit_user_burst: float = float(os.getenv("RATE_LIMIT_USER_BURST", "10"))
+    rate_limit_user_concurrency: int = int(os.getenv("RATE_LIMIT_USER_CONCURRENCY", "3"))
+    rate_limit_key_per_minute: float = float(os.getenv("RATE_LIMIT_KEY_PER_MINUTE", "120"))
+    rate_limit_key_burst: float = float(os.getenv("RATE_LIMIT_KEY_BURST", "30"))
+    rate_limit_key_concurrency: int = int(os.getenv("RATE_LIMIT_KEY_CONCURRENCY", "20"))
+    
+    # Tracing (exporter: none | file | otlp)
+    tracing_enabled: bool = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+    tracing_exporter: str = os.getenv("TRACING_EXPORTER", "none")
+    tracing_file_path: str = os.getenv("TRACING_FILE_PATH", "traces.jsonl")
+    tracing_otlp_endpoint: str = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+    
     # Database (for future use if needed)
     database_url: Optional[str] = os.getenv("DATABASE_URL")
     
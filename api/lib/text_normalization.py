@@ -0,0 +1,115 @@
+"""
+Text normalization shared by extraction, answers and speech.
+
+All patterns are compiled once at import. Markdown is unwrapped in a single
+scan: one alternation regex matches every construct we rewrite (code fences,
+heading and list markers, emphasis, inline code) and one callback decides what
+each match becomes, instead of a dozen sequential `re.sub` passes over the
+whole text. Every alternative starts with a literal character (`\n`, `*`,
+`_` or a backtick), so the regex engine skips plain text between them quickly;
+line-start markup is matched after a newline, with one prepended to the text
+so the first line is covered too.
+
+Work that cannot share that scan is skipped when it cannot apply: the emoji
+pass only runs on non-ASCII text, and abbreviations are plain substring
+replacements that only run when the substring occurs.
+"""
+import re
+
+# Plain URLs that are NOT already the target of a Markdown link: the
+# lookbehind (?<!\]\() skips the (http...) part of an existing [text](http...)
+URL_PATTERN = re.compile(r'(?<!\]\()(https?://[^\s<>"]+|www\.[^\s<>"]+)')
+
+_FENCE = r"```[\w+-]*\n?(?P<code_block>(?s:.+?))\n?```"
+_INLINE = (
+    r"\*\*\*(?P<strong_em>.+?)\*\*\*",
+    r"\*\*(?P<strong>.+?)\*\*",
+    r"__(?<!\w__)(?P<strong_u>.+?)__(?!\w)",
+    r"\*(?P<em>[^*\n]+)\*",
+    r"_(?<!\w_)(?P<em_u>[^_\n]+)_(?!\w)",
+    r"`(?P<code>[^`\n]+)`",
+)
+# Display clean-up drops heading markers; speech also drops list markers
+MARKDOWN_PATTERN = re.compile("|".join((_FENCE, r"\n(?P<marker>[ \t]*#{1,6}[ \t]+)") + _INLINE))
+SPEECH_PATTERN = re.compile("|".join((_FENCE, r"\n(?P<marker>[ \t]*(?:#{1,6}|[-*+•●◦▪]|\d{1,3}\.)[ \t]+)") + _INLINE))
+
+# Matches whose text is kept as is; emphasis may wrap more markup
+VERBATIM_TOKENS = frozenset({"code_block", "code"})
+
+# Pictographs, dingbats, flags and enclosed symbols. Letters of any script,
+# including CJK, are never part of this class.
+EMOJI_PATTERN = re.compile(
+    "["
+    "\u24C2"
+    "\u2600-\u27BF"  # miscellaneous symbols and dingbats
+    "\uFE0F"  # emoji presentation selector
+    "\U0001F170-\U0001F251"  # enclosed alphanumerics and ideographs
+    "\U0001F1E0-\U0001F1FF"  # flags
+    "\U0001F300-\U0001FAFF"  # pictographs, emoticons, transport, supplemental symbols
+    "]+"
+)
+
+# Spelled out for speech, in this order ("etc.," before "etc.")
+ABBREVIATIONS = (
+    (" e.g. ", " for example "),
+    (" E.g. ", " For example "),
+    (" i.e. ", " that is "),
+    (" I.e. ", " That is "),
+    (" vs. ", " versus "),
+    (" vs ", " versus "),
+    (" etc.,", " and so on,"),
+    (" etc.", " and so on."),
+)
+
+BLANK_LINES_PATTERN = re.compile(r"\n{3,}")
+# "approval.Managers" -> "approval. Managers"
+RUN_ON_SENTENCE_PATTERN = re.compile(r"([.!?])(?<=[a-z].)(?=[A-Z])")
+
+
+def _unwrap(match: re.Match) -> str:
+    kind = match.lastgroup
+    if kind == "marker":
+        return "\n"
+    text = match.group(kind)
+    if kind in VERBATIM_TOKENS or ("*" not in text and "_" not in text and "`" not in text):
+        return text
+    return match.re.sub(_unwrap, text)
+
+
+def _link(match: re.Match) -> str:
+    url = match.group(0)
+    # Ensure protocol for www links
+    href = url if url.startswith("http") else f"https://{url}"
+    return f"[{url}]({href})"
+
+
+def linkify_urls(text: str) -> str:
+    """Turns plain URLs into Markdown links, leaving existing links alone."""
+    if "http" not in text and "www." not in text:
+        return text
+    return URL_PATTERN.sub(_link, text)
+
+
+def strip_markdown(text: str) -> str:
+    """Removes emphasis, headings, inline code and code fences, keeping their text."""
+    return MARKDOWN_PATTERN.sub(_unwrap, "\n" + text).strip()
+
+
+def markdown_to_speech(text: str) -> str:
+    """
+    Plain text for text-to-speech: Markdown, list markers and emojis removed,
+    common abbreviations spelled out and whitespace normalized.
+    """
+    text = SPEECH_PATTERN.sub(_unwrap, "\n" + text)
+    if not text.isascii():
+        text = EMOJI_PATTERN.sub("", text)
+    for abbreviation, spoken in ABBREVIATIONS:
+        if abbreviation in text:
+            text = text.replace(abbreviation, spoken)
+
+    # Single spaces within lines, none around line breaks, at most one blank line
+    if "  " in text or " \n" in text or "\n " in text or "\t" in text:
+        text = "\n".join([" ".join(line.split()) for line in text.split("\n")])
+    if "\n\n\n" in text:
+        text = BLANK_LINES_PATTERN.sub("\n\n", text)
+    return RUN_ON_SENTENCE_PATTERN.sub(r"\1 ", text).strip()
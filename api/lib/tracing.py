@@ -0,0 +1,300 @@
+"""
+Lightweight request tracing for the API.
+
+Spans are recorded per request (one trace per HTTP request) using contextvars,
+so concurrent stages and worker threads started with asyncio.to_thread attach to
+the right parent. Finished traces can be exported as OTLP/JSON to a local
+file or an OpenTelemetry collector, and per-stage timings can be returned to the
+client in a Server-Timing header.
+"""
+import asyncio
+import functools
+import json
+import logging
+import queue
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from lib.config import settings
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "querywise-api"
+# Request header that asks for stage timings in the response
+DEBUG_TIMINGS_HEADER = b"x-debug-timings"
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns or time.time_ns()
+        return (end_ns - self.start_ns) / 1_000_000
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class Trace:
+    """All spans recorded while handling one request."""
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = secrets.token_hex(16)
+        self.root = Span(name, self.trace_id, None, attributes)
+        self.spans: List[Span] = [self.root]
+
+    def stage_timings(self) -> Dict[str, float]:
+        """Total milliseconds per span name (excluding the root), in start order."""
+        timings: Dict[str, float] = {}
+        for span in self.spans[1:]:
+            if span.end_ns is None:
+                continue
+            timings[span.name] = round(timings.get(span.name, 0.0) + span.duration_ms, 1)
+        return timings
+
+    def server_timing(self) -> str:
+        """Formats stage timings as a Server-Timing header value."""
+        entries = [f"{name};dur={duration}" for name, duration in self.stage_timings().items()]
+        entries.append(f"total;dur={round(self.root.duration_ms, 1)}")
+        return ", ".join(entries)
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def _otlp_payload(spans: List[Span]) -> Dict[str, Any]:
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{
+                "scope": {"name": "querywise.tracing"},
+                "spans": [span.to_otlp() for span in spans],
+            }],
+        }]
+    }
+
+
+class FileSpanExporter:
+    """Appends one OTLP/JSON export request per trace to a local file."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(_otlp_payload(spans)) + "\n")
+
+
+class OTLPHttpSpanExporter:
+    """Posts OTLP/JSON to a collector's /v1/traces endpoint."""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    def export(self, spans: List[Span]):
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(_otlp_payload(spans)).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class BackgroundExportProcessor:
+    """Hands finished traces to an exporter on a daemon thread, off the request path."""
+
+    def __init__(self, exporter, max_queue_size: int = 1000):
+        self.exporter = exporter
+        self._queue: "queue.Queue[List[Span]]" = queue.Queue(maxsize=max_queue_size)
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, spans: List[Span]):
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            logger.debug("Trace export queue full; dropping trace")
+
+    def _run(self):
+        while True:
+            spans = self._queue.get()
+            try:
+                self.exporter.export(spans)
+            except Exception as e:
+                logger.debug(f"Trace export failed: {e}")
+
+
+def _build_processor() -> Optional[BackgroundExportProcessor]:
+    exporter_name = (settings.tracing_exporter or "none").lower()
+    if exporter_name == "file":
+        return BackgroundExportProcessor(FileSpanExporter(settings.tracing_file_path))
+    if exporter_name == "otlp":
+        return BackgroundExportProcessor(OTLPHttpSpanExporter(settings.tracing_otlp_endpoint))
+    return None
+
+
+class Tracer:
+    """Creates traces and spans; spans outside a trace are no-ops."""
+
+    def __init__(self):
+        self.enabled = settings.tracing_enabled
+        self._processor = _build_processor() if self.enabled else None
+
+    def current_trace(self) -> Optional[Trace]:
+        return _current_trace.get()
+
+    def stage_timings(self) -> Dict[str, float]:
+        trace = _current_trace.get()
+        return trace.stage_timings() if trace else {}
+
+    @contextmanager
+    def start_trace(self, name: str, **attributes):
+        """Opens a new trace whose root span covers the enclosed block."""
+        if not self.enabled:
+            yield None
+            return
+
+        trace = Trace(name, attributes)
+        trace_token = _current_trace.set(trace)
+        span_token = _current_span.set(trace.root)
+        try:
+            yield trace
+        except BaseException as e:
+            trace.root.error = repr(e)
+            raise
+        finally:
+            trace.root.end()
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+            if self._processor:
+                self._processor.submit(list(trace.spans))
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Records a child span of the current span, if a trace is active."""
+        trace = _current_trace.get()
+        if not self.enabled or trace is None:
+            yield None
+            return
+
+        parent = _current_span.get()
+        span = Span(name, trace.trace_id, parent.span_id if parent else None, attributes)
+        trace.spans.append(span)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            span.end()
+            _current_span.reset(token)
+
+
+tracer = Tracer()
+
+
+def traced(name: Optional[str] = None, **attributes):
+    """Decorator that wraps a sync or async function in a span."""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.span(span_name, **attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            with tracer.span(span_name, **attributes):
+                return func(*args, **kwargs)
+        return sync_wrapper
+
+    return decorator
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware that opens one trace per HTTP request. Clients can send
+    `X-Debug-Timings: 1` to receive per-stage timings in a Server-Timing header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = dict(scope.get("headers") or [])
+        expose_timings = request_headers.get(DEBUG_TIMINGS_HEADER, b"").lower() in (b"1", b"true")
+
+        with tracer.start_trace(
+            f"{scope['method']} {scope['path']}",
+            **{"http.method": scope["method"], "http.target": scope["path"]}
+        ) as trace:
+            async def send_with_timings(message):
+                if message["type"] == "http.response.start":
+                    trace.root.set_attribute("http.status_code", message["status"])
+                    if expose_timings:
+                        headers = list(message.get("headers", []))
+                        headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                        message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_timings)
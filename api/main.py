@@ -12,8 +12,9 @@ if not verify_signature():
 # Disable tokenizers parallelism to avoid deadlocks/warnings
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 # --- Import routers and services ---
 from routes.auth import router as auth_router
@@ -23,10 +24,16 @@ from routes.export import router as export_router
 from routes.speech import router as speech_router
 from routes.query_routes import router as query_router
 from routes.visualization import router as visualization_router
+from routes.metrics import router as metrics_router
+from lib.config import settings
+from lib.tracing import TracingMiddleware
 from service.infrastructure.database_service import database_service
 from service.rag.pinecone_service import pinecone_service
 from service.rag.gemini_service import gemini_service
+from service.rag.groq_service import groq_service
 from service.features.sql_analysis_service import sql_analysis_service
+from service.features.document_description_service import document_description_service
+from service.features.file_processing_service import file_processing_service
 from service.features.database_visualization_service import DatabaseVisualizationService
 import service.features.database_visualization_service as viz_service_module
 
@@ -79,6 +86,10 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("Shutting down QueryWise API...")
+    await document_description_service.stop()
+    file_processing_service.close()
+    await gemini_service.close_clients()
+    await groq_service.close_clients()
     await database_service.close()
     logger.info("MongoDB connection closed.")
 
@@ -97,8 +108,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# --- Request tracing (per-stage timings, optional Server-Timing header) ---
+app.add_middleware(TracingMiddleware)
+
+# --- Upload size limit ---
+# Multipart bodies are spooled to disk before any route runs, so oversized
+# uploads that declare their length are turned away here. Chunked uploads
+# are capped while they are streamed (FileProcessingService.spool_upload).
+UPLOAD_FORM_OVERHEAD_BYTES = 1024 * 1024
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    if request.method == "POST" and request.url.path.startswith("/rag/upload-and-index"):
+        max_files = settings.batch_upload_max_files if request.url.path.endswith("/batch") else 1
+        content_length = request.headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > max_files * settings.upload_max_bytes + UPLOAD_FORM_OVERHEAD_BYTES:
+            return JSONResponse(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                content={"detail": f"Upload too large: at most {settings.upload_max_bytes // (1024 * 1024)} MB per file."},
+            )
+    return await call_next(request)
+
 # --- Health check endpoints ---
 @app.get("/")
 async def root():
@@ -122,6 +155,7 @@ app.include_router(export_router)
 app.include_router(speech_router)
 app.include_router(query_router)
 app.include_router(visualization_router)
+app.include_router(metrics_router)
 
 # --- Main entry point for local development ---
 if __name__ == "__main__":
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from typing import Dict, Any
 from schema.user_schema import UserCreate, UserLogin, UserAPIKeysUpdate
 from schema.token_schema import Token
 from controller.auth_controller import auth_controller
 from service.infrastructure.auth_service import get_current_user
+from lib.config import settings
 
 router = APIRouter()
 
@@ -14,12 +15,20 @@ async def signup(user_data: UserCreate):
     """
     return await auth_controller.register_user(user_data)
 
+def _client_ip(request: Request) -> str:
+    """Client address for per-IP limits; X-Forwarded-For is only trusted behind a known proxy."""
+    if settings.trust_forwarded_for:
+        forwarded_for = request.headers.get("x-forwarded-for")
+        if forwarded_for:
+            return forwarded_for.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
 @router.post("/login", response_model=Token)
-async def login(user_credentials: UserLogin):
+async def login(user_credentials: UserLogin, request: Request):
     """
     Authenticate user and return access token
     """
-    return await auth_controller.login_for_access_token(user_credentials)
+    return await auth_controller.login_for_access_token(user_credentials, client_ip=_client_ip(request))
 
 @router.get("/me")
 async def get_current_user_info(current_user: Dict[str, Any] = Depends(get_current_user)):
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
-from typing import Dict, Any
-from schema.chat_schema import CreateSessionRequest
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query
+from typing import Dict, Any, Optional
+from schema.chat_schema import CreateSessionRequest, SessionListResponse, MessagePageResponse
 from controller.chat_controller import chat_controller
-from service.infrastructure.auth_service import get_current_user
+from service.features.chat_session_service import (
+    DEFAULT_SESSION_PAGE_SIZE,
+    MAX_SESSION_PAGE_SIZE,
+    DEFAULT_MESSAGE_PAGE_SIZE,
+    MAX_MESSAGE_PAGE_SIZE,
+)
+from service.infrastructure.auth_service import get_token_user
 from lib.signature_guard import verify_signature
 
 verify_signature()  # Critical - DO NOT REMOVE
@@ -20,7 +26,7 @@ router = APIRouter(
 )
 async def create_session(
     request: CreateSessionRequest,
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(get_token_user)
 ):
     """
     Create a new chat session for the authenticated user.
@@ -29,15 +35,19 @@ async def create_session(
 
 @router.get(
     "/sessions",
-    summary="Get all chat sessions"
+    response_model=SessionListResponse,
+    summary="List chat sessions"
 )
 async def get_sessions(
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    limit: int = Query(DEFAULT_SESSION_PAGE_SIZE, ge=1, le=MAX_SESSION_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    current_user: Dict[str, Any] = Depends(get_token_user)
 ):
     """
-    Get all chat sessions for the authenticated user.
+    List the authenticated user's chat sessions, most recently updated first.
+    Returns titles and message counts only; use the messages endpoint for content.
     """
-    return await chat_controller.get_user_sessions(current_user)
+    return await chat_controller.get_user_sessions(current_user, limit, cursor)
 
 @router.get(
     "/sessions/{session_id}",
@@ -45,20 +55,36 @@ async def get_sessions(
 )
 async def get_session(
     session_id: str,
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(get_token_user)
 ):
     """
     Get a specific chat session with all messages.
     """
     return await chat_controller.get_session(session_id, current_user)
 
+@router.get(
+    "/sessions/{session_id}/messages",
+    response_model=MessagePageResponse,
+    summary="Get a page of session messages"
+)
+async def get_session_messages(
+    session_id: str,
+    limit: int = Query(DEFAULT_MESSAGE_PAGE_SIZE, ge=1, le=MAX_MESSAGE_PAGE_SIZE),
+    before: Optional[int] = Query(None, ge=0, description="seq of the oldest message already loaded"),
+    current_user: Dict[str, Any] = Depends(get_token_user)
+):
+    """
+    Get messages of a chat session in chronological order, newest page first.
+    """
+    return await chat_controller.get_session_messages(session_id, current_user, limit, before)
+
 @router.delete(
     "/sessions/{session_id}",
     summary="Delete a chat session"
 )
 async def delete_session(
     session_id: str,
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(get_token_user)
 ):
     """
     Delete a chat session.
@@ -72,7 +98,7 @@ async def delete_session(
 async def update_session_title(
     session_id: str,
     request: Dict[str, str],
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(get_token_user)
 ):
     """
     Update the title of a chat session.
@@ -92,7 +118,7 @@ async def update_session_title(
 async def update_session_documents(
     session_id: str,
     documents: list[str] = Body(..., embed=True),
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(get_token_user)
 ):
     """
     Update the list of selected documents for a chat session.
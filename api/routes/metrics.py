@@ -0,0 +1,16 @@
+"""
+Metrics Routes
+Prometheus scrape endpoint.
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+from service.monitoring.metrics_service import metrics_service
+
+router = APIRouter(tags=["Monitoring"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus exposition format, aggregated across workers."""
+    return Response(content=metrics_service.render(), media_type=metrics_service.content_type)
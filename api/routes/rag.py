@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Body
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Body, BackgroundTasks
 from typing import Dict, Any, List, Optional
-from schema.rag_schema import DocumentPayload, QueryRequest, QueryResponse
+from schema.rag_schema import DocumentPayload, QueryRequest, QueryResponse, PrefetchRequest
 from controller.rag_controller import rag_controller
-from service.infrastructure.auth_service import get_current_user
+from service.infrastructure.auth_service import get_current_user, get_token_user
 
 router = APIRouter(
     prefix="/rag",
@@ -13,7 +13,7 @@ router = APIRouter(
 @router.post("/delete-documents", summary="Delete documents and their vectors for the user")
 async def delete_documents(
     filenames: list = Body(..., embed=True, description="List of filenames to delete"),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_user)
 ):
     """Delete documents and all related vector data for the user."""
     return await rag_controller.delete_documents(filenames, current_user)
@@ -36,6 +36,24 @@ async def upload_and_index_file(
     return await rag_controller.upload_and_index_file(file, current_user)
 
 
+@router.post(
+    "/upload-and-index/batch",
+    summary="Upload and index several files"
+)
+async def upload_and_index_files(
+    files: List[UploadFile] = File(..., description="Document files to be indexed (pdf, docx, html, md, txt)."),
+    current_user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    Accepts several files in one request, extracts them in parallel and indexes
+    them together. Returns a result per file; one failing file does not fail
+    the others.
+
+    This is a protected endpoint and requires authentication.
+    """
+    return await rag_controller.upload_and_index_files(files, current_user)
+
+
 @router.post(
     "/index",
     status_code=status.HTTP_201_CREATED,
@@ -61,6 +79,7 @@ async def index_document(
 )
 async def query_documents(
     query_request: QueryRequest,
+    background_tasks: BackgroundTasks,
     session_id: Optional[str] = Query(None, description="Session ID to save conversation"),
     documents: Optional[List[str]] = Query(None, description="List of document IDs to filter retrieval"),
     current_user: Dict[str, Any] = Depends(get_current_user)
@@ -73,11 +92,33 @@ async def query_documents(
     4.  **Generation**: Creates a final answer based on the context.
 
     Optionally provide session_id to save the conversation to a chat session.
+    The turn is saved after the response is sent.
     Optionally provide documents list to filter retrieval to specific documents.
 
     This is a protected endpoint and requires authentication.
     """
-    return await rag_controller.orchestrate_rag_flow(query_request, current_user, session_id, documents)
+    return await rag_controller.orchestrate_rag_flow(query_request, current_user, session_id, documents, background_tasks)
+
+
+@router.post(
+    "/prefetch",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Speculatively retrieve context for a draft query"
+)
+async def prefetch_documents(
+    prefetch_request: PrefetchRequest,
+    documents: Optional[List[str]] = Query(None, description="List of document IDs to filter retrieval"),
+    current_user: Dict[str, Any] = Depends(get_token_user)
+):
+    """
+    Accepts a draft query while the user is still typing (debounced by the client)
+    and runs embedding and retrieval in the background. A following `/rag/query`
+    with a close enough question and the same document filter reuses the result
+    instead of retrieving again.
+
+    This is a protected endpoint and requires authentication.
+    """
+    return await rag_controller.prefetch_retrieval(prefetch_request, current_user, documents)
 
 
 @router.get(
@@ -85,7 +126,7 @@ async def query_documents(
     summary="List all indexed documents"
 )
 async def list_documents(
-    current_user: Dict[str, Any] = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(get_token_user)
 ):
     """
     Returns a list of all indexed documents with their metadata.
@@ -3,7 +3,7 @@ Speech Routes
 API endpoints for speech-to-text and text-to-speech functionality.
 """
 
-from fastapi import APIRouter, Depends, UploadFile, File
+from fastapi import APIRouter, Depends, UploadFile, File, Query, WebSocket
 from fastapi.responses import StreamingResponse
 from typing import Dict, Any
 from pydantic import BaseModel, Field
@@ -96,6 +96,39 @@ async def text_to_speech(
     )
 
 
+@router.websocket("/to-audio/stream")
+async def stream_text_to_speech(
+    websocket: WebSocket,
+    target_language_code: str = Query("en-IN", description="Target language code"),
+    speaker: str = Query("anushka", description="Voice speaker name"),
+    pitch: float = Query(0, ge=-10, le=10, description="Voice pitch adjustment"),
+    pace: float = Query(1, ge=0.5, le=2, description="Speech pace/speed"),
+    loudness: float = Query(1, ge=0.5, le=2, description="Audio loudness")
+):
+    """
+    Convert text to speech while the text is still being written.
+    
+    A WebSocket, so text can be sent while audio is received. Send the access
+    token first as {"token": "..."}, then the text (Markdown allowed) as
+    {"text": "..."} messages as it is generated, e.g. an answer while it
+    arrives, and {"done": true} at the end. Each sentence is synthesized as
+    soon as it is complete, so audio starts after the first sentence rather
+    than after the whole text. Audio arrives as binary messages forming a
+    single WAV stream whose header leaves the length open, followed by
+    {"done": true}; errors arrive as {"error": "..."}.
+    
+    This is a protected endpoint and requires authentication.
+    """
+    await speech_controller.stream_text_to_speech(
+        websocket,
+        target_language_code=target_language_code,
+        speaker=speaker,
+        pitch=pitch,
+        pace=pace,
+        loudness=loudness
+    )
+
+
 @router.get(
     "/health",
     summary="Speech service health check"
@@ -23,7 +23,22 @@ class CreateSessionRequest(BaseModel):
     """Schema for creating a new chat session."""
     title: Optional[str] = Field(default="New Chat", description="Session title")
 
+class SessionSummary(BaseModel):
+    """Schema for a chat session in the listing (no messages)."""
+    session_id: str
+    title: str = "New Chat"
+    updated_at: str
+    message_count: int = 0
+
 class SessionListResponse(BaseModel):
-    """Schema for listing chat sessions."""
-    sessions: List[dict]
-    total: int
+    """Schema for one page of chat sessions."""
+    sessions: List[SessionSummary]
+    next_cursor: Optional[str] = Field(default=None, description="Cursor for the next page, if any")
+    has_more: bool = False
+
+class MessagePageResponse(BaseModel):
+    """Schema for one page of a session's messages."""
+    session_id: str
+    messages: List[dict]
+    message_count: int
+    has_more: bool = Field(default=False, description="Whether older messages exist")
@@ -15,6 +15,12 @@ class QueryRequest(BaseModel):
     response_style: Optional[str] = Field("auto", description="Response style: 'auto' (detect from query), 'detailed', 'concise', or 'balanced'")
     retrieval_multiplier: Optional[int] = Field(4, gt=1, le=10, description="Multiplier for initial retrieval pool size (retrieves top_k * multiplier before reranking)")
 
+class PrefetchRequest(BaseModel):
+    """Schema for a draft query sent while the user is still typing."""
+    query: str = Field(..., description="The partial (draft) question.")
+    top_k: int = Field(5, gt=0, le=15, description="The top_k the final query will use.")
+    retrieval_multiplier: Optional[int] = Field(4, gt=1, le=10, description="The retrieval multiplier the final query will use.")
+
 class SourceDocument(BaseModel):
     """Schema representing a source document chunk used for the answer."""
     id: str
@@ -6,4 +6,6 @@ class Token(BaseModel):
     token_type: str = "bearer"
 
 class TokenData(BaseModel):
-    user_id: Optional[str] = None
\ No newline at end of file
+    user_id: Optional[str] = None
+    username: Optional[str] = None
+    key_version: Optional[int] = None
\ No newline at end of file
@@ -0,0 +1,44 @@
+"""
+Migration: move embedded chat session messages into the `chat_messages` collection.
+
+Sessions are also migrated lazily the first time they are read or written, so
+running this is optional; it lets the old `messages` arrays be dropped up front
+instead of waiting for every session to be opened again. Safe to re-run and to
+run while the API is serving traffic.
+
+Run from the api/ directory:
+    python -m scripts.migrate_chat_messages [--dry-run]
+"""
+import argparse
+import asyncio
+
+from service.features.chat_session_service import chat_session_service
+from service.infrastructure.database_service import database_service
+
+
+async def main(dry_run: bool):
+    await database_service.connect()
+    collection = await chat_session_service.get_collection()
+    pending = {"messages": {"$exists": True}}
+
+    total = await collection.count_documents(pending)
+    print(f"{total} sessions with embedded messages")
+    if dry_run or not total:
+        return
+
+    sessions = moved = 0
+    # Snapshot the ids first; migrated sessions drop out of the query as we go
+    session_ids = [doc["session_id"] async for doc in collection.find(pending, {"_id": 0, "session_id": 1})]
+    for session_id in session_ids:
+        moved += await chat_session_service.migrate_embedded_messages(session_id)
+        sessions += 1
+        if sessions % 100 == 0:
+            print(f"  {sessions}/{len(session_ids)} sessions, {moved} messages")
+    print(f"Migrated {moved} messages from {sessions} sessions")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Only count sessions that still need migrating")
+    args = parser.parse_args()
+    asyncio.run(main(args.dry_run))
@@ -1,22 +1,99 @@
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+import asyncio
+import base64
+import binascii
+import json
 import uuid
 from service.infrastructure.database_service import database_service
+from lib.tracing import traced
 
 logger = logging.getLogger(__name__)
 
+# Sidebar listing page size (default and upper bound)
+DEFAULT_SESSION_PAGE_SIZE = 30
+MAX_SESSION_PAGE_SIZE = 100
+# Message history page size (default and upper bound)
+DEFAULT_MESSAGE_PAGE_SIZE = 50
+MAX_MESSAGE_PAGE_SIZE = 200
+
+# Listing projection: everything the sidebar needs, never the messages themselves
+SESSION_SUMMARY_PROJECTION = {
+    "_id": 0,
+    "session_id": 1,
+    "title": 1,
+    "updated_at": 1,
+    # Sessions not yet migrated to chat_messages still carry an embedded array
+    "message_count": {"$ifNull": ["$message_count", {"$size": {"$ifNull": ["$messages", []]}}]},
+}
+
+# Session fields needed to read or extend its history (never the embedded array itself)
+SESSION_STATE_PROJECTION = {
+    "_id": 0,
+    "message_count": 1,
+    "summary": 1,
+    "summarized_count": 1,
+    "embedded_messages": {"$isArray": "$messages"},
+}
+
+# Message fields returned to callers
+MESSAGE_PROJECTION = {"_id": 0, "session_id": 0}
+
+# Duplicate key error code; a concurrent migration already inserted the row
+DUPLICATE_KEY_ERROR = 11000
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_session_cursor(updated_at: str, session_id: str) -> str:
+    """Opaque cursor pointing just after (updated_at, session_id) in listing order."""
+    raw = json.dumps([updated_at, session_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_session_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        updated_at, session_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise InvalidCursorError("Invalid cursor") from e
+    if not isinstance(updated_at, str) or not isinstance(session_id, str):
+        raise InvalidCursorError("Invalid cursor")
+    return updated_at, session_id
+
+
 class ChatSessionService:
-    """Service for managing user chat sessions using MongoDB."""
+    """
+    Service for managing user chat sessions using MongoDB.
+
+    Session metadata lives in `chat_sessions`; messages live one per document
+    in `chat_messages`, keyed by (session_id, seq). `seq` is the message's
+    position in the conversation and is reserved by incrementing the session's
+    `message_count`, so appends never rewrite earlier messages and history
+    reads only touch the tail they need. Sessions created before the split
+    still hold an embedded `messages` array and are migrated on first access.
+    """
     
     def __init__(self):
-        pass
+        # Background title generations, kept referenced until they finish
+        self._tasks: set = set()
 
     async def get_collection(self):
         if database_service.db is None:
             await database_service.connect()
         return database_service.db.chat_sessions
+
+    async def get_messages_collection(self):
+        if database_service.db is None:
+            await database_service.connect()
+        return database_service.db.chat_messages
     
+    @traced("mongo.chat_sessions.create")
     async def create_session(self, username: str, title: str = "New Chat") -> Dict[str, Any]:
         """Create a new chat session for a user."""
         try:
@@ -27,13 +104,14 @@ class ChatSessionService:
                 "session_id": session_id,
                 "username": username,
                 "title": title,
-                "messages": [],
+                "message_count": 0,
                 "created_at": datetime.now().isoformat(),
                 "updated_at": datetime.now().isoformat()
             }
             
             await collection.insert_one(session)
             session.pop("_id", None)
+            session["messages"] = []
             
             logger.info(f"Created new session {session_id} for user {username}")
             return session
@@ -41,93 +119,296 @@ class ChatSessionService:
             logger.error(f"Error creating session: {e}")
             return {}
     
-    async def get_user_sessions(self, username: str) -> List[Dict[str, Any]]:
-        """Get all sessions for a specific user."""
-        try:
-            collection = await self.get_collection()
-            cursor = collection.find({"username": username}).sort("updated_at", -1)
-            
-            sessions = []
-            async for sess in cursor:
-                sess.pop("_id", None)
-                sessions.append(sess)
-            return sessions
-        except Exception as e:
-            logger.error(f"Error getting sessions for {username}: {e}")
-            return []
-    
+    @traced("mongo.chat_sessions.list")
+    async def list_user_sessions(
+        self,
+        username: str,
+        limit: int = DEFAULT_SESSION_PAGE_SIZE,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        One page of a user's sessions, most recently updated first.
+
+        Only the summary fields are returned (session_id, title, updated_at and
+        message_count). Pages are keyed on (updated_at, session_id) and served
+        from the (username, updated_at, session_id) index, so later pages cost
+        the same as the first.
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed
+        """
+        limit = max(1, min(limit, MAX_SESSION_PAGE_SIZE))
+        query: Dict[str, Any] = {"username": username}
+        if cursor:
+            updated_at, session_id = decode_session_cursor(cursor)
+            query["$or"] = [
+                {"updated_at": {"$lt": updated_at}},
+                {"updated_at": updated_at, "session_id": {"$lt": session_id}},
+            ]
+
+        collection = await self.get_collection()
+        # Fetch one extra row to learn whether another page exists
+        documents = await collection.find(query, SESSION_SUMMARY_PROJECTION) \
+            .sort([("updated_at", -1), ("session_id", -1)]) \
+            .limit(limit + 1) \
+            .to_list(length=limit + 1)
+
+        sessions = documents[:limit]
+        next_cursor = None
+        if len(documents) > limit:
+            last = sessions[-1]
+            next_cursor = encode_session_cursor(last["updated_at"], last["session_id"])
+        return {"sessions": sessions, "next_cursor": next_cursor, "has_more": next_cursor is not None}
+
+    @traced("mongo.chat_messages.migrate")
+    async def migrate_embedded_messages(self, session_id: str) -> int:
+        """
+        Moves a session's embedded `messages` array into `chat_messages`.
+
+        Message positions become their `seq`, so `summarized_count` keeps
+        pointing at the same messages. Safe to run concurrently or repeatedly:
+        rows that already exist are skipped and the array is only removed once.
+        Returns the session's message count after migration.
+        """
+        collection = await self.get_collection()
+        session = await collection.find_one({"session_id": session_id}, {"_id": 0, "messages": 1, "message_count": 1})
+        if session is None:
+            return 0
+        if "messages" not in session:
+            # Already migrated (possibly by a concurrent request)
+            return session.get("message_count", 0)
+
+        messages = session.get("messages") or []
+        if messages:
+            messages_collection = await self.get_messages_collection()
+            rows = [{**message, "session_id": session_id, "seq": seq} for seq, message in enumerate(messages)]
+            try:
+                await messages_collection.insert_many(rows, ordered=False)
+            except BulkWriteError as e:
+                if any(error.get("code") != DUPLICATE_KEY_ERROR for error in e.details.get("writeErrors", [])):
+                    raise
+
+        await collection.update_one(
+            {"session_id": session_id, "messages": {"$exists": True}},
+            {"$set": {"message_count": len(messages)}, "$unset": {"messages": ""}}
+        )
+        logger.info(f"Migrated {len(messages)} embedded messages for session {session_id}")
+        return len(messages)
+
+    @traced("mongo.chat_sessions.state")
+    async def get_session_state(self, session_id: str, username: str) -> Optional[Dict[str, Any]]:
+        """
+        Message count and running summary of a session, without any messages.
+        Returns None if the session does not exist or belongs to someone else.
+        """
+        collection = await self.get_collection()
+        state = await collection.find_one({"session_id": session_id, "username": username}, SESSION_STATE_PROJECTION)
+        if state is None:
+            return None
+        if state.pop("embedded_messages", False):
+            state["message_count"] = await self.migrate_embedded_messages(session_id)
+        state.setdefault("message_count", 0)
+        return state
+
+    @traced("mongo.chat_messages.range")
+    async def get_messages_range(self, session_id: str, start: int = 0, end: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Messages with start <= seq < end in conversation order (callers check ownership)."""
+        seq_filter: Dict[str, Any] = {"$gte": max(0, start)}
+        if end is not None:
+            if end <= start:
+                return []
+            seq_filter["$lt"] = end
+        messages_collection = await self.get_messages_collection()
+        cursor = messages_collection.find({"session_id": session_id, "seq": seq_filter}, MESSAGE_PROJECTION).sort("seq", 1)
+        return await cursor.to_list(length=None)
+
+    @traced("mongo.chat_messages.page")
+    async def get_messages_page(
+        self,
+        session_id: str,
+        username: str,
+        limit: int = DEFAULT_MESSAGE_PAGE_SIZE,
+        before: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        One page of a session's messages in chronological order.
+
+        Without `before` the newest `limit` messages are returned; pass the
+        `seq` of the oldest message already loaded to page further back.
+        Returns None if the session does not exist or belongs to someone else.
+        """
+        limit = max(1, min(limit, MAX_MESSAGE_PAGE_SIZE))
+        state = await self.get_session_state(session_id, username)
+        if state is None:
+            return None
+
+        total = state["message_count"]
+        end = total if before is None else min(before, total)
+        page = await self.get_messages_range(session_id, max(0, end - limit), end)
+        return {
+            "session_id": session_id,
+            "messages": page,
+            "message_count": total,
+            "has_more": bool(page) and page[0]["seq"] > 0,
+        }
+
+    @traced("mongo.chat_sessions.get")
     async def get_session(self, session_id: str, username: str) -> Optional[Dict[str, Any]]:
-        """Get a specific session if it belongs to the user."""
+        """Get a specific session, with its full message history, if it belongs to the user."""
         try:
             collection = await self.get_collection()
-            session = await collection.find_one({"session_id": session_id, "username": username})
-            if session:
-                session.pop("_id", None)
-                return session
-            return None
+            session = await collection.find_one({"session_id": session_id, "username": username}, {"_id": 0})
+            if not session:
+                return None
+            if "messages" in session:
+                await self.migrate_embedded_messages(session_id)
+                session.pop("messages")
+            session["messages"] = await self.get_messages_range(session_id)
+            session["message_count"] = len(session["messages"])
+            return session
         except Exception as e:
             logger.error(f"Error getting session {session_id}: {e}")
             return None
     
-    async def add_message(self, session_id: str, username: str, role: str, content: str, sources: Optional[List[dict]] = None) -> bool:
-        """Add a message to a session."""
+    async def _reserve_seq(self, session_id: str, username: str, count: int) -> Optional[Dict[str, Any]]:
+        """
+        Claims `count` consecutive seq numbers and bumps updated_at in one update.
+        Returns {"first_seq", "title"}, or None if the session is missing.
+        """
+        collection = await self.get_collection()
+        for _ in range(2):
+            session = await collection.find_one_and_update(
+                {"session_id": session_id, "username": username, "messages": {"$exists": False}},
+                {"$inc": {"message_count": count}, "$set": {"updated_at": datetime.now().isoformat()}},
+                projection={"_id": 0, "message_count": 1, "title": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if session is not None:
+                return {"first_seq": session["message_count"] - count, "title": session.get("title")}
+            # Either missing or still embedded; migrate and try once more
+            if not await collection.count_documents({"session_id": session_id, "username": username}, limit=1):
+                return None
+            await self.migrate_embedded_messages(session_id)
+        return None
+
+    async def _append(self, session_id: str, username: str, messages: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Reserves seq numbers for `messages` and inserts them in a single batch."""
+        reserved = await self._reserve_seq(session_id, username, len(messages))
+        if reserved is None:
+            return None
+
+        timestamp = datetime.now().isoformat()
+        rows = [
+            {
+                "session_id": session_id,
+                "seq": reserved["first_seq"] + offset,
+                "role": message["role"],
+                "content": message["content"],
+                "timestamp": timestamp,
+                "sources": message.get("sources")
+            }
+            for offset, message in enumerate(messages)
+        ]
+        messages_collection = await self.get_messages_collection()
         try:
+            await messages_collection.insert_many(rows, ordered=True)
+        except Exception:
+            await self._release_seq(session_id, username, reserved["first_seq"], len(messages))
+            raise
+        return reserved
+
+    async def _release_seq(self, session_id: str, username: str, first_seq: int, count: int):
+        """
+        Undoes a reservation whose insert failed: removes any rows that made it
+        in and gives the seq numbers back, unless a later reservation already
+        follows them (the gap is then left; readers query seq ranges).
+        """
+        try:
+            messages_collection = await self.get_messages_collection()
+            await messages_collection.delete_many(
+                {"session_id": session_id, "seq": {"$gte": first_seq, "$lt": first_seq + count}}
+            )
             collection = await self.get_collection()
-            
-            # Create message object
-            message = {
-                "role": role,
-                "content": content,
-                "timestamp": datetime.now().isoformat(),
-                "sources": sources
-            }
-            
-            # Update operation
-            update_ops = {
-                "$push": {"messages": message},
-                "$set": {"updated_at": datetime.now().isoformat()}
-            }
-            
-            # Logic to update title on first user message
-            # REMOVED: Managed explicitly by controller to ensure correct API key usage
-            
             result = await collection.update_one(
-                {"session_id": session_id, "username": username},
-                update_ops
+                {"session_id": session_id, "username": username, "message_count": first_seq + count},
+                {"$inc": {"message_count": -count}}
             )
-            
-            return result.modified_count > 0
+            if result.modified_count == 0:
+                logger.warning(f"Could not release seq {first_seq}-{first_seq + count - 1} of session {session_id}; leaving a gap")
+        except Exception as e:
+            logger.error(f"Error releasing seq {first_seq}-{first_seq + count - 1} of session {session_id}: {e}")
+
+    @traced("mongo.chat_messages.append")
+    async def add_message(self, session_id: str, username: str, role: str, content: str, sources: Optional[List[dict]] = None) -> bool:
+        """Append a message to a session."""
+        try:
+            return await self._append(session_id, username, [{"role": role, "content": content, "sources": sources}]) is not None
         except Exception as e:
             logger.error(f"Error adding message to {session_id}: {e}")
             return False
-            
-    async def update_session_title_if_needed(self, session_id: str, username: str, content: str, api_keys: Dict[str, str] = {}):
-        """Helper to update title if it's currently 'New Chat'."""
+
+    @traced("mongo.chat_messages.record_turn")
+    async def record_turn(
+        self,
+        session_id: str,
+        username: str,
+        query: str,
+        answer: str,
+        sources: Optional[List[dict]] = None,
+        api_keys: Dict[str, str] = {}
+    ) -> bool:
+        """
+        Saves a question and its answer as one turn.
+
+        The session update (seq reservation, updated_at, and reading the current
+        title) is a single find_one_and_update and both messages go in one
+        insert_many, so the pair is always stored adjacently and in order.
+        If the insert fails the reservation is rolled back.
+        A session still titled 'New Chat' is named in the background.
+        """
         try:
+            reserved = await self._append(session_id, username, [
+                {"role": "user", "content": query},
+                {"role": "assistant", "content": answer, "sources": sources},
+            ])
+        except Exception as e:
+            logger.error(f"Error saving turn to session {session_id}: {e}")
+            return False
+
+        if reserved is None:
+            return False
+        if reserved["title"] == "New Chat":
+            self.schedule_auto_title(session_id, username, query, api_keys)
+        return True
+
+    def schedule_auto_title(self, session_id: str, username: str, content: str, api_keys: Dict[str, str] = {}):
+        """Fire-and-forget title generation for a session still named 'New Chat'."""
+        task = asyncio.create_task(self._auto_title(session_id, username, content, dict(api_keys)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @traced("chat.auto_title")
+    async def _auto_title(self, session_id: str, username: str, content: str, api_keys: Dict[str, str]):
+        """Names a session from its first query unless it was renamed meanwhile."""
+        from service.rag.llm_gateway import llm_gateway
+
+        try:
+            new_title = await llm_gateway.generate_chat_title(content, api_keys=api_keys)
+            if not new_title or new_title == "New Chat":
+                return
+
             collection = await self.get_collection()
-            session = await collection.find_one({"session_id": session_id, "username": username})
-            
-            if session and session.get("title") == "New Chat":
-                from service.rag.gemini_service import gemini_service
-                from service.rag.groq_service import groq_service
-                
-                groq_key = api_keys.get("groq_api_key") if isinstance(api_keys, dict) else None
-                google_key = api_keys.get("google_api_key") if isinstance(api_keys, dict) else api_keys
-                
-                if groq_key:
-                    new_title = await groq_service.generate_chat_title(content, api_key=groq_key)
-                else:
-                    new_title = await gemini_service.generate_chat_title(content, api_key=google_key)
-                
-                if new_title and new_title != "New Chat":
-                    await collection.update_one(
-                        {"session_id": session_id},
-                        {"$set": {"title": new_title, "updated_at": datetime.now().isoformat()}}
-                    )
-                    logger.info(f"Auto-named session {session_id} to '{new_title}'")
+            # Guard on the placeholder so a manual rename or a concurrent task wins
+            result = await collection.update_one(
+                {"session_id": session_id, "username": username, "title": "New Chat"},
+                {"$set": {"title": new_title, "updated_at": datetime.now().isoformat()}}
+            )
+            if result.modified_count > 0:
+                logger.info(f"Auto-named session {session_id} to '{new_title}'")
         except Exception as e:
             logger.error(f"Error updating title: {e}")
     
+    @traced("mongo.chat_sessions.delete")
     async def delete_session(self, session_id: str, username: str) -> bool:
         """Delete a session if it belongs to the user."""
         try:
@@ -135,6 +416,8 @@ class ChatSessionService:
             result = await collection.delete_one({"session_id": session_id, "username": username})
             
             if result.deleted_count > 0:
+                messages_collection = await self.get_messages_collection()
+                await messages_collection.delete_many({"session_id": session_id})
                 logger.info(f"Deleted session {session_id} for user {username}")
                 return True
             return False
@@ -142,6 +425,7 @@ class ChatSessionService:
             logger.error(f"Error deleting session: {e}")
             return False
     
+    @traced("mongo.chat_sessions.update_title")
     async def update_session_title(self, session_id: str, username: str, title: str) -> bool:
         """Update session title."""
         try:
@@ -155,6 +439,7 @@ class ChatSessionService:
             logger.error(f"Error updating session title: {e}")
             return False
 
+    @traced("mongo.chat_sessions.update_documents")
     async def update_session_documents(self, session_id: str, username: str, documents: List[str]) -> bool:
         """Update selected documents for a session."""
         try:
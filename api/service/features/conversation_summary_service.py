@@ -0,0 +1,150 @@
+import asyncio
+import logging
+from typing import Dict, List, Any, Optional
+from datetime import datetime
+from service.infrastructure.database_service import database_service
+from service.features.chat_session_service import chat_session_service
+
+logger = logging.getLogger(__name__)
+
+# Number of most recent messages always sent verbatim to the generation prompt;
+# older ones stay verbatim too until they are folded into the summary
+RECENT_MESSAGES = 6
+# Only fold once this many messages have aged out of the recent window,
+# so the summarizer runs every couple of turns rather than on every message
+MIN_MESSAGES_TO_FOLD = 4
+# Answers are clipped before summarizing; the summary only needs their gist
+MAX_MESSAGE_CHARS = 1500
+# Bound on unsummarized messages read when folds keep failing; the context
+# packer trims history to its token budget long before this
+MAX_UNSUMMARIZED_MESSAGES = 50
+
+
+class ConversationSummaryService:
+    """
+    Maintains an incremental running summary per chat session.
+
+    The summary and the number of messages folded into it are stored on the
+    `chat_sessions` document (`summary`, `summarized_count`); since messages
+    are numbered from 0 by `seq`, `summarized_count` is also the first seq not
+    yet covered by the summary. Updates run as
+    background tasks after the assistant message is saved, never in the
+    request path.
+    """
+
+    def __init__(self):
+        self._tasks: set = set()
+        self._active_sessions: set = set()
+
+    async def get_collection(self):
+        if database_service.db is None:
+            await database_service.connect()
+        return database_service.db.chat_sessions
+
+    async def load_history(self, session_id: str, username: str) -> Dict[str, Any]:
+        """
+        The running summary plus every message not yet covered by it, so
+        messages waiting to be folded (or whose fold failed) are not lost.
+        Only the tail of the conversation is read from `chat_messages`.
+        """
+        history = {"summary": "", "recent_messages": []}
+        try:
+            state = await chat_session_service.get_session_state(session_id, username)
+            if not state or not state["message_count"]:
+                return history
+
+            total = state["message_count"]
+            start = max(state.get("summarized_count", 0), total - MAX_UNSUMMARIZED_MESSAGES)
+            history["summary"] = state.get("summary") or ""
+            history["recent_messages"] = await chat_session_service.get_messages_range(session_id, start, total)
+        except Exception as e:
+            logger.error(f"Error loading history for session {session_id}: {e}")
+        return history
+
+    def schedule_update(self, session_id: str, username: str, api_keys: Dict[str, str] = {}):
+        """Fire-and-forget summary refresh for a session."""
+        if session_id in self._active_sessions:
+            # A fold is already running; the next turn will pick up the remainder
+            return
+        task = asyncio.create_task(self.update_summary(session_id, username, dict(api_keys)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def update_summary(self, session_id: str, username: str, api_keys: Dict[str, str] = {}) -> bool:
+        """
+        Folds messages that have aged out of the recent window into the session summary.
+        Returns True if the summary was updated.
+        """
+        if session_id in self._active_sessions:
+            return False
+        self._active_sessions.add(session_id)
+
+        try:
+            session = await chat_session_service.get_session_state(session_id, username)
+            if not session:
+                return False
+
+            summarized_count = session.get("summarized_count", 0)
+            fold_until = session["message_count"] - RECENT_MESSAGES
+
+            if fold_until - summarized_count < MIN_MESSAGES_TO_FOLD:
+                return False
+
+            new_summary = await self._summarize(
+                session.get("summary") or "",
+                await chat_session_service.get_messages_range(session_id, summarized_count, fold_until),
+                api_keys
+            )
+            collection = await self.get_collection()
+            if not new_summary:
+                return False
+
+            # Guard on summarized_count so a concurrent fold from another worker wins cleanly
+            result = await collection.update_one(
+                {"session_id": session_id, "username": username, "summarized_count": session.get("summarized_count")},
+                {"$set": {
+                    "summary": new_summary,
+                    "summarized_count": fold_until,
+                    "summary_updated_at": datetime.now().isoformat()
+                }}
+            )
+            if result.modified_count > 0:
+                logger.info(f"Folded messages {summarized_count}-{fold_until} into summary for session {session_id}")
+                return True
+            return False
+
+        except Exception as e:
+            logger.error(f"Error updating summary for session {session_id}: {e}")
+            return False
+        finally:
+            self._active_sessions.discard(session_id)
+
+    async def _summarize(self, previous_summary: str, messages: List[Dict[str, Any]], api_keys: Dict[str, str]) -> Optional[str]:
+        """Asks the LLM to merge new messages into the existing summary."""
+        from service.rag.llm_gateway import llm_gateway, LLMGatewayError
+
+        transcript = []
+        for msg in messages:
+            role = "User" if msg.get("role") == "user" else "Assistant"
+            content = (msg.get("content") or "")[:MAX_MESSAGE_CHARS]
+            transcript.append(f"{role}: {content}")
+
+        prompt = (
+            "You maintain a running summary of a conversation between a user and an assistant "
+            "answering questions about the user's documents.\n"
+            "Update the summary with the new messages. Keep facts, names, figures, decisions and "
+            "open questions the user may refer back to. Write at most 200 words of plain prose.\n\n"
+            f"Current summary:\n{previous_summary or '(none)'}\n\n"
+            "New messages:\n" + "\n".join(transcript) + "\n\nUpdated summary:"
+        )
+
+        try:
+            summary = await llm_gateway.generate(prompt, api_keys=api_keys, operation="summary", provider="groq")
+        except LLMGatewayError as e:
+            logger.warning(f"Summary generation failed: {e}")
+            return None
+        return summary.strip()
+
+
+# Singleton instance
+conversation_summary_service = ConversationSummaryService()
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import re
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from lib.config import settings
+from service.features.user_documents_service import user_documents_service
+from service.rag.ingestion_store_service import ingestion_store_service
+from service.infrastructure.rate_limit_service import rate_limit_service, RateLimitExceeded
+
+logger = logging.getLogger(__name__)
+
+# Background workers generating descriptions (each makes one LLM call at a time)
+DESCRIPTION_WORKERS = 2
+# Pending jobs kept in memory; beyond this the placeholder is kept for good
+MAX_PENDING_JOBS = 1000
+# The LLM only ever sees the start of a document, so only that much is queued
+DESCRIPTION_SOURCE_CHARS = 2000
+# Rate-limited jobs wait and retry this many times before giving up
+MAX_RATE_LIMIT_RETRIES = 5
+
+# Extractive placeholder: leading sentences, within this many characters
+PLACEHOLDER_MAX_CHARS = 300
+PLACEHOLDER_MIN_SENTENCE_CHARS = 30
+
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?])\s+")
+MARKDOWN_LINK_PATTERN = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+MARKUP_PATTERN = re.compile(r"[#>*_`|]+")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+class DocumentDescriptionService:
+    """
+    Fills in document descriptions after indexing.
+
+    Uploads are stored with an instant extractive placeholder (the leading
+    sentences of the text) and `description_status: "pending"`, so they are
+    queryable as soon as their vectors land. A small pool of background
+    workers then replaces the placeholder with an LLM-written description
+    (`"ready"`). When none can be had (LLM failure, rate limiting, full queue)
+    the placeholder is kept as the final description (`"placeholder"`).
+    Jobs live in memory: after a restart, pending documents keep their
+    placeholder.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        # Background status writes, referenced so they are not garbage collected mid-flight
+        self._tasks: set = set()
+
+    def placeholder(self, content: str) -> str:
+        """Cheap extractive summary: the first substantial sentences of the text."""
+        text = MARKDOWN_LINK_PATTERN.sub(r"\1", content[:DESCRIPTION_SOURCE_CHARS])
+        text = WHITESPACE_PATTERN.sub(" ", MARKUP_PATTERN.sub(" ", text)).strip()
+
+        summary = ""
+        for sentence in SENTENCE_SPLIT_PATTERN.split(text):
+            if len(sentence) < PLACEHOLDER_MIN_SENTENCE_CHARS:
+                continue
+            candidate = f"{summary} {sentence}".strip()
+            if len(candidate) > PLACEHOLDER_MAX_CHARS:
+                break
+            summary = candidate
+
+        if not summary:
+            summary = text if len(text) <= PLACEHOLDER_MAX_CHARS else text[:PLACEHOLDER_MAX_CHARS].rsplit(" ", 1)[0] + "..."
+        return summary or "No description available."
+
+    def new_job_id(self) -> str:
+        return uuid.uuid4().hex
+
+    def schedule(self, username: str, documents: List[Tuple[str, str, str, str, Optional[str]]], api_keys: Dict[str, str]):
+        """
+        Queues description generation for (filename, title, content, job_id,
+        content_hash) documents. job_id must match the `description_job` stored
+        on the record, so a document replaced in the meantime is never
+        overwritten. With a content_hash, the description is also saved to the
+        ingestion store for later uploads of the same file.
+        """
+        if not documents:
+            return
+        self._ensure_workers()
+        job = (
+            username,
+            [
+                (filename, title, content[:DESCRIPTION_SOURCE_CHARS], job_id, content_hash)
+                for filename, title, content, job_id, content_hash in documents
+            ],
+            dict(api_keys),
+        )
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            logger.warning(f"Description queue full; keeping placeholders for {len(documents)} documents of '{username}'")
+            task = asyncio.create_task(self._keep_placeholders(username, job[1]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _ensure_workers(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=MAX_PENDING_JOBS)
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < DESCRIPTION_WORKERS:
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    async def _worker(self):
+        while True:
+            username, documents, api_keys = await self._queue.get()
+            try:
+                await self._describe(username, documents, api_keys)
+            except Exception as e:
+                logger.error(f"Description job for '{username}' failed: {e}")
+                await self._keep_placeholders(username, documents)
+            finally:
+                self._queue.task_done()
+
+    async def _describe(self, username: str, documents: List[Tuple[str, str, str, str, Optional[str]]], api_keys: Dict[str, str]):
+        from service.rag.llm_gateway import llm_gateway
+
+        # The key the gateway will try first (Groq preferred), own keys before server keys
+        provider_key = api_keys.get("groq_api_key") or api_keys.get("google_api_key") or settings.groq_api_key or settings.google_api_key
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            try:
+                # Same per-user and per-key budget as request-path LLM calls
+                async with rate_limit_service.llm_quota(username, provider_key):
+                    if len(documents) == 1:
+                        _, title, content, _, _ = documents[0]
+                        descriptions = [await llm_gateway.generate_description(content=content, title=title, api_keys=api_keys)]
+                    else:
+                        descriptions = await llm_gateway.generate_descriptions(
+                            [(title, content) for _, title, content, _, _ in documents], api_keys=api_keys
+                        )
+                break
+            except RateLimitExceeded as e:
+                if attempt == MAX_RATE_LIMIT_RETRIES:
+                    logger.warning(f"Giving up on descriptions for '{username}' after repeated rate limiting")
+                    await self._keep_placeholders(username, documents)
+                    return
+                await asyncio.sleep(e.retry_after)
+
+        updated = 0
+        undescribed = []
+        for document, description in zip(documents, descriptions):
+            filename, _, _, job_id, content_hash = document
+            if description and description != "No description available.":
+                updated += await user_documents_service.set_description(username, filename, job_id, description)
+                if content_hash:
+                    await ingestion_store_service.set_description(content_hash, description)
+            else:
+                undescribed.append(document)
+        await self._keep_placeholders(username, undescribed)
+        logger.info(f"Filled in {updated}/{len(documents)} descriptions for '{username}'")
+
+    async def _keep_placeholders(self, username: str, documents: List[Tuple[str, str, str, str, Optional[str]]]):
+        """Settles documents that will get no LLM description on their placeholder."""
+        await user_documents_service.keep_placeholders(username, [(filename, job_id) for filename, _, _, job_id, _ in documents])
+
+    async def stop(self):
+        """Cancels the workers (application shutdown); pending documents keep their placeholder."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+
+# Singleton instance
+document_description_service = DocumentDescriptionService()
@@ -1,7 +1,19 @@
+import asyncio
+import hashlib
+import importlib.util
 import io
+import mmap
+import multiprocessing
+import os
+import signal
+import tempfile
 import markdown
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager, contextmanager
 from pathlib import Path
-from typing import Dict
+from typing import BinaryIO, Deque, Dict, Iterator, Optional, Set, Tuple, Union
 
 from bs4 import BeautifulSoup
 from docx import Document
@@ -11,51 +23,466 @@ import logging
 
 import re
 
-import logging
+from lib.config import settings
+from lib.text_normalization import linkify_urls
 
 logger = logging.getLogger(__name__)
 
-# Regex to find URLs that are NOT already in Markdown link format
-# Negative lookbehind (?<!\]\() ensures we don't match (http...) part of existing [text](http...)
-URL_PATTERN = re.compile(r'(?<!\]\()(https?://[^\s<>"]+|www\.[^\s<>"]+)')
+# Uploads are copied out of the request in chunks of this size
+SPOOL_CHUNK_BYTES = 1024 * 1024
+# Uploads up to this size are spooled in memory; larger ones go to a temp file
+SPOOL_MEMORY_BYTES = 1024 * 1024
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".html", ".md", ".txt")
+
+# Bump whenever an extractor's output changes, so neither cached text nor
+# stored ingestions (see RAGService.index_pipeline) are reused
+EXTRACTOR_VERSION = 1
+# After eviction the cache is trimmed to this fraction of its size limit
+CACHE_LOW_WATER = 0.9
+
+# lxml parses HTML several times faster than html.parser, which stays as the
+# fallback for environments installed without it
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") is not None else "html.parser"
+
+# WordprocessingML element tags, matched directly while walking DOCX bodies
+W_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+R_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+W_P, W_TBL, W_TR, W_TC = W_NAMESPACE + "p", W_NAMESPACE + "tbl", W_NAMESPACE + "tr", W_NAMESPACE + "tc"
+W_R, W_T, W_HYPERLINK = W_NAMESPACE + "r", W_NAMESPACE + "t", W_NAMESPACE + "hyperlink"
+
+class SpooledUpload:
+    """
+    An upload copied out of the request in fixed-size chunks and hashed on the
+    way. Small files stay in memory; larger ones roll over to an anonymous temp
+    file, so a file is never held whole in RAM just to be parsed. Close it (or
+    use it as a context manager) when done.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.size = 0
+        self._hasher = hashlib.sha256()
+        self._file: BinaryIO = io.BytesIO()
+        self._on_disk = False
+
+    @classmethod
+    def from_path(cls, filename: str, path: str) -> "SpooledUpload":
+        """Opens an on-disk spool by path (extraction worker processes; not hashed)."""
+        upload = cls(filename)
+        upload._file = open(path, "rb")
+        upload._on_disk = True
+        upload.size = os.fstat(upload._file.fileno()).st_size
+        return upload
+
+    @classmethod
+    def from_bytes(cls, filename: str, contents: bytes) -> "SpooledUpload":
+        upload = cls(filename)
+        upload.size = len(contents)
+        upload._hasher.update(contents)
+        upload._file = io.BytesIO(contents)
+        return upload
+
+    @property
+    def content_hash(self) -> str:
+        """sha256 of the upload, computed while it was streamed in."""
+        return self._hasher.hexdigest()
+
+    def write(self, chunk: bytes):
+        if not self._on_disk and self.size + len(chunk) > SPOOL_MEMORY_BYTES:
+            # Named, so extraction worker processes can open it; removed on close
+            disk = tempfile.NamedTemporaryFile(prefix="upload-", suffix=Path(self.filename).suffix)
+            disk.write(self._file.getbuffer())
+            self._file = disk
+            self._on_disk = True
+        self._file.write(chunk)
+        self._hasher.update(chunk)
+        self.size += len(chunk)
+
+    @property
+    def path(self) -> Optional[str]:
+        """Path of the on-disk spool, or None while the upload is held in memory."""
+        if not self._on_disk:
+            return None
+        self._file.flush()
+        return self._file.name
+
+    def getvalue(self) -> bytes:
+        """Copy of an in-memory upload (small by construction)."""
+        return self._file.getvalue()
+
+    def open(self) -> BinaryIO:
+        """The spooled file, rewound, for parsers that read or seek through a file object."""
+        self._file.seek(0)
+        return self._file
+
+    @contextmanager
+    def view(self):
+        """Zero-copy buffer over the whole upload: an mmap of the temp file, or the memory buffer."""
+        if self._on_disk:
+            self._file.flush()
+            with mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+        else:
+            with self._file.getbuffer() as buffer:
+                yield buffer
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ByteBudget:
+    """
+    Bounds the bytes of uploads being processed at once across all requests.
+    Uploads that do not fit wait their turn (first come, first served) instead
+    of being rejected; one upload larger than the whole budget runs alone.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_use = 0
+        self._waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+
+    @asynccontextmanager
+    async def reserve(self, size: int):
+        size = min(size, self.capacity)
+        await self._acquire(size)
+        try:
+            yield
+        finally:
+            self._release(size)
+
+    async def _acquire(self, size: int):
+        if not self._waiters and self.in_use + size <= self.capacity:
+            self.in_use += size
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append((size, waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as the request was cancelled: hand the bytes back
+                self._release(size)
+            else:
+                if (size, waiter) in self._waiters:
+                    self._waiters.remove((size, waiter))
+                self._wake()
+            raise
+
+    def _release(self, size: int):
+        self.in_use -= size
+        self._wake()
+
+    def _wake(self):
+        while self._waiters:
+            size, waiter = self._waiters[0]
+            if waiter.cancelled():
+                self._waiters.popleft()
+                continue
+            if self.in_use + size > self.capacity:
+                break
+            self._waiters.popleft()
+            self.in_use += size
+            waiter.set_result(None)
+
+
+class ExtractionCache:
+    """
+    Disk-backed cache of extracted text, one UTF-8 file per (file sha256,
+    extension, extractor version), so re-uploads of unchanged files and
+    retried ingestions skip parsing. Entries are written atomically and their
+    mtime is refreshed on every hit; once the directory outgrows its limit the
+    least recently used entries are deleted. Several workers may share the
+    directory: each tracks its own writes and re-measures the directory when
+    it evicts.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        # Approximate directory size; None until first measured
+        self._size: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _entry(self, content_hash: str, file_ext: str) -> Path:
+        version = str(EXTRACTOR_VERSION)
+        if file_ext in (".html", ".md"):
+            # lxml and html.parser can split text differently
+            version += "-" + HTML_PARSER.replace(".", "")
+        return self.directory / f"{content_hash}-{file_ext.lstrip('.')}-v{version}.txt"
+
+    async def get(self, content_hash: str, file_ext: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        return await asyncio.to_thread(self._get, self._entry(content_hash, file_ext))
+
+    async def put(self, content_hash: str, file_ext: str, text: str):
+        if self.enabled:
+            await asyncio.to_thread(self._put, self._entry(content_hash, file_ext), text)
+
+    def _get(self, entry: Path) -> Optional[str]:
+        try:
+            text = entry.read_text(encoding="utf-8")
+            os.utime(entry)  # recency for eviction
+            return text
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Unreadable extraction cache entry {entry.name}: {e}")
+            return None
+
+    def _put(self, entry: Path, text: str):
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            data = text.encode("utf-8")
+            if len(data) > self.max_bytes:
+                return
+            with tempfile.NamedTemporaryFile(dir=self.directory, prefix=".tmp-", delete=False) as handle:
+                handle.write(data)
+            os.replace(handle.name, entry)
+
+            if self._size is None:
+                self._size = self._measure()[0]
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+        except Exception as e:
+            logger.warning(f"Could not write extraction cache entry {entry.name}: {e}")
+
+    def _measure(self):
+        """(total bytes, [(mtime, size, path)]) of the cache entries on disk."""
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for item in scan:
+                if item.is_file() and item.name.endswith(".txt"):
+                    stat = item.stat()
+                    entries.append((stat.st_mtime, stat.st_size, item.path))
+        return sum(size for _, size, _ in entries), entries
+
+    def _evict(self):
+        total, entries = self._measure()
+        target = self.max_bytes * CACHE_LOW_WATER
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # evicted by another worker
+            total -= size
+            removed += 1
+        self._size = total
+        logger.info(f"Evicted {removed} extraction cache entries ({total / (1024 * 1024):.1f} MB kept)")
+
+
+def _report_worker_pid(pids):
+    """Extraction worker initializer: reports the worker's PID, so a stuck worker can be killed."""
+    pids.put(os.getpid())
+
+
+def _extract_in_worker(file_ext: str, filename: str, path: Optional[str], contents: Optional[bytes]) -> str:
+    """Runs in an extraction worker process: parses one upload from its spool path or bytes."""
+    upload = SpooledUpload.from_path(filename, path) if path else SpooledUpload.from_bytes(filename, contents)
+    with upload:
+        return file_processing_service._extract_content(file_ext, upload)
+
 
 class FileProcessingService:
-    """A service dedicated to extracting text content from various file formats."""
+    """
+    A service dedicated to extracting text content from various file formats.
+
+    Parsing runs in a pool of worker processes (EXTRACTION_WORKERS, spawned on
+    first use), so large DOCX/HTML/PDF files neither block the event loop nor
+    hold the GIL, and each file is bounded by EXTRACTION_TIMEOUT_SECONDS. A
+    worker that hangs or crashes is killed and the pool replaced. Workers read
+    spooled uploads from their temp file path; small in-memory uploads are
+    sent as bytes. With EXTRACTION_WORKERS=0 parsing runs in threads instead.
+    """
+
+    def __init__(self):
+        # Shared by all upload requests; bounds memory spent on parsing at once
+        self.upload_budget = ByteBudget(settings.upload_inflight_budget_bytes)
+        self.extraction_cache = ExtractionCache(settings.extraction_cache_dir, int(settings.extraction_cache_max_mb * 1024 * 1024))
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # PIDs reported by each live pool's workers as they start
+        self._worker_pids: Dict[ProcessPoolExecutor, multiprocessing.SimpleQueue] = {}
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that runs an event loop and model threads is unsafe
+            context = multiprocessing.get_context("spawn")
+            pids = context.SimpleQueue()
+            self._pool = ProcessPoolExecutor(
+                max_workers=settings.extraction_workers, mp_context=context,
+                initializer=_report_worker_pid, initargs=(pids,),
+            )
+            self._worker_pids[self._pool] = pids
+        return self._pool
+
+    def _release_pool(self, pool: ProcessPoolExecutor) -> Set[int]:
+        """Stops handing out the pool; returns the PIDs of the workers it started."""
+        if self._pool is pool:
+            self._pool = None
+        queue = self._worker_pids.pop(pool, None)
+        if queue is None:
+            return set()
+        pids = set()
+        while not queue.empty():
+            pids.add(queue.get())
+        queue.close()
+        return pids
+
+    def _recycle_pool(self, pool: ProcessPoolExecutor):
+        """Kills a pool's workers (a stuck parse cannot be cancelled otherwise); the next call starts a new pool."""
+        if pool not in self._worker_pids:
+            return  # Already recycled by another request that hit the same pool
+        stopped = 0
+        for pid in self._release_pool(pool):
+            try:
+                os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+                stopped += 1
+            except ProcessLookupError:
+                stopped += 1  # Already exited, e.g. the worker that crashed
+            except OSError as e:
+                logger.error(f"Could not kill extraction worker {pid}: {e}")
+        if not stopped:
+            logger.error("Recycled the extraction pool without terminating any worker; a stuck parse may still be running")
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        """Stops the extraction workers (application shutdown)."""
+        if self._pool is not None:
+            pool = self._pool
+            self._release_pool(pool)
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def declared_size(self, file: UploadFile) -> int:
+        """Size to reserve from the upload budget (the upload limit when unknown)."""
+        if file.size is None:
+            return settings.upload_max_bytes
+        return min(file.size, settings.upload_max_bytes)
+
+    def _too_large(self, filename: str) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File too large: '{filename}' exceeds the {settings.upload_max_bytes // (1024 * 1024)} MB upload limit.",
+        )
+
+    async def spool_upload(self, file: UploadFile) -> SpooledUpload:
+        """
+        Streams an upload into a SpooledUpload, hashing it on the way. Uploads
+        over the size limit are rejected with 413 as soon as they cross it.
+        """
+        if file.size is not None and file.size > settings.upload_max_bytes:
+            raise self._too_large(file.filename)
+
+        upload = SpooledUpload(file.filename)
+        try:
+            while True:
+                chunk = await file.read(SPOOL_CHUNK_BYTES)
+                if not chunk:
+                    break
+                if upload.size + len(chunk) > settings.upload_max_bytes:
+                    raise self._too_large(file.filename)
+                upload.write(chunk)
+        except BaseException:
+            upload.close()
+            raise
+        return upload
 
     async def extract_text_from_file(self, file: UploadFile) -> Dict[str, str]:
         """
         Extracts text content from an uploaded file based on its extension.
         Returns a dictionary containing the title and content.
         """
-        contents = await file.read()
-        filename = file.filename
-        file_ext = Path(filename).suffix.lower()
+        async with self.upload_budget.reserve(self.declared_size(file)):
+            with await self.spool_upload(file) as upload:
+                return await self.extract_text_from_upload(upload)
+
+    async def extract_text_from_upload(self, upload: SpooledUpload) -> Dict[str, str]:
+        """
+        Extracts the title and text content from a spooled upload, in an
+        extraction worker. Text of files parsed before comes from the
+        extraction cache instead.
+        """
+        file_ext = self._check_supported(upload.filename)
+        cached = await self.extraction_cache.get(upload.content_hash, file_ext)
+        if cached is not None:
+            logger.info(f"Extraction cache hit for {upload.filename}")
+            return {"title": self.document_title(upload.filename), "content": cached}
 
         try:
-            if file_ext == ".pdf":
-                text = self._extract_from_pdf(contents)
-            elif file_ext == ".docx":
-                text = self._extract_from_docx(contents)
-            elif file_ext == ".html":
-                text = self._extract_from_html(contents)
-            elif file_ext == ".md":
-                text = self._extract_from_md(contents)
-            elif file_ext == ".txt":
-                text = self._extract_from_txt(contents)
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
-                    detail=f"Unsupported file type: {file_ext}",
-                )
-            
-            # Use the filename (without extension) as the default title
-            title = Path(filename).stem
-            
-            # Post-process: ensure all links are properly formatted for RAG
-            text = self._post_process_text(text)
+            text = await self._run_extraction(file_ext, upload)
+        except asyncio.TimeoutError:
+            logger.warning(f"Extraction of {upload.filename} timed out after {settings.extraction_timeout_seconds}s")
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Timed out extracting text from {upload.filename}.",
+            )
+        except Exception as e:
+            logger.error(f"Error processing file {upload.filename}: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to process file: {upload.filename}. Error: {str(e)}",
+            )
+        await self.extraction_cache.put(upload.content_hash, file_ext, text)
+        return {"title": self.document_title(upload.filename), "content": text}
+
+    async def _run_extraction(self, file_ext: str, upload: SpooledUpload) -> str:
+        timeout = settings.extraction_timeout_seconds
+        if settings.extraction_workers <= 0:
+            # Threads cannot be killed; a timed-out parse is abandoned, not stopped
+            return await asyncio.wait_for(asyncio.to_thread(self._extract_content, file_ext, upload), timeout)
+
+        path = upload.path
+        args = (file_ext, upload.filename, path, None if path else upload.getvalue())
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            pool = self._get_pool()
+            try:
+                return await asyncio.wait_for(loop.run_in_executor(pool, _extract_in_worker, *args), timeout)
+            except asyncio.TimeoutError:
+                self._recycle_pool(pool)
+                raise
+            except BrokenProcessPool:
+                # A crashed worker, or another file's timeout, took the pool down: retry once on a new pool
+                self._recycle_pool(pool)
+                if attempt:
+                    raise
+
+    def document_title(self, filename: str) -> str:
+        """Default title of an uploaded document: the filename without extension."""
+        return Path(filename).stem
+
+    def _check_supported(self, filename: str) -> str:
+        """The file's extension, or 415 for formats that cannot be extracted."""
+        file_ext = Path(filename).suffix.lower()
+        if file_ext not in SUPPORTED_EXTENSIONS:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail=f"Unsupported file type: {file_ext}",
+            )
+        return file_ext
 
-            return {"title": title, "content": text}
+    def extract_text(self, filename: str, source: Union[bytes, SpooledUpload]) -> Dict[str, str]:
+        """Extracts the title and text content from raw file bytes or a spooled upload (blocking, in this process)."""
+        file_ext = self._check_supported(filename)
+        upload = SpooledUpload.from_bytes(filename, source) if isinstance(source, bytes) else source
 
+        try:
+            return {"title": self.document_title(filename), "content": self._extract_content(file_ext, upload)}
         except Exception as e:
             logger.error(f"Error processing file {filename}: {e}")
             raise HTTPException(
@@ -63,6 +490,22 @@ class FileProcessingService:
                 detail=f"Failed to process file: {filename}. Error: {str(e)}",
             )
 
+    def _extract_content(self, file_ext: str, upload: SpooledUpload) -> str:
+        """Parses a supported file into post-processed text."""
+        if file_ext == ".pdf":
+            text = self._extract_from_pdf(upload)
+        elif file_ext == ".docx":
+            text = self._extract_from_docx(upload)
+        elif file_ext == ".html":
+            text = self._extract_from_html(upload.open())
+        elif file_ext == ".md":
+            text = self._extract_from_md(upload)
+        else:
+            text = self._extract_from_txt(upload)
+
+        # Post-process: ensure all links are properly formatted for RAG
+        return self._post_process_text(text)
+
     def _post_process_text(self, text: str) -> str:
         """
         Global clean-up and formatting for extracted text.
@@ -70,17 +513,7 @@ class FileProcessingService:
         """
         if not text:
             return ""
-        
-        # Function to replace matched URL with markdown format
-        def replace_link(match):
-            url = match.group(0)
-            # Ensure protocol for www links
-            href = url if url.startswith('http') else f'https://{url}'
-            return f'[{url}]({href})'
-
-        # Apply regex to linkify plain URLs
-        text = URL_PATTERN.sub(replace_link, text)
-        return text
+        return linkify_urls(text)
 
     def _resolve_pdf_object(self, obj):
         """Resolves indirect objects to their actual value."""
@@ -88,139 +521,136 @@ class FileProcessingService:
             return obj.get_object()
         return obj
 
-    def _extract_from_pdf(self, contents: bytes) -> str:
+    def _extract_from_pdf(self, upload: SpooledUpload) -> str:
         """Extracts text from PDF file contents, including embedded links."""
-        with io.BytesIO(contents) as pdf_file:
-            reader = PdfReader(pdf_file)
-            full_text = []
+        reader = PdfReader(upload.open())
+        full_text = []
+        
+        for page in reader.pages:
+            text = page.extract_text()
             
-            for page in reader.pages:
-                text = page.extract_text()
-                
-                # Extract links from annotations
-                links = []
-                if "/Annots" in page:
-                    for annot in page["/Annots"]:
-                        try:
-                            annot_obj = self._resolve_pdf_object(annot)
-                            
-                            # Ensure it's a Link annotation
-                            if annot_obj.get("/Subtype") == "/Link":
-                                # Check for Action (URL)
-                                if "/A" in annot_obj:
-                                    action = self._resolve_pdf_object(annot_obj["/A"])
-                                    if "/URI" in action:
-                                        links.append(action["/URI"])
-                        except Exception as e:
-                            logger.warning(f"Failed to process annotation: {e}")
-                            continue
-                
-                # Append links to the bottom of the page text if found
-                if links:
-                    # Filter out non-string links and deduplicate
-                    valid_links = {link for link in links if isinstance(link, str)}
-                    
-                    # Regex fallback: Find links in plain text that might not have annotations
-                    text_links = set(re.findall(r'https?://[^\s<>"]+|www\.[^\s<>"]+', text))
-                    valid_links.update(text_links)
-                    
-                    if valid_links:
-                        text += "\n\n**Links found on this page:**\n"
-                        for link in valid_links:
-                            text += f"- [{link}]({link})\n"
+            # Extract links from annotations
+            links = []
+            if "/Annots" in page:
+                for annot in page["/Annots"]:
+                    try:
+                        annot_obj = self._resolve_pdf_object(annot)
+                        
+                        # Ensure it's a Link annotation
+                        if annot_obj.get("/Subtype") == "/Link":
+                            # Check for Action (URL)
+                            if "/A" in annot_obj:
+                                action = self._resolve_pdf_object(annot_obj["/A"])
+                                if "/URI" in action:
+                                    links.append(action["/URI"])
+                    except Exception as e:
+                        logger.warning(f"Failed to process annotation: {e}")
+                        continue
+            
+            # Append links to the bottom of the page text if found
+            if links:
+                # Filter out non-string links and deduplicate
+                valid_links = {link for link in links if isinstance(link, str)}
                 
-                full_text.append(text)
+                # Regex fallback: Find links in plain text that might not have annotations
+                text_links = set(re.findall(r'https?://[^\s<>"]+|www\.[^\s<>"]+', text))
+                valid_links.update(text_links)
                 
+                if valid_links:
+                    text += "\n\n**Links found on this page:**\n"
+                    for link in valid_links:
+                        text += f"- [{link}]({link})\n"
+            
+            full_text.append(text)
+            
         return "\n".join(full_text)
 
-    def _extract_from_docx(self, contents: bytes) -> str:
+    def _extract_from_docx(self, upload: SpooledUpload) -> str:
         """Extracts text from DOCX file contents, including embedded links and TABLES as Markdown."""
         from docx import Document as DocxDocument
-        from docx.document import Document
-        from docx.table import Table
-        from docx.text.paragraph import Paragraph
-        
-        with io.BytesIO(contents) as docx_file:
-            doc = DocxDocument(docx_file)
-            full_text = []
-
-            # Use iter_inner_content to process elements (Paragraphs and Tables) in order
-            # Note: iter_inner_content() is not standard in all python-docx versions using Document object directly
-            # We iterate through the body elements directly
-            for element in doc.element.body:
-                if element.tag.endswith('p'):  # Paragraph
-                    # Find the paragraph object corresponding to this element
-                    # We have to search for it or wrap it
-                    # Optimization: It's faster to just iterate paragraphs and tables if order wasn't critical
-                    # But order IS critical.
-                    
-                    # Alternative safer approach: Iterate doc.iter_inner_content() if available, 
-                    # but since it might not be, we'll try a simpler approach of iterating paragraphs and tables 
-                    # based on their xml order.
+
+        doc = DocxDocument(upload.open())
+        return "\n".join(self._iter_docx_blocks(doc))
+
+    def _iter_docx_blocks(self, doc) -> Iterator[str]:
+        """
+        Yields paragraphs and Markdown tables in document order, walking the
+        body XML directly; python-docx Paragraph/Table/cell objects rebuild the
+        table grid on every access and are far slower on large documents.
+        """
+        rels = doc.part.rels
+        for child in doc.element.body.iterchildren():
+            if child.tag == W_P:
+                text = self._docx_paragraph_text(child, rels)
+                if text:
+                    yield text
+            elif child.tag == W_TBL:
+                table_md = self._docx_table_markdown(child)
+                if table_md:
+                    yield table_md
+
+    def _docx_paragraph_text(self, paragraph, rels) -> str:
+        """Paragraph text with external hyperlinks as Markdown links."""
+        parts = []
+        for child in paragraph.iterchildren():
+            if child.tag == W_R:  # Run
+                if child.text:
+                    parts.append(child.text)
+            elif child.tag == W_HYPERLINK:
+                r_id = child.get(R_ID)
+                if not r_id:
+                    continue
+                try:
+                    rel = rels[r_id]
+                    if rel.target_mode == 'External' and rel.target_ref:
+                        display_text = "".join(run.text for run in child.iterchildren(W_R) if run.text)
+                        parts.append(f" [{display_text}]({rel.target_ref}) ")
+                except Exception:
                     pass
-            
-            # SIMPLER ROBUST APPROACH:
-            # We will use the fact that doc.paragraphs and doc.tables are separate lists.
-            # But we want combined order.
-            # reliable way: iterate over doc.element.body and match with objects.
-            
-            def get_markdown_table(table):
-                md_lines = []
-                # extracting headers (assuming first row is header)
-                if not table.rows: 
-                    return ""
-                    
-                headers = [cell.text.strip() for cell in table.rows[0].cells]
-                md_lines.append("| " + " | ".join(headers) + " |")
-                md_lines.append("| " + " | ".join(["---"] * len(headers)) + " |")
-                
-                for row in table.rows[1:]:
-                    cells = [cell.text.strip() for cell in row.cells]
-                    md_lines.append("| " + " | ".join(cells) + " |")
-                    
-                return "\n" + "\n".join(md_lines) + "\n"
-
-            # Helper to extract text+links from a paragraph object
-            def get_para_text(para):
-                para_text = ""
-                for child in para._element:
-                    if child.tag.endswith('r'): # Run
-                        if child.text: para_text += child.text
-                    elif child.tag.endswith('hyperlink'): # Hyperlink
-                        r_id = child.get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id')
-                        if r_id:
-                            try:
-                                rel = doc.part.rels[r_id]
-                                if rel.target_mode == 'External':
-                                    url = rel.target_ref
-                                    if url:
-                                        display_text = ""
-                                        for subchild in child:
-                                            if subchild.tag.endswith('r') and subchild.text:
-                                                display_text += subchild.text
-                                        para_text += f" [{display_text}]({url}) "
-                            except Exception: pass
-                return para_text.strip()
-
-            # Main iteration over document body elements
-            for child in doc.element.body:
-                if child.tag.endswith('p'):
-                    # Create a Paragraph object from the element
-                    para = Paragraph(child, doc)
-                    text = get_para_text(para)
-                    if text: full_text.append(text)
-                
-                elif child.tag.endswith('tbl'):
-                    # Create a Table object from the element
-                    table = Table(child, doc)
-                    table_md = get_markdown_table(table)
-                    if table_md: full_text.append(table_md)
+        return "".join(parts).strip()
 
-        return "\n".join(full_text)
+    def _docx_cell_text(self, cell) -> str:
+        """Cell paragraphs joined by newlines, like python-docx's `cell.text`."""
+        return "\n".join(
+            "".join(run.text for run in paragraph.iter(W_R) if run.text)
+            for paragraph in cell.iterchildren(W_P)
+        ).strip()
+
+    def _docx_table_rows(self, table) -> Iterator[list]:
+        """
+        Cell texts per row, laid out like python-docx's `row.cells`: a cell
+        spanning several grid columns (gridSpan) repeats once per column, and a
+        vertically merged cell (vMerge) repeats the text of the cell it
+        continues from the row above.
+        """
+        above: Dict[int, str] = {}
+        for row in table.iterchildren(W_TR):
+            cells, current = [], {}
+            offset = row.grid_before
+            for tc in row.iterchildren(W_TC):
+                if tc.vMerge == "continue" and offset in above:
+                    text = above[offset]
+                else:
+                    text = self._docx_cell_text(tc)
+                current[offset] = text
+                cells.extend([text] * tc.grid_span)
+                offset += tc.grid_span
+            above = current
+            yield cells
 
-    def _extract_from_html(self, contents: bytes) -> str:
-        """Extracts text from HTML file contents, preserving links as Markdown."""
-        soup = BeautifulSoup(contents, "html.parser")
+    def _docx_table_markdown(self, table) -> str:
+        """Markdown table; the first row is used as the header."""
+        rows = list(self._docx_table_rows(table))
+        if not rows:
+            return ""
+        headers = rows[0]
+        lines = ["| " + " | ".join(headers) + " |", "| " + " | ".join(["---"] * len(headers)) + " |"]
+        lines.extend("| " + " | ".join(cells) + " |" for cells in rows[1:])
+        return "\n" + "\n".join(lines) + "\n"
+
+    def _extract_from_html(self, markup: Union[bytes, str, BinaryIO]) -> str:
+        """Extracts text from HTML markup or an HTML file object, preserving links as Markdown."""
+        soup = BeautifulSoup(markup, HTML_PARSER)
         
         # Convert tags to Markdown links: [text](href)
         for a in soup.find_all('a', href=True):
@@ -229,14 +659,19 @@ class FileProcessingService:
             
         return soup.get_text(separator="\n", strip=True)
 
-    def _extract_from_md(self, contents: bytes) -> str:
+    def _extract_from_md(self, upload: SpooledUpload) -> str:
         """Extracts text from Markdown file contents by converting to HTML first."""
-        html = markdown.markdown(contents.decode("utf-8"))
-        return self._extract_from_html(html.encode("utf-8"))
+        html = markdown.markdown(self._decode(upload))
+        return self._extract_from_html(html)
 
-    def _extract_from_txt(self, contents: bytes) -> str:
+    def _extract_from_txt(self, upload: SpooledUpload) -> str:
         """Extracts text from a plain text file."""
-        return contents.decode("utf-8")
+        return self._decode(upload)
+
+    def _decode(self, upload: SpooledUpload) -> str:
+        """UTF-8 text of an upload, decoded straight from its buffer (no intermediate bytes copy)."""
+        with upload.view() as buffer:
+            return str(buffer, "utf-8")
 
 
 # Singleton instance
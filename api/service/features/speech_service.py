@@ -11,9 +11,11 @@ import base64
 import logging
 import struct
 import asyncio
-from typing import Optional, List
+from typing import AsyncIterator, Callable, Optional, List, Tuple
 from dotenv import load_dotenv
 
+from lib.text_normalization import markdown_to_speech
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -21,6 +23,58 @@ logger = logging.getLogger(__name__)
 # Maximum characters per TTS chunk (SarvamAI limit is around 500)
 MAX_CHUNK_SIZE = 350
 
+# Split by sentence boundaries (., !, ?, ;, :, newlines), not after "e.g.", "i.e." or "vs."
+SENTENCE_BOUNDARY_PATTERN = re.compile(r'(?<=[.!?;:\n])(?<![eE]\.g\.)(?<![iI]\.e\.)(?<!\bvs\.)\s+')
+
+# Streaming TTS: chunks synthesized ahead of the one being sent to the client
+STREAM_PREFETCH_CHUNKS = 2
+# Streamed WAV headers leave the sizes open, as the total length is not known yet
+WAV_STREAM_SIZE = 0xFFFFFFFF
+
+
+class SentenceChunker:
+    """
+    Cuts text that arrives piece by piece (an answer still being generated)
+    into TTS chunks as soon as their sentences are complete.
+
+    A sentence counts as complete once the whitespace after its closing
+    punctuation or line break has arrived, so "3.14" split across two pieces
+    is not cut early. Complete text is cleaned for speech and packed like
+    `SpeechService._split_text_into_chunks` does for whole texts.
+    """
+
+    def __init__(self, split: Callable[[str], List[str]], max_size: int = MAX_CHUNK_SIZE):
+        self._split = split
+        self._max_size = max_size
+        self._buffer = ""
+
+    def _chunks(self, text: str) -> List[str]:
+        text = markdown_to_speech(text)
+        return self._split(text) if text else []
+
+    def feed(self, piece: str) -> List[str]:
+        """Adds text; returns the chunks completed by it, in order."""
+        self._buffer += piece
+        boundary = None
+        for boundary in SENTENCE_BOUNDARY_PATTERN.finditer(self._buffer):
+            pass
+        if boundary is not None:
+            complete, self._buffer = self._buffer[:boundary.start()], self._buffer[boundary.end():]
+        elif len(self._buffer) > self._max_size:
+            # A run-on line with no sentence end yet: cut at a word boundary
+            cut = self._buffer.rfind(" ", 0, self._max_size)
+            if cut <= 0:
+                return []
+            complete, self._buffer = self._buffer[:cut], self._buffer[cut + 1:]
+        else:
+            return []
+        return self._chunks(complete)
+
+    def flush(self) -> List[str]:
+        """Chunks for whatever text is left once the input has ended."""
+        complete, self._buffer = self._buffer, ""
+        return self._chunks(complete)
+
 
 class SpeechService:
     """Service for handling speech recognition and synthesis using SarvamAI."""
@@ -62,9 +116,7 @@ class SpeechService:
         if len(text) <= max_size:
             return [text]
         
-        # Split by sentence boundaries (., !, ?, ;, :, newlines)
-        sentence_pattern = r'(?<=[.!?;:\n])\s+'
-        sentences = re.split(sentence_pattern, text)
+        sentences = SENTENCE_BOUNDARY_PATTERN.split(text)
         
         chunks = []
         current_chunk = ""
@@ -113,6 +165,70 @@ class SpeechService:
         logger.info(f"Split text into {len(chunks)} chunks")
         return chunks
     
+    def _parse_wav(self, chunk: bytes) -> Optional[Tuple[int, int, int, bytes]]:
+        """
+        Format and raw PCM data of WAV audio bytes.
+        Returns (num_channels, sample_rate, bits_per_sample, pcm_data), or None if
+        the bytes are not a WAV file with a data chunk.
+        """
+        # WAV file structure:
+        # Bytes 0-3: "RIFF"
+        # Bytes 4-7: File size - 8
+        # Bytes 8-11: "WAVE"
+        # Bytes 12-15: "fmt "
+        # Bytes 16-19: Format chunk size (usually 16)
+        # Bytes 20-21: Audio format (1 = PCM)
+        # Bytes 22-23: Number of channels
+        # Bytes 24-27: Sample rate
+        # Bytes 28-31: Byte rate
+        # Bytes 32-33: Block align
+        # Bytes 34-35: Bits per sample
+        # Then "data" chunk...
+        if len(chunk) < 44 or chunk[:4] != b'RIFF' or chunk[8:12] != b'WAVE':
+            return None
+
+        num_channels = struct.unpack('<H', chunk[22:24])[0]
+        sample_rate = struct.unpack('<I', chunk[24:28])[0]
+        bits_per_sample = struct.unpack('<H', chunk[34:36])[0]
+
+        # Find the data chunk
+        pos = 12
+        while pos < len(chunk) - 8:
+            chunk_id = chunk[pos:pos+4]
+            chunk_size = struct.unpack('<I', chunk[pos+4:pos+8])[0]
+
+            if chunk_id == b'data':
+                return num_channels, sample_rate, bits_per_sample, chunk[pos+8:pos+8+chunk_size]
+
+            pos += 8 + chunk_size
+            # Word alignment
+            if chunk_size % 2 == 1:
+                pos += 1
+        return None
+
+    def _wav_header(self, num_channels: int, sample_rate: int, bits_per_sample: int, data_size: int) -> bytes:
+        """44-byte PCM WAV header; WAV_STREAM_SIZE leaves the sizes open for streaming."""
+        byte_rate = sample_rate * num_channels * bits_per_sample // 8
+        block_align = num_channels * bits_per_sample // 8
+        file_size = WAV_STREAM_SIZE if data_size == WAV_STREAM_SIZE else 36 + data_size
+
+        return struct.pack(
+            '<4sI4s4sIHHIIHH4sI',
+            b'RIFF',
+            file_size,
+            b'WAVE',
+            b'fmt ',
+            16,  # Format chunk size
+            1,   # Audio format (PCM)
+            num_channels,
+            sample_rate,
+            byte_rate,
+            block_align,
+            bits_per_sample,
+            b'data',
+            data_size
+        )
+
     def _stitch_wav_audio(self, audio_chunks: List[bytes]) -> bytes:
         """
         Merge multiple WAV audio byte chunks into a single WAV file.
@@ -131,62 +247,25 @@ class SpeechService:
         
         # Parse WAV headers and extract raw PCM data
         all_pcm_data = []
-        sample_rate = None
-        num_channels = None
-        bits_per_sample = None
+        audio_format = None
         
         for i, chunk in enumerate(audio_chunks):
             try:
-                # WAV file structure:
-                # Bytes 0-3: "RIFF"
-                # Bytes 4-7: File size - 8
-                # Bytes 8-11: "WAVE"
-                # Bytes 12-15: "fmt "
-                # Bytes 16-19: Format chunk size (usually 16)
-                # Bytes 20-21: Audio format (1 = PCM)
-                # Bytes 22-23: Number of channels
-                # Bytes 24-27: Sample rate
-                # Bytes 28-31: Byte rate
-                # Bytes 32-33: Block align
-                # Bytes 34-35: Bits per sample
-                # Then "data" chunk...
-                
-                if len(chunk) < 44:
-                    logger.warning(f"Chunk {i} too small, skipping")
-                    continue
-                
-                # Verify WAV header
-                if chunk[:4] != b'RIFF' or chunk[8:12] != b'WAVE':
+                parsed = self._parse_wav(chunk)
+                if parsed is None:
                     logger.warning(f"Chunk {i} is not a valid WAV file, skipping")
                     continue
                 
-                # Parse format info from first valid chunk
-                if sample_rate is None:
-                    num_channels = struct.unpack('<H', chunk[22:24])[0]
-                    sample_rate = struct.unpack('<I', chunk[24:28])[0]
-                    bits_per_sample = struct.unpack('<H', chunk[34:36])[0]
-                
-                # Find the data chunk
-                pos = 12
-                while pos < len(chunk) - 8:
-                    chunk_id = chunk[pos:pos+4]
-                    chunk_size = struct.unpack('<I', chunk[pos+4:pos+8])[0]
-                    
-                    if chunk_id == b'data':
-                        pcm_data = chunk[pos+8:pos+8+chunk_size]
-                        all_pcm_data.append(pcm_data)
-                        break
-                    
-                    pos += 8 + chunk_size
-                    # Word alignment
-                    if chunk_size % 2 == 1:
-                        pos += 1
+                # Format info from first valid chunk
+                if audio_format is None:
+                    audio_format = parsed[:3]
+                all_pcm_data.append(parsed[3])
                         
             except Exception as e:
                 logger.warning(f"Error parsing WAV chunk {i}: {e}")
                 continue
         
-        if not all_pcm_data or sample_rate is None:
+        if not all_pcm_data or audio_format is None:
             logger.error("No valid audio data found")
             return audio_chunks[0] if audio_chunks else b''
         
@@ -194,30 +273,7 @@ class SpeechService:
         combined_pcm = b''.join(all_pcm_data)
         
         # Build new WAV file
-        byte_rate = sample_rate * num_channels * bits_per_sample // 8
-        block_align = num_channels * bits_per_sample // 8
-        data_size = len(combined_pcm)
-        file_size = 36 + data_size
-        
-        # Create WAV header
-        wav_header = struct.pack(
-            '<4sI4s4sIHHIIHH4sI',
-            b'RIFF',
-            file_size,
-            b'WAVE',
-            b'fmt ',
-            16,  # Format chunk size
-            1,   # Audio format (PCM)
-            num_channels,
-            sample_rate,
-            byte_rate,
-            block_align,
-            bits_per_sample,
-            b'data',
-            data_size
-        )
-        
-        result = wav_header + combined_pcm
+        result = self._wav_header(*audio_format, len(combined_pcm)) + combined_pcm
         logger.info(f"Stitched {len(audio_chunks)} audio chunks into {len(result)} bytes")
         return result
     
@@ -301,7 +357,9 @@ class SpeechService:
         enable_preprocessing: bool
     ) -> bytes:
         """Convert a single text chunk to speech."""
-        response = client.text_to_speech.convert(
+        # The SarvamAI client is blocking; keep it off the event loop
+        response = await asyncio.to_thread(
+            client.text_to_speech.convert,
             text=text,
             target_language_code=target_language_code,
             speaker=speaker,
@@ -390,6 +448,84 @@ class SpeechService:
             logger.error(f"Error during text-to-speech conversion: {e}")
             raise Exception(f"Text-to-speech conversion failed: {str(e)}")
     
+    async def stream_text_to_speech(
+        self,
+        text_stream: AsyncIterator[str],
+        target_language_code: str = "en-IN",
+        speaker: str = "anushka",
+        pitch: float = 0,
+        pace: float = 1,
+        loudness: float = 1,
+        speech_sample_rate: int = 22050,
+        enable_preprocessing: bool = True,
+        api_key: str = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Convert text that is still arriving to speech, streaming the audio.
+
+        Each sentence is synthesized as soon as it is complete, in order and up
+        to STREAM_PREFETCH_CHUNKS ahead of the audio being sent, so the first
+        audio follows the first sentence instead of the whole text. The output
+        is one WAV stream: a header with open-ended sizes, then the PCM frames
+        of each chunk.
+        """
+        client = self._get_client(api_key)
+        if not client:
+            raise Exception("SarvamAI service not available. Check SARVAM_API_KEY.")
+
+        options = dict(
+            target_language_code=target_language_code,
+            speaker=speaker,
+            pitch=pitch,
+            pace=pace,
+            loudness=loudness,
+            speech_sample_rate=speech_sample_rate,
+            enable_preprocessing=enable_preprocessing
+        )
+        chunker = SentenceChunker(self._split_text_into_chunks)
+        # Synthesis tasks in text order; None marks the end of the text
+        pending: asyncio.Queue = asyncio.Queue(maxsize=STREAM_PREFETCH_CHUNKS)
+
+        async def synthesize(chunks: List[str]):
+            for chunk in chunks:
+                await pending.put(asyncio.create_task(self._convert_single_chunk(client=client, text=chunk, **options)))
+
+        async def read_text():
+            try:
+                async for piece in text_stream:
+                    await synthesize(chunker.feed(piece))
+                await synthesize(chunker.flush())
+            finally:
+                await pending.put(None)
+
+        reader = asyncio.create_task(read_text())
+        task = None
+        audio_format = None
+        chunks_sent = 0
+        try:
+            while (task := await pending.get()) is not None:
+                parsed = self._parse_wav(await task)
+                if parsed is None:
+                    logger.warning("Streamed audio chunk is not a valid WAV file, skipping")
+                    continue
+                if audio_format is None:
+                    audio_format = parsed[:3]
+                    yield self._wav_header(*audio_format, WAV_STREAM_SIZE) + parsed[3]
+                else:
+                    yield parsed[3]
+                chunks_sent += 1
+            # Surface errors reading the text
+            await reader
+            logger.info(f"Streamed {chunks_sent} audio chunks")
+        finally:
+            reader.cancel()
+            if task is not None:
+                task.cancel()
+            while not pending.empty():
+                task = pending.get_nowait()
+                if task is not None:
+                    task.cancel()
+
     async def _convert_chunks_async(self, client, chunks: List[str], **kwargs) -> List[bytes]:
         """
         Convert multiple text chunks to audio using async batch processing for improved performance.
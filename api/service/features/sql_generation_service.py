@@ -1,7 +1,7 @@
 from typing import Optional
 import logging
 import re
-from service.rag.gemini_service import gemini_service
+from service.rag.llm_gateway import llm_gateway
 
 logger = logging.getLogger(__name__)
 
@@ -45,7 +45,7 @@ class SQLGenerationService:
             
             # Generate SQL using Gemini
             logger.info(f"Generating SQL for query: {natural_language_query} using model: {model}")
-            response = await gemini_service.generate_answer(prompt, model=model)
+            response = await llm_gateway.generate(prompt, model=model, operation="sql")
             
             # Extract clean SQL from response
             sql_query = self._extract_sql_from_response(response)
@@ -1,16 +1,119 @@
+import itertools
 import logging
-from typing import List, Dict, Any
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Set, Tuple
 from datetime import datetime
 from service.infrastructure.database_service import database_service
+from lib.tracing import traced
 
 logger = logging.getLogger(__name__)
 
+# Everything but the chunk/parent ID arrays, which can hold thousands of IDs per
+# document and are only needed when the document's index data is deleted
+METADATA_PROJECTION = {"_id": 0, "chunk_ids": 0, "parent_ids": 0, "description_job": 0, "content_hash": 0}
+# Only the index IDs and file hash, for deletions
+IDS_PROJECTION = {"_id": 0, "filename": 1, "chunk_ids": 1, "parent_ids": 1, "content_hash": 1}
+# Internal fields left out of the records returned after inserts
+INTERNAL_FIELDS = ("_id", "chunk_ids", "parent_ids", "description_job", "content_hash")
+# What query-time prompts need from each document
+CATALOG_PROJECTION = {"_id": 0, "filename": 1, "title": 1, "description": 1}
+
+# Writes on this worker invalidate immediately; the TTL bounds how long a
+# catalog can miss uploads and deletions made through other workers
+CATALOG_TTL_SECONDS = 30
+CATALOG_CACHE_SIZE = 1024
+
+# Catalog versions are unique across users, so they can key derived caches
+_catalog_versions = itertools.count(1)
+
+
+class DocumentCatalog:
+    """
+    Read-only snapshot of a user's documents (filename, title, description),
+    newest first. Description lists are memoized per document selection, and
+    `overview_key` identifies a selection of this exact snapshot so the prompt
+    overview built from it can be cached too.
+    """
+
+    __slots__ = ("version", "documents", "expires_at", "_descriptions")
+
+    def __init__(self, documents: List[Dict[str, Any]]):
+        self.version = next(_catalog_versions)
+        self.documents = documents
+        self.expires_at = time.monotonic() + CATALOG_TTL_SECONDS
+        self._descriptions: Dict[Optional[Tuple[str, ...]], List[str]] = {}
+
+    def _selection(self, filenames: Optional[List[str]]) -> Optional[Tuple[str, ...]]:
+        return tuple(sorted(set(filenames))) if filenames else None
+
+    def select(self, filenames: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Documents restricted to the given filenames (all when None or empty)."""
+        if not filenames:
+            return self.documents
+        wanted = set(filenames)
+        return [doc for doc in self.documents if doc.get("filename") in wanted]
+
+    def descriptions(self, filenames: Optional[List[str]] = None) -> List[str]:
+        """'Title: description' lines for the selected documents that have a description."""
+        selection = self._selection(filenames)
+        cached = self._descriptions.get(selection)
+        if cached is None:
+            cached = [
+                f"{doc.get('title') or 'Untitled'}: {doc['description']}"
+                for doc in self.select(filenames)
+                if doc.get("description")
+            ]
+            self._descriptions[selection] = cached
+        return cached
+
+    def overview_key(self, filenames: Optional[List[str]] = None) -> tuple:
+        return (self.version, self._selection(filenames))
+
+
 class UserDocumentsService:
-    """Service for managing user-specific documents using MongoDB."""
+    """
+    Service for managing user-specific documents using MongoDB.
+
+    Listing and lookup methods return metadata only (title, filename,
+    description, counts). The chunk and parent IDs are read through
+    `get_document_ids`, which only the delete path needs.
+    """
     
     def __init__(self):
-        # We don't need to load anything into memory anymore
-        pass
+        # username -> DocumentCatalog, least recently used first
+        self._catalogs: "OrderedDict[str, DocumentCatalog]" = OrderedDict()
+        # username -> invalidation count, so a load racing a write is not cached
+        self._generations: Dict[str, int] = {}
+
+    def invalidate_catalog(self, username: str):
+        """Drops the cached catalog after the user's documents changed."""
+        self._catalogs.pop(username, None)
+        self._generations[username] = self._generations.get(username, 0) + 1
+
+    @traced("mongo.user_documents.catalog")
+    async def get_catalog(self, username: str) -> DocumentCatalog:
+        """The user's document catalog, served from memory while fresh."""
+        catalog = self._catalogs.get(username)
+        if catalog is not None and catalog.expires_at > time.monotonic():
+            self._catalogs.move_to_end(username)
+            return catalog
+
+        generation = self._generations.get(username, 0)
+        try:
+            collection = await self.get_collection()
+            cursor = collection.find({"username": username}, CATALOG_PROJECTION).sort("uploaded_at", -1)
+            catalog = DocumentCatalog(await cursor.to_list(length=None))
+        except Exception as e:
+            logger.error(f"Error loading document catalog for {username}: {e}")
+            return DocumentCatalog([])
+
+        if self._generations.get(username, 0) == generation:
+            self._catalogs[username] = catalog
+            self._catalogs.move_to_end(username)
+            if len(self._catalogs) > CATALOG_CACHE_SIZE:
+                self._catalogs.popitem(last=False)
+        return catalog
 
     async def get_collection(self):
         """Helper to get the user_documents collection."""
@@ -18,6 +121,7 @@ class UserDocumentsService:
             await database_service.connect()
         return database_service.db.user_documents
 
+    @traced("mongo.user_documents.delete")
     async def delete_document(self, username: str, filename: str) -> bool:
         """Delete a document by filename for a specific user."""
         try:
@@ -25,6 +129,7 @@ class UserDocumentsService:
             result = await collection.delete_one({"username": username, "filename": filename})
             
             if result.deleted_count > 0:
+                self.invalidate_catalog(username)
                 logger.info(f"Deleted document '{filename}' for user {username}")
                 return True
             return False
@@ -32,6 +137,7 @@ class UserDocumentsService:
             logger.error(f"Error deleting document: {e}")
             return False
 
+    @traced("mongo.user_documents.delete")
     async def delete_documents(self, username: str, filenames: list) -> int:
         """Delete multiple documents by filename. Returns number deleted."""
         try:
@@ -40,13 +146,20 @@ class UserDocumentsService:
                 "username": username,
                 "filename": {"$in": filenames}
             })
+            if result.deleted_count > 0:
+                self.invalidate_catalog(username)
             return result.deleted_count
         except Exception as e:
             logger.error(f"Error deleting documents: {e}")
             return 0
     
-    async def add_document(self, username: str, title: str, filename: str, chunk_ids: List[str], parent_ids: List[str] = None, description: str = None) -> Dict[str, Any]:
-        """Add a document entry for a specific user."""
+    @traced("mongo.user_documents.insert")
+    async def add_document(self, username: str, title: str, filename: str, chunk_ids: List[str], parent_ids: List[str] = None, description: str = None, description_job: str = None, content_hash: str = None) -> Dict[str, Any]:
+        """
+        Add a document entry for a specific user.
+        With a description_job, the description is a placeholder to be replaced by `set_description`.
+        The content_hash of the uploaded file ties the document to its ingestion store entry.
+        """
         try:
             collection = await self.get_collection()
             
@@ -62,11 +175,18 @@ class UserDocumentsService:
             }
             if description:
                 document["description"] = description
+            if description_job:
+                document["description_status"] = "pending"
+                document["description_job"] = description_job
+            if content_hash:
+                document["content_hash"] = content_hash
 
             await collection.insert_one(document)
+            self.invalidate_catalog(username)
             
-            # Remove _id for return
-            document.pop("_id", None)
+            # Return the metadata view, like the listing methods
+            for field in INTERNAL_FIELDS:
+                document.pop(field, None)
             
             logger.info(f"Added document '{title}' for user {username} to MongoDB")
             return document
@@ -74,28 +194,147 @@ class UserDocumentsService:
             logger.error(f"Error adding document: {e}")
             return {}
     
+    @traced("mongo.user_documents.insert_many")
+    async def add_documents(self, username: str, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Add several document entries for a user in one write.
+        Each item has title, filename, chunk_ids and optional parent_ids,
+        description, description_job and content_hash (see `add_document`).
+        Returns the stored records (metadata view), or [] on failure.
+        """
+        if not documents:
+            return []
+        try:
+            collection = await self.get_collection()
+            uploaded_at = datetime.now().isoformat()
+            records = []
+            for doc in documents:
+                record = {
+                    "username": username,
+                    "title": doc["title"],
+                    "filename": doc["filename"],
+                    "chunk_ids": doc["chunk_ids"],
+                    "parent_ids": doc.get("parent_ids") or [],
+                    "chunks": len(doc["chunk_ids"]),
+                    "uploaded_at": uploaded_at,
+                    "indexed": True
+                }
+                if doc.get("description"):
+                    record["description"] = doc["description"]
+                if doc.get("description_job"):
+                    record["description_status"] = "pending"
+                    record["description_job"] = doc["description_job"]
+                if doc.get("content_hash"):
+                    record["content_hash"] = doc["content_hash"]
+                records.append(record)
+
+            await collection.insert_many(records, ordered=False)
+            self.invalidate_catalog(username)
+            logger.info(f"Added {len(records)} documents for user {username} to MongoDB")
+
+            return [
+                {key: value for key, value in record.items() if key not in INTERNAL_FIELDS}
+                for record in records
+            ]
+        except Exception as e:
+            logger.error(f"Error adding documents: {e}")
+            return []
+
+    @traced("mongo.user_documents.set_description")
+    async def set_description(self, username: str, filename: str, description_job: str, description: str) -> bool:
+        """
+        Replaces a pending placeholder description. The job id guards against
+        overwriting a document that was deleted or re-uploaded in the meantime.
+        """
+        try:
+            collection = await self.get_collection()
+            result = await collection.update_one(
+                {"username": username, "filename": filename, "description_job": description_job},
+                {"$set": {"description": description, "description_status": "ready"}, "$unset": {"description_job": ""}}
+            )
+            if result.modified_count > 0:
+                self.invalidate_catalog(username)
+                return True
+            return False
+        except Exception as e:
+            logger.error(f"Error setting description for '{filename}': {e}")
+            return False
+
+    @traced("mongo.user_documents.keep_placeholders")
+    async def keep_placeholders(self, username: str, jobs: List[Tuple[str, str]]) -> int:
+        """
+        Marks pending descriptions of (filename, description_job) documents as
+        final placeholders (`description_status: "placeholder"`) when no LLM
+        description will come. Returns the number of documents updated.
+        """
+        if not jobs:
+            return 0
+        try:
+            collection = await self.get_collection()
+            result = await collection.update_many(
+                {"username": username, "$or": [{"filename": filename, "description_job": job_id} for filename, job_id in jobs]},
+                {"$set": {"description_status": "placeholder"}, "$unset": {"description_job": ""}}
+            )
+            if result.modified_count > 0:
+                self.invalidate_catalog(username)
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Error keeping placeholder descriptions for {username}: {e}")
+            return 0
+
+    @traced("mongo.user_documents.list")
     async def get_user_documents(self, username: str) -> List[Dict[str, Any]]:
-        """Get all documents for a specific user."""
+        """Get metadata for all documents of a specific user (without chunk/parent IDs)."""
         try:
             collection = await self.get_collection()
-            cursor = collection.find({"username": username}).sort("uploaded_at", -1)
-            
-            documents = []
-            async for doc in cursor:
-                doc.pop("_id", None)
-                documents.append(doc)
-                
-            return documents
+            cursor = collection.find({"username": username}, METADATA_PROJECTION).sort("uploaded_at", -1)
+            return await cursor.to_list(length=None)
         except Exception as e:
             logger.error(f"Error getting documents for {username}: {e}")
             return []
+
+    @traced("mongo.user_documents.find")
+    async def get_document(self, username: str, filename: str) -> Optional[Dict[str, Any]]:
+        """Get metadata for one document by filename, or None if the user has no such document."""
+        try:
+            collection = await self.get_collection()
+            return await collection.find_one({"username": username, "filename": filename}, METADATA_PROJECTION)
+        except Exception as e:
+            logger.error(f"Error getting document '{filename}' for {username}: {e}")
+            return None
+
+    @traced("mongo.user_documents.ids")
+    async def get_document_ids(self, username: str, filenames: List[str]) -> Dict[str, Any]:
+        """
+        Chunk and parent IDs and file hashes of the given documents.
+        Returns {"filenames": [...found...], "chunk_ids": [...], "parent_ids": [...],
+        "content_hashes": [...]}; documents stored before hashes were recorded have none.
+        """
+        found, chunk_ids, parent_ids, content_hashes = [], [], [], []
+        collection = await self.get_collection()
+        async for doc in collection.find({"username": username, "filename": {"$in": list(filenames)}}, IDS_PROJECTION):
+            found.append(doc.get("filename"))
+            chunk_ids.extend(doc.get("chunk_ids", []))
+            parent_ids.extend(doc.get("parent_ids", []))
+            if doc.get("content_hash"):
+                content_hashes.append(doc["content_hash"])
+        return {"filenames": found, "chunk_ids": chunk_ids, "parent_ids": parent_ids, "content_hashes": content_hashes}
+
+    @traced("mongo.user_documents.referenced_hashes")
+    async def referenced_content_hashes(self, content_hashes: List[str]) -> Set[str]:
+        """The given file hashes that some user's document still references."""
+        if not content_hashes:
+            return set()
+        collection = await self.get_collection()
+        return set(await collection.distinct("content_hash", {"content_hash": {"$in": list(content_hashes)}}))
     
+    @traced("mongo.user_documents.chunk_ids")
     async def get_all_user_chunk_ids(self, username: str) -> List[str]:
         """Get all chunk IDs for a user's documents."""
         try:
-            docs = await self.get_user_documents(username)
+            collection = await self.get_collection()
             all_chunk_ids = []
-            for doc in docs:
+            async for doc in collection.find({"username": username}, {"_id": 0, "chunk_ids": 1}):
                 all_chunk_ids.extend(doc.get("chunk_ids", []))
             return all_chunk_ids
         except Exception as e:
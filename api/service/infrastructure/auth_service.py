@@ -1,5 +1,6 @@
 from datetime import datetime, timedelta
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -7,6 +8,7 @@ from lib.config import settings
 from lib.signature_guard import verify_signature
 from service.infrastructure.user_service import user_service
 from schema.token_schema import TokenData
+import asyncio
 import logging
 import hashlib
 import secrets
@@ -35,6 +37,20 @@ def _verify_password_with_salt(password: str, hashed: str) -> bool:
     except Exception:
         return False
 
+# PBKDF2 runs on a dedicated, bounded pool so logins never stall the event loop
+# or starve the default executor used for embeddings and vector queries.
+# hashlib releases the GIL while hashing, so the pool uses real cores.
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.password_hash_workers, thread_name_prefix="password-hash"
+)
+# Bounds work queued on the pool; a login burst waits here rather than in the executor queue
+_password_semaphore = asyncio.Semaphore(settings.password_hash_workers * 2)
+
+async def _run_password_hash(func, *args):
+    async with _password_semaphore:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, func, *args)
+
 # HTTP Bearer token scheme
 security = HTTPBearer()
 
@@ -48,6 +64,24 @@ def get_password_hash(password: str) -> str:
     salt = secrets.token_bytes(16)
     return _hash_password_with_salt(password, salt)
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the password-hashing pool"""
+    return await _run_password_hash(_verify_password_with_salt, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the password-hashing pool"""
+    return await _run_password_hash(get_password_hash, password)
+
+def create_user_access_token(user: dict, expires_delta: Optional[timedelta] = None) -> str:
+    """
+    Create an access token carrying the user's id, username and API key version ("kv"),
+    so low-privilege endpoints can authorize from the token alone.
+    """
+    return create_access_token(
+        data={"sub": user["user_id"], "username": user["username"], "kv": user.get("api_keys_version", 0)},
+        expires_delta=expires_delta
+    )
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -67,11 +101,33 @@ def verify_token(token: str) -> Optional[TokenData]:
         user_id: str = payload.get("sub")
         if user_id is None:
             return None
-        token_data = TokenData(user_id=user_id)
+        # username/kv are absent from tokens issued before they were added
+        token_data = TokenData(user_id=user_id, username=payload.get("username"), key_version=payload.get("kv"))
         return token_data
     except JWTError:
         return None
 
+async def get_user_from_token(token: str) -> Optional[dict]:
+    """
+    Load the user for a JWT access token, with decrypted keys, or None if the
+    token is invalid. For callers that cannot use the Bearer header (WebSockets).
+    """
+    token_data = verify_token(token)
+    if token_data is None:
+        return None
+    
+    # User record with decrypted keys for internal use (cached briefly per worker)
+    user = await user_service.get_principal(user_id=token_data.user_id)
+    if user is None:
+        return None
+
+    # A token newer than the cached record means the keys changed in another worker
+    if token_data.key_version is not None and token_data.key_version > user.get("api_keys_version", 0):
+        user_service.invalidate_principal(token_data.user_id)
+        user = await user_service.get_principal(user_id=token_data.user_id)
+    
+    return user
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """FastAPI dependency to get the current user from JWT token"""
     credentials_exception = HTTPException(
@@ -80,20 +136,36 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    user = await get_user_from_token(credentials.credentials)
+    if user is None:
+        raise credentials_exception
+    
+    return user
+
+async def get_token_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """
+    Lightweight FastAPI dependency for endpoints that only need to know who the
+    caller is (listing sessions, documents). Authorizes from the token claims
+    without loading the user or decrypting API keys; returns only user_id and
+    username. Tokens without a username claim fall back to a user lookup.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
     token_data = verify_token(credentials.credentials)
     if token_data is None:
         raise credentials_exception
-    
-    # Use user_service to fetch user from MongoDB
-    user = await user_service.get_user_by_id(user_id=token_data.user_id)
+
+    if token_data.username:
+        return {"user_id": token_data.user_id, "username": token_data.username}
+
+    user = await user_service.get_principal(user_id=token_data.user_id)
     if user is None:
         raise credentials_exception
-        
-    # Decrypt keys for internal use
-    decrypted_keys = await user_service.get_decrypted_api_keys(user_id=token_data.user_id)
-    user["api_keys"] = decrypted_keys
-    
-    return user
+    return {"user_id": user["user_id"], "username": user["username"]}
 
 async def authenticate_user(username: str, password: str):
     """Authenticate a user with username and password"""
@@ -101,6 +173,6 @@ async def authenticate_user(username: str, password: str):
     user = await user_service.get_user_by_username(username)
     if not user:
         return False
-    if not verify_password(password, user["hashed_password"]):
+    if not await verify_password_async(password, user["hashed_password"]):
         return False
     return user
\ No newline at end of file
@@ -40,6 +40,9 @@ class DatabaseService:
         try:
             # User Documents - Index by username
             await self.db.user_documents.create_index("username")
+            await self.db.user_documents.create_index([("username", 1), ("filename", 1)])
+            # Ingestion store references, checked when documents are deleted
+            await self.db.user_documents.create_index("content_hash", sparse=True)
 
             # Users - Index by username and email
             await self.db.users.create_index("username", unique=True)
@@ -48,9 +51,21 @@ class DatabaseService:
             # Chat Sessions - Index by session_id and username
             await self.db.chat_sessions.create_index("session_id", unique=True)
             await self.db.chat_sessions.create_index("username")
+            # Paginated sidebar listing: newest first, session_id breaks ties
+            await self.db.chat_sessions.create_index([("username", 1), ("updated_at", -1), ("session_id", -1)])
             
+            # Chat Messages - One document per message, read by (session_id, seq) ranges
+            await self.db.chat_messages.create_index([("session_id", 1), ("seq", 1)], unique=True)
+
             # Parent Chunks - Index by id
             await self.db.parent_chunks.create_index("id", unique=True)
+
+            # Ingestion Store - Chunk rows read back in (kind, index) order; descriptions set by content hash
+            await self.db.ingestion_chunks.create_index([("key", 1), ("kind", 1), ("index", 1)])
+            await self.db.ingestion_store.create_index("content_hash")
+
+            # Rate Limits - Shared token buckets expire once idle
+            await self.db.rate_limits.create_index("expires_at", expireAfterSeconds=0)
             
 
         except Exception as e:
@@ -0,0 +1,187 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from lib.config import settings
+from service.infrastructure.database_service import database_service
+import hashlib
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+# Idle buckets are dropped from memory / expired from Mongo after this long
+BUCKET_IDLE_SECONDS = 3600
+# Bound on in-memory buckets; the stalest are dropped first
+MAX_MEMORY_BUCKETS = 50000
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a bucket is empty or a concurrency limit is reached."""
+
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"Rate limit exceeded for {scope}")
+        self.scope = scope
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class MemoryBucketStore:
+    """Per-process token buckets. Single event loop, so no locking is needed."""
+
+    def __init__(self):
+        # key -> (tokens, updated_at)
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    async def consume(self, key: str, rate: float, capacity: float, cost: float) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * rate)
+
+        if tokens >= cost:
+            self._buckets[key] = (tokens - cost, now)
+            retry_after = 0.0
+        else:
+            self._buckets[key] = (tokens, now)
+            retry_after = (cost - tokens) / rate
+
+        if len(self._buckets) > MAX_MEMORY_BUCKETS:
+            self._prune(now)
+        return retry_after
+
+    def _prune(self, now: float):
+        stale = [key for key, (_, updated_at) in self._buckets.items() if now - updated_at > BUCKET_IDLE_SECONDS]
+        for key in stale:
+            del self._buckets[key]
+        # Still over the bound: drop the oldest buckets (they have refilled the most)
+        overflow = len(self._buckets) - MAX_MEMORY_BUCKETS
+        if overflow > 0:
+            for key, _ in sorted(self._buckets.items(), key=lambda item: item[1][1])[:overflow]:
+                del self._buckets[key]
+
+
+class MongoBucketStore:
+    """
+    Token buckets shared by all workers, stored in the `rate_limits` collection.
+    Refill and consume happen in one atomic pipeline update per check.
+    """
+
+    async def get_collection(self):
+        if database_service.db is None:
+            await database_service.connect()
+        return database_service.db.rate_limits
+
+    async def consume(self, key: str, rate: float, capacity: float, cost: float) -> float:
+        collection = await self.get_collection()
+        now = time.time()
+        refilled = {"$min": [
+            capacity,
+            {"$add": [
+                {"$ifNull": ["$tokens", capacity]},
+                {"$multiply": [{"$max": [0, {"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}]}, rate]}
+            ]}
+        ]}
+        bucket = await collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updated_at": now}},
+                {"$set": {"allowed": {"$gte": ["$tokens", cost]}}},
+                {"$set": {
+                    "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", cost]}, "$tokens"]},
+                    "expires_at": datetime.utcnow() + timedelta(seconds=BUCKET_IDLE_SECONDS)
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if bucket["allowed"]:
+            return 0.0
+        return (cost - bucket["tokens"]) / rate
+
+
+class RateLimitService:
+    """
+    Token-bucket rate limits plus in-flight concurrency caps, keyed per user,
+    per API key (by hash) or per client IP.
+
+    Buckets live in memory by default; RATE_LIMIT_BACKEND=mongo shares them
+    across workers. Concurrency slots are always per worker, since they track
+    requests running in this process.
+    """
+
+    def __init__(self):
+        self.enabled = settings.rate_limit_enabled
+        self._memory_store = MemoryBucketStore()
+        self._store = MongoBucketStore() if settings.rate_limit_backend == "mongo" else self._memory_store
+        self._in_flight: Dict[str, int] = {}
+
+    def key_scope(self, api_key: str) -> str:
+        """Bucket name for an API key; raw keys are never used as identifiers."""
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:32]
+
+    async def consume(self, scope: str, per_minute: float, burst: float, cost: float = 1.0):
+        """Takes `cost` tokens from a bucket or raises RateLimitExceeded."""
+        if not self.enabled:
+            return
+        rate = per_minute / 60.0
+        try:
+            retry_after = await self._store.consume(scope, rate, burst, cost)
+        except Exception as e:
+            # The shared backend must not take the API down with it
+            logger.warning(f"Rate limit backend unavailable, using local buckets: {e}")
+            retry_after = await self._memory_store.consume(scope, rate, burst, cost)
+        if retry_after > 0:
+            raise RateLimitExceeded(scope, retry_after)
+
+    def _acquire_slots(self, limits: List[Tuple[str, int]]):
+        for index, (scope, limit) in enumerate(limits):
+            if self._in_flight.get(scope, 0) >= limit:
+                self._release_slots(limits[:index])
+                raise RateLimitExceeded(scope, 1)
+            self._in_flight[scope] = self._in_flight.get(scope, 0) + 1
+
+    def _release_slots(self, limits: Iterable[Tuple[str, int]]):
+        for scope, _ in limits:
+            remaining = self._in_flight.get(scope, 1) - 1
+            if remaining > 0:
+                self._in_flight[scope] = remaining
+            else:
+                self._in_flight.pop(scope, None)
+
+    @asynccontextmanager
+    async def concurrency(self, limits: List[Tuple[str, int]]):
+        """Holds one in-flight slot per (scope, limit) for the duration of the block."""
+        if not self.enabled:
+            yield
+            return
+        self._acquire_slots(limits)
+        try:
+            yield
+        finally:
+            self._release_slots(limits)
+
+    @asynccontextmanager
+    async def llm_quota(self, username: str, api_key: Optional[str]):
+        """
+        Guards one LLM-backed request: consumes from the user's and the API key's
+        buckets and holds a concurrency slot on both until the block exits.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        user_scope = f"user:{username}"
+        await self.consume(user_scope, settings.rate_limit_user_per_minute, settings.rate_limit_user_burst)
+        limits = [(user_scope, settings.rate_limit_user_concurrency)]
+
+        if api_key:
+            key_scope = self.key_scope(api_key)
+            await self.consume(key_scope, settings.rate_limit_key_per_minute, settings.rate_limit_key_burst)
+            limits.append((key_scope, settings.rate_limit_key_concurrency))
+
+        async with self.concurrency(limits):
+            yield
+
+
+# Singleton instance
+rate_limit_service = RateLimitService()
@@ -1,24 +1,36 @@
 from typing import List, Dict, Optional, Any
+from collections import OrderedDict
 from service.infrastructure.database_service import database_service
 from lib.security import security_service
 from datetime import datetime
+import copy
+import time
 import uuid
 import logging
+from lib.tracing import traced
 
 
 logger = logging.getLogger(__name__)
 
+# Authenticated principals (user record + decrypted API keys) are reused for this
+# long. Each worker has its own cache, so a key change made through another
+# worker is picked up within this window.
+PRINCIPAL_CACHE_TTL_SECONDS = 60
+PRINCIPAL_CACHE_SIZE = 1024
+
 class UserService:
     """Service for managing users in MongoDB."""
 
     def __init__(self):
-        pass
+        # user_id -> (expires_at, user with decrypted "api_keys")
+        self._principal_cache: "OrderedDict[str, tuple]" = OrderedDict()
 
     async def get_collection(self):
         if database_service.db is None:
             await database_service.connect()
         return database_service.db.users
 
+    @traced("mongo.users.insert")
     async def create_user(self, username: str, hashed_password: str, email: Optional[str] = None) -> Dict[str, Any]:
         """Create a new user in MongoDB."""
         try:
@@ -51,6 +63,7 @@ class UserService:
             logger.error(f"Error creating user {username}: {e}")
             raise e
 
+    @traced("mongo.users.get")
     async def get_user_by_username(self, username: str) -> Optional[Dict[str, Any]]:
         """Retrieve a user by username."""
         try:
@@ -66,6 +79,7 @@ class UserService:
             logger.error(f"Error fetching user {username}: {e}")
             return None
 
+    @traced("mongo.users.get")
     async def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve a user by user_id."""
         try:
@@ -81,6 +95,7 @@ class UserService:
             logger.error(f"Error fetching user by id {user_id}: {e}")
             return None
 
+    @traced("mongo.users.get")
     async def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
         """Retrieve a user by email."""
         try:
@@ -100,6 +115,43 @@ class UserService:
             return None
 
 
+    async def get_principal(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the user record with decrypted API keys under "api_keys", as
+        needed by get_current_user. Served from a short-TTL cache; a miss costs
+        one find_one. Callers get their own copy and may mutate it freely.
+        """
+        cached = self._principal_cache.get(user_id)
+        if cached is not None:
+            expires_at, principal = cached
+            if expires_at > time.monotonic():
+                self._principal_cache.move_to_end(user_id)
+                return copy.deepcopy(principal)
+            del self._principal_cache[user_id]
+
+        user = await self.get_user_by_id(user_id)
+        if user is None:
+            return None
+
+        user["api_keys"] = self._decrypt_api_keys(user)
+        self._principal_cache[user_id] = (time.monotonic() + PRINCIPAL_CACHE_TTL_SECONDS, user)
+        if len(self._principal_cache) > PRINCIPAL_CACHE_SIZE:
+            self._principal_cache.popitem(last=False)
+        return copy.deepcopy(user)
+
+    def invalidate_principal(self, user_id: str):
+        """Drops a cached principal, e.g. after its API keys change."""
+        self._principal_cache.pop(user_id, None)
+
+    def _decrypt_api_keys(self, user: Dict[str, Any]) -> Dict[str, str]:
+        decrypted_keys = {}
+        for provider, encrypted_key in (user.get("api_keys") or {}).items():
+            val = security_service.decrypt_value(encrypted_key)
+            if val:
+                decrypted_keys[provider] = val
+        return decrypted_keys
+
+    @traced("mongo.users.update_api_keys")
     async def update_api_keys(self, user_id: str, api_keys: Dict[str, str]) -> bool:
         """Update user API keys securely."""
         try:
@@ -120,16 +172,19 @@ class UserService:
                     # If empty string provided, remove the key
                     del current_keys[provider]
             
+            # Bumping the version lets tokens issued from now on signal the change
             await collection.update_one(
                 {"user_id": user_id},
-                {"$set": {"api_keys": current_keys}}
+                {"$set": {"api_keys": current_keys}, "$inc": {"api_keys_version": 1}}
             )
+            self.invalidate_principal(user_id)
             return True
             
         except Exception as e:
             logger.error(f"Error updating API keys for user {user_id}: {e}")
             raise e
 
+    @traced("mongo.users.get_api_keys")
     async def get_decrypted_api_keys(self, user_id: str) -> Dict[str, str]:
         """Retrieve decrypted API keys for a user."""
         try:
@@ -139,13 +194,7 @@ class UserService:
             if not user or "api_keys" not in user:
                 return {}
             
-            decrypted_keys = {}
-            for provider, encrypted_key in user["api_keys"].items():
-                val = security_service.decrypt_value(encrypted_key)
-                if val:
-                    decrypted_keys[provider] = val
-                
-            return decrypted_keys
+            return self._decrypt_api_keys(user)
             
         except Exception as e:
             logger.error(f"Error fetching API keys for user {user_id}: {e}")
@@ -0,0 +1,150 @@
+"""
+Prometheus metrics for LLM providers and the RAG pipeline.
+
+Metric values live in prometheus_client's per-process storage. When
+PROMETHEUS_MULTIPROC_DIR is set (required with several uvicorn workers), each
+worker writes its own mmap-backed files and `/metrics` aggregates all of them,
+so nothing is shared or locked across workers and nothing is written to stdout.
+"""
+import asyncio
+import functools
+import os
+import time
+from contextlib import contextmanager
+from typing import Collection, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+# LLM round trips range from a few hundred ms (titles) to tens of seconds (long answers)
+LLM_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+# Local models and the vector store are expected to answer well under a second
+STAGE_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+# Model label for models a provider does not declare; the model comes from the
+# request, so passing it through would let clients create unbounded label sets
+OTHER_MODEL_LABEL = "other"
+
+LLM_REQUESTS = Counter(
+    "llm_requests_total",
+    "LLM calls by provider, model, operation and outcome",
+    ["provider", "model", "operation", "status"],
+)
+LLM_LATENCY = Histogram(
+    "llm_request_duration_seconds",
+    "LLM call latency",
+    ["provider", "model", "operation"],
+    buckets=LLM_LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens reported by the provider",
+    ["provider", "model", "type"],
+)
+LLM_GATEWAY_EVENTS = Counter(
+    "llm_gateway_events_total",
+    "Retries, hedged requests and failovers issued by the LLM gateway",
+    ["provider", "operation", "event"],
+)
+STAGE_LATENCY = Histogram(
+    "rag_component_duration_seconds",
+    "Latency of embedding, rerank and vector store operations",
+    ["component", "operation"],
+    buckets=STAGE_LATENCY_BUCKETS,
+)
+STAGE_ERRORS = Counter(
+    "rag_component_errors_total",
+    "Failed embedding, rerank and vector store operations",
+    ["component", "operation"],
+)
+
+
+class LLMCall:
+    """Handle yielded by `MetricsService.track_llm` to attach token usage."""
+
+    __slots__ = ("provider", "model")
+
+    def __init__(self, provider: str, model: str):
+        self.provider = provider
+        self.model = model
+
+    def record_usage(self, prompt_tokens: Optional[int], completion_tokens: Optional[int]):
+        if prompt_tokens:
+            LLM_TOKENS.labels(self.provider, self.model, "prompt").inc(prompt_tokens)
+        if completion_tokens:
+            LLM_TOKENS.labels(self.provider, self.model, "completion").inc(completion_tokens)
+
+
+class MetricsService:
+    """Records metrics and renders them for the `/metrics` endpoint."""
+
+    content_type = CONTENT_TYPE_LATEST
+
+    @contextmanager
+    def track_llm(self, provider: str, model: str, operation: str, known_models: Collection[str]):
+        """
+        Counts and times one LLM call; exceptions are recorded as errors and
+        re-raised. Models outside `known_models` are labelled "other".
+        """
+        model = model if model in known_models else OTHER_MODEL_LABEL
+        call = LLMCall(provider, model)
+        started = time.perf_counter()
+        status = "success"
+        try:
+            yield call
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            LLM_LATENCY.labels(provider, model, operation).observe(time.perf_counter() - started)
+            LLM_REQUESTS.labels(provider, model, operation, status).inc()
+
+    def record_gateway_event(self, provider: str, operation: str, event: str):
+        LLM_GATEWAY_EVENTS.labels(provider, operation, event).inc()
+
+    def observe(self, component: str, operation: str, seconds: float):
+        STAGE_LATENCY.labels(component, operation).observe(seconds)
+
+    def record_error(self, component: str, operation: str):
+        STAGE_ERRORS.labels(component, operation).inc()
+
+    def render(self) -> bytes:
+        """Exposition output, aggregated across workers in multiprocess mode."""
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            return generate_latest(registry)
+        return generate_latest()
+
+
+metrics_service = MetricsService()
+
+
+def timed(component: str, operation: str):
+    """Decorator that records the duration of a sync or async function."""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    metrics_service.observe(component, operation, time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics_service.observe(component, operation, time.perf_counter() - started)
+        return sync_wrapper
+
+    return decorator
@@ -0,0 +1,115 @@
+import asyncio
+import functools
+import hashlib
+import importlib.util
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Distinct API keys kept warm per provider (server key + user-supplied keys)
+DEFAULT_MAX_CLIENTS = 64
+# Clients unused for this long are closed so idle user keys do not hold sockets
+DEFAULT_IDLE_TIMEOUT_SECONDS = 600
+# Evicted clients may still be serving an in-flight call; close them after this delay
+CLOSE_GRACE_SECONDS = 120
+
+
+@functools.lru_cache(maxsize=1)
+def http2_available() -> bool:
+    """httpx only negotiates HTTP/2 when the optional `h2` package is installed."""
+    return importlib.util.find_spec("h2") is not None
+
+
+class ClientPool:
+    """
+    Keyed pool of SDK clients, one per API key.
+
+    Clients are looked up by a SHA-256 of the key (raw keys are never kept as
+    dict keys), so repeated calls with the same key reuse the client's HTTP
+    connection pool instead of paying connection and TLS setup on every
+    request. Least-recently-used and idle clients are evicted and closed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[str], Any],
+        closer: Optional[Callable[[Any], Awaitable[None]]] = None,
+        max_size: int = DEFAULT_MAX_CLIENTS,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT_SECONDS,
+    ):
+        self.name = name
+        self._factory = factory
+        self._closer = closer
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        # key hash -> (client, last used monotonic time)
+        self._clients: "OrderedDict[str, tuple]" = OrderedDict()
+        self._close_tasks: set = set()
+
+    def _key_hash(self, api_key: str) -> str:
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+    def get(self, api_key: str) -> Any:
+        """Returns the pooled client for this key, creating it on first use."""
+        now = time.monotonic()
+        self._evict_idle(now)
+
+        key_hash = self._key_hash(api_key)
+        entry = self._clients.get(key_hash)
+        if entry is not None:
+            self._clients[key_hash] = (entry[0], now)
+            self._clients.move_to_end(key_hash)
+            return entry[0]
+
+        client = self._factory(api_key)
+        self._clients[key_hash] = (client, now)
+        while len(self._clients) > self.max_size:
+            _, (evicted, _) = self._clients.popitem(last=False)
+            self._schedule_close(evicted)
+        logger.debug(f"Created {self.name} client ({len(self._clients)} pooled)")
+        return client
+
+    def _evict_idle(self, now: float):
+        # Entries are in LRU order, so the idle ones are at the front
+        while self._clients:
+            key_hash, (client, last_used) = next(iter(self._clients.items()))
+            if now - last_used < self.idle_timeout:
+                break
+            del self._clients[key_hash]
+            self._schedule_close(client)
+
+    def _schedule_close(self, client: Any):
+        if self._closer is None:
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(self._close_later(client))
+        except RuntimeError:
+            # No running loop (e.g. during interpreter shutdown); let GC reclaim it
+            return
+        self._close_tasks.add(task)
+        task.add_done_callback(self._close_tasks.discard)
+
+    async def _close_later(self, client: Any):
+        await asyncio.sleep(CLOSE_GRACE_SECONDS)
+        try:
+            await self._closer(client)
+        except Exception as e:
+            logger.debug(f"Failed to close evicted {self.name} client: {e}")
+
+    async def close_all(self):
+        """Closes every pooled client immediately (application shutdown)."""
+        clients = [client for client, _ in self._clients.values()]
+        self._clients.clear()
+        for task in list(self._close_tasks):
+            task.cancel()
+        if self._closer is None:
+            return
+        for client in clients:
+            try:
+                await self._closer(client)
+            except Exception as e:
+                logger.debug(f"Failed to close {self.name} client: {e}")
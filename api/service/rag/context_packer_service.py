@@ -0,0 +1,277 @@
+from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+from lib.config import settings
+import logging
+import math
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Approximate characters per token for each model family. We do not ship the
+# provider tokenizers, so counts are estimates tuned slightly on the high side.
+CHARS_PER_TOKEN = {
+    "gemini": 4.0,
+    "llama": 3.5,
+}
+DEFAULT_CHARS_PER_TOKEN = 3.5
+
+# Total prompt budget (context sections only) per model family
+MODEL_TOKEN_BUDGETS = {
+    "gemini": 12000,
+    "llama": 6000,
+}
+DEFAULT_TOKEN_BUDGET = 6000
+
+# Share of the budget each section is entitled to before redistribution
+SECTION_SHARES = {
+    "documents": 0.6,
+    "history": 0.3,
+    "overview": 0.1,
+}
+
+# Older assistant answers are compressed to this many tokens before anything is dropped
+HISTORY_MESSAGE_MAX_TOKENS = 300
+# Below this many remaining tokens an item is dropped rather than truncated
+MIN_COMPRESSED_TOKENS = 48
+
+# Packed document overviews, keyed by catalog snapshot, model family and budget
+OVERVIEW_CACHE_SIZE = 1024
+
+
+class ContextPackerService:
+    """
+    Assembles the generation prompt context under a per-model token budget.
+    The budget is split across document context, chat history and the document
+    overview; the lowest-value items (lowest scored chunks, oldest messages,
+    trailing descriptions) are compressed or dropped first.
+    """
+
+    def __init__(self):
+        self._cache_lock = threading.Lock()
+        self._overview_cache: "OrderedDict[tuple, Any]" = OrderedDict()
+
+    def _cached_overview(self, key: tuple, build):
+        """Returns the memoized value for key, building and storing it on a miss."""
+        with self._cache_lock:
+            if key in self._overview_cache:
+                self._overview_cache.move_to_end(key)
+                return self._overview_cache[key]
+
+        value = build()
+        with self._cache_lock:
+            self._overview_cache[key] = value
+            if len(self._overview_cache) > OVERVIEW_CACHE_SIZE:
+                self._overview_cache.popitem(last=False)
+        return value
+
+    def _model_family(self, model: Optional[str]) -> str:
+        model = (model or "").lower()
+        if "groq" in model or "llama" in model:
+            return "llama"
+        return "gemini"
+
+    def get_token_budget(self, model: Optional[str] = None) -> int:
+        """Returns the context token budget for a model (CONTEXT_TOKEN_BUDGET overrides)."""
+        if settings.context_token_budget:
+            return settings.context_token_budget
+        return MODEL_TOKEN_BUDGETS.get(self._model_family(model), DEFAULT_TOKEN_BUDGET)
+
+    def count_tokens(self, text: str, model: Optional[str] = None) -> int:
+        """Estimates the token count of a text for the given model."""
+        if not text:
+            return 0
+        ratio = CHARS_PER_TOKEN.get(self._model_family(model), DEFAULT_CHARS_PER_TOKEN)
+        return max(1, math.ceil(len(text) / ratio))
+
+    def truncate_to_tokens(self, text: str, max_tokens: int, model: Optional[str] = None) -> str:
+        """Cuts a text down to roughly max_tokens, preferring a word boundary."""
+        if self.count_tokens(text, model) <= max_tokens:
+            return text
+
+        ratio = CHARS_PER_TOKEN.get(self._model_family(model), DEFAULT_CHARS_PER_TOKEN)
+        max_chars = max(0, int(max_tokens * ratio) - 3)
+        cut = text[:max_chars]
+        last_space = cut.rfind(" ")
+        if last_space > max_chars * 0.8:
+            cut = cut[:last_space]
+        return cut.rstrip() + "..."
+
+    def _allocate(self, needs: Dict[str, int], budget: int) -> Dict[str, int]:
+        """
+        Splits the budget by SECTION_SHARES, then hands whatever a section does
+        not need to the sections that still want more.
+        """
+        allocation = {name: int(budget * share) for name, share in SECTION_SHARES.items()}
+
+        # Two passes are enough for three sections
+        for _ in range(2):
+            surplus = 0
+            for name in allocation:
+                if allocation[name] > needs.get(name, 0):
+                    surplus += allocation[name] - needs.get(name, 0)
+                    allocation[name] = needs.get(name, 0)
+
+            hungry = [name for name in allocation if needs.get(name, 0) > allocation[name]]
+            if not surplus or not hungry:
+                break
+
+            total_share = sum(SECTION_SHARES[name] for name in hungry)
+            for name in hungry:
+                allocation[name] += int(surplus * SECTION_SHARES[name] / total_share)
+
+        return allocation
+
+    def _pack_documents(self, contents: List[str], budget: int, model: Optional[str]) -> List[str]:
+        """Chunks arrive sorted by relevance; keep them in order until the budget runs out."""
+        packed = []
+        remaining = budget
+        for content in contents:
+            tokens = self.count_tokens(content, model)
+            if tokens <= remaining:
+                packed.append(content)
+                remaining -= tokens
+            elif remaining >= MIN_COMPRESSED_TOKENS:
+                packed.append(self.truncate_to_tokens(content, remaining, model))
+                remaining = 0
+            else:
+                break
+        return packed
+
+    def _pack_history(self, chat_history: List[Dict[str, Any]], budget: int, model: Optional[str], summary: str = "") -> List[str]:
+        """
+        Walks the history from newest to oldest. The latest exchange is kept
+        verbatim where possible, older assistant answers are compressed, and
+        the oldest messages are dropped once the budget is spent. A running
+        summary of earlier turns may take up to half of the history budget.
+        """
+        summary_line = ""
+        remaining = budget
+        if summary:
+            summary = self.truncate_to_tokens(summary, budget // 2, model)
+            summary_line = f"Summary of earlier conversation: {summary}"
+            remaining -= self.count_tokens(summary_line, model)
+
+        lines = []
+        for position, msg in enumerate(reversed(chat_history)):
+            role = msg.get('role', 'user')
+            content = msg.get('content', '') or ''
+            prefix = "User: " if role == 'user' else "Assistant: "
+
+            # Anything older than the last exchange is lower value; compress long answers
+            if position >= 2 and role != 'user':
+                content = self.truncate_to_tokens(content, HISTORY_MESSAGE_MAX_TOKENS, model)
+
+            tokens = self.count_tokens(content, model) + 2
+            if tokens <= remaining:
+                lines.append(prefix + content)
+                remaining -= tokens
+            elif remaining >= MIN_COMPRESSED_TOKENS:
+                lines.append(prefix + self.truncate_to_tokens(content, remaining - 2, model))
+                remaining = 0
+                break
+            else:
+                break
+
+        lines.reverse()
+        if summary_line:
+            lines.insert(0, summary_line)
+        return lines
+
+    def _pack_overview(self, descriptions: List[str], budget: int, model: Optional[str]) -> List[str]:
+        """Keeps descriptions in order and summarizes whatever does not fit."""
+        packed = []
+        remaining = budget
+        for index, desc in enumerate(descriptions):
+            tokens = self.count_tokens(desc, model) + 2
+            if tokens > remaining:
+                omitted = len(descriptions) - index
+                packed.append(f"...and {omitted} more document{'s' if omitted != 1 else ''}")
+                break
+            packed.append(desc)
+            remaining -= tokens
+        return packed
+
+    def pack(
+        self,
+        context_chunks: List[Dict[str, Any]],
+        chat_history: Optional[List[Dict[str, Any]]] = None,
+        document_descriptions: Optional[List[str]] = None,
+        model: Optional[str] = None,
+        budget: Optional[int] = None,
+        conversation_summary: str = "",
+        overview_cache_key: Optional[tuple] = None,
+    ) -> Dict[str, Any]:
+        """
+        Packs chunks, history (with an optional running summary) and
+        descriptions into the token budget.
+
+        When `overview_cache_key` identifies an immutable set of descriptions
+        (see `DocumentCatalog.overview_key`), the overview's token need and its
+        packed text are computed once per budget and reused across queries.
+
+        Returns:
+            Dict with the prompt-ready 'context', 'conversation' and 'overview'
+            strings plus a 'usage' breakdown of estimated tokens per section.
+        """
+        budget = budget or self.get_token_budget(model)
+        chat_history = chat_history or []
+        document_descriptions = document_descriptions or []
+
+        chunk_contents = [chunk.get("metadata", {}).get("content", "") for chunk in context_chunks]
+        chunk_contents = [content for content in chunk_contents if content]
+
+        needs = {
+            "documents": sum(self.count_tokens(c, model) for c in chunk_contents),
+            "history": sum(self.count_tokens(m.get('content', '') or '', model) + 2 for m in chat_history)
+                       + self.count_tokens(conversation_summary, model),
+        }
+        family = self._model_family(model)
+
+        def overview_need():
+            return sum(self.count_tokens(d, model) + 2 for d in document_descriptions)
+
+        if overview_cache_key is None:
+            needs["overview"] = overview_need()
+        else:
+            needs["overview"] = self._cached_overview((overview_cache_key, family, "need"), overview_need)
+        allocation = self._allocate(needs, budget)
+
+        documents = self._pack_documents(chunk_contents, allocation["documents"], model)
+        history = self._pack_history(chat_history, allocation["history"], model, conversation_summary)
+
+        def build_overview():
+            packed = self._pack_overview(document_descriptions, allocation["overview"], model)
+            return len(packed), "\n".join(f"- {desc}" for desc in packed)
+
+        if overview_cache_key is None:
+            overview_count, overview_text = build_overview()
+        else:
+            overview_count, overview_text = self._cached_overview(
+                (overview_cache_key, family, allocation["overview"]), build_overview
+            )
+
+        context = "\n\n---\n\n".join(documents)
+        conversation = "\n".join(history)
+
+        usage = {
+            "budget": budget,
+            "documents": self.count_tokens(context, model),
+            "history": self.count_tokens(conversation, model),
+            "overview": self.count_tokens(overview_text, model),
+        }
+        logger.info(
+            f"Packed context: {len(documents)}/{len(chunk_contents)} chunks, "
+            f"{len(history)}/{len(chat_history)} messages, {overview_count}/{len(document_descriptions)} descriptions "
+            f"| tokens: {usage}"
+        )
+
+        return {
+            "context": context,
+            "conversation": conversation,
+            "overview": overview_text,
+            "usage": usage,
+        }
+
+
+# Singleton instance
+context_packer_service = ContextPackerService()
@@ -4,6 +4,8 @@ from lib.config import settings
 import logging
 import asyncio
 import time
+from lib.tracing import traced
+from service.monitoring.metrics_service import metrics_service, timed
 
 logger = logging.getLogger(__name__)
 
@@ -16,13 +18,16 @@ class EmbeddingService:
         try:
             logger.info("Initializing FastEmbed Service (BAAI/bge-small-en-v1.5)...")
             # This will download the model if not present (~something small, <1GB)
-            self.model = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
+            self.model_name = "BAAI/bge-small-en-v1.5"
+            self.model = TextEmbedding(model_name=self.model_name)
             self.output_dim = 384
             logger.info("FastEmbed Service initialized successfully.")
         except Exception as e:
             logger.error(f"Failed to initialize FastEmbed Service: {e}")
             self.model = None
 
+    @traced("fastembed.embed_query")
+    @timed("embedding", "embed_query")
     async def get_embedding(self, text: str) -> List[float]:
         """
         Generates a 384-dimensional vector embedding for the given text using local FastEmbed model.
@@ -47,9 +52,12 @@ class EmbeddingService:
             )
             return embeddings[0].tolist() if hasattr(embeddings[0], 'tolist') else list(embeddings[0])
         except Exception as e:
+            metrics_service.record_error("embedding", "embed_query")
             logger.error(f"Failed to generate embedding: {e}")
             return []
 
+    @traced("fastembed.embed_batch")
+    @timed("embedding", "embed_batch")
     async def get_embeddings_batch(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
         """
         Generate 384-dimensional embeddings for multiple texts using local FastEmbed.
@@ -81,6 +89,7 @@ class EmbeddingService:
             return result
 
         except Exception as e:
+            metrics_service.record_error("embedding", "embed_batch")
             logger.error(f"Failed to generate batch embeddings: {e}")
             # Return empty list matching input length to avoid misalignments upstream? 
             # Or just empty list. The original code returned empty lists for failed items 
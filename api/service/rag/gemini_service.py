@@ -2,13 +2,15 @@ from typing import List, Dict, Any
 from lib.config import settings
 import logging
 import asyncio
-import asyncio
+import importlib.util
 from datetime import datetime
 
 import google.genai as genai
 from google.genai import types
 from google.genai.types import HarmCategory, HarmBlockThreshold
-from service.monitoring.usage_tracker import usage_tracker
+from service.monitoring.metrics_service import metrics_service
+from service.rag.client_pool import ClientPool, http2_available
+from lib.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -24,8 +26,27 @@ logging.getLogger("google.api_core").setLevel(logging.WARNING)
 logging.getLogger("google_genai").setLevel(logging.WARNING)
 logging.getLogger("google_genai.models").setLevel(logging.WARNING)
 
+def _create_client(api_key: str) -> genai.Client:
+    # Retries belong to the LLM gateway; a single attempt keeps SDK retries
+    # from multiplying with its own
+    http_options = types.HttpOptions(retry_options=types.HttpRetryOptions(attempts=1))
+    # The SDK talks to the API through httpx unless aiohttp is installed;
+    # only the httpx transport can negotiate HTTP/2.
+    if http2_available() and importlib.util.find_spec("aiohttp") is None:
+        http_options.async_client_args = {"http2": True}
+    return genai.Client(api_key=api_key, http_options=http_options)
+
+
+async def _close_client(client: genai.Client):
+    aclose = getattr(client.aio, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
 class GeminiService:
     def __init__(self):
+        # One client per API key, reused across calls to keep connections warm
+        self._clients = ClientPool("gemini", _create_client, _close_client)
         # Safety settings to configure what content is blocked.
         self.safety_settings = [
             types.SafetySetting(
@@ -55,100 +76,49 @@ class GeminiService:
         if not key:
             logger.warning("No Google API key provided or found in settings.")
             return None
-        return genai.Client(api_key=key)
+        return self._clients.get(key)
+
+    async def close_clients(self):
+        """Closes pooled clients on shutdown."""
+        await self._clients.close_all()
+
+    def _token_usage(self, response) -> tuple:
+        """(prompt, completion) token counts from a response's usage_metadata, if present."""
+        usage = getattr(response, "usage_metadata", None)
+        if not usage:
+            return None, None
+        return usage.prompt_token_count, usage.candidates_token_count
 
-    async def generate_description(self, content: str, title: str = None, api_key: str = None) -> str:
-        """
-        Generates a short description or summary for a document using Gemini.
-        """
-        if not content or not isinstance(content, str):
-            return "No description available."
-            
-        client = self._get_client(api_key)
-        if not client:
-             return "No description available (API Key missing)."
-
-        prompt = (
-            f"Summarize the following document in 1-2 sentences for a user-facing description. "
-            f"Be concise and clear.\n\n"
-            f"Title: {title or ''}\n"
-            f"Content: {content[:2000]}"
-        )
-        try:
-            # New SDK async generation
-            usage_tracker.increment()
-            response = await client.aio.models.generate_content(
-                model=GENERATIVE_MODEL_NAME,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    safety_settings=self.safety_settings
-                )
-            )
-            return response.text.strip()
-        except Exception as e:
-            logger.error(f"Failed to generate description: {e}")
-            return "No description available."
-            
-    async def generate_chat_title(self, query: str, api_key: str = None) -> str:
-        """
-        Generates a simple, short title for a chat session based on the first query.
-        """
-        if not query or not isinstance(query, str):
-            return "New Chat"
-            
-        client = self._get_client(api_key)
-        if not client:
-            return "New Chat"
-        
-        # Use Gemini to generate a creative and concise title
-        prompt = (
-            f"Generate a very short, concise title (max 4-5 words) for a chat session that starts with this user query: "
-            f"'{query}'\n\n"
-            f"Title:"
-        )
-        try:
-            usage_tracker.increment()
-            response = await client.aio.models.generate_content(
-                model=GENERATIVE_MODEL_NAME,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    safety_settings=self.safety_settings
-                )
-            )
-            title = response.text
-            # Clean up the title (remove quotes, extra whitespace)
-            title = title.strip().strip('"').strip("'")
-            return title if len(title) <= 50 else title[:47] + "..."
-        except Exception as e:
-            logger.error(f"Failed to generate chat title: {e}")
-            return "New Chat"
-        
     async def initialize_gemini(self):
         """Deprecated: No longer needed with per-request clients."""
         logger.info("Gemini Service initialized (stateless mode).")
         return True
 
-    async def generate_answer(self, prompt: str, api_key: str = None, model: str = None) -> str:
-        """Generates a text response based on a prompt using an async call."""
+    @traced("gemini.complete")
+    async def complete(self, prompt: str, api_key: str = None, model: str = None, system: str = None, operation: str = "answer") -> str:
+        """
+        Makes a single generation call and returns the text.
+        Raises on any failure; deadlines, retries and failover are handled by llm_gateway.
+        """
         client = self._get_client(api_key)
         if not client:
-            logger.error("Gemini client could not be initialized (Missing Key).")
-            return "Sorry, the generation service is not available (Missing API Key)."
-            
-        try:
-            # New SDK async generation
-            usage_tracker.increment()
+            raise ValueError("Gemini API key is missing")
+
+        model_name = model or GENERATIVE_MODEL_NAME
+        with metrics_service.track_llm("gemini", model_name, operation, known_models=(GENERATIVE_MODEL_NAME,)) as call:
             response = await client.aio.models.generate_content(
-                model=model or GENERATIVE_MODEL_NAME,
+                model=model_name,
                 contents=prompt,
                 config=types.GenerateContentConfig(
-                    safety_settings=self.safety_settings
+                    safety_settings=self.safety_settings,
+                    system_instruction=system
                 )
             )
-            return response.text
-        except Exception as e:
-            logger.error(f"Failed to generate answer: {e}")
-            return "Sorry, I couldn't generate an answer at this time."
+            call.record_usage(*self._token_usage(response))
+
+        if not response.text:
+            raise ValueError("Gemini returned an empty response")
+        return response.text
 
 # Singleton instance
 gemini_service = GeminiService()
\ No newline at end of file
@@ -4,17 +4,39 @@ import logging
 import asyncio
 from datetime import datetime
 
+import httpx
 from groq import AsyncGroq
-from service.monitoring.usage_tracker import usage_tracker
+from service.monitoring.metrics_service import metrics_service
+from service.rag.client_pool import ClientPool, http2_available
+from lib.tracing import traced
 
 logger = logging.getLogger(__name__)
 
 # Constants for model names
 GENERATIVE_MODEL_NAME = "llama-3.3-70b-versatile"
 
+# Keep-alive connections shared by all calls made with the same key
+HTTP_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60)
+
+
+def _create_client(api_key: str) -> AsyncGroq:
+    http_client = httpx.AsyncClient(
+        http2=http2_available(),
+        limits=HTTP_LIMITS,
+        timeout=httpx.Timeout(60.0, connect=5.0),
+    )
+    # Retries belong to the LLM gateway; SDK retries would multiply with its own
+    return AsyncGroq(api_key=api_key, http_client=http_client, max_retries=0)
+
+
+async def _close_client(client: AsyncGroq):
+    await client.close()
+
+
 class GroqService:
     def __init__(self):
-        self._client: Optional[AsyncGroq] = None
+        # One client per API key, reused across calls to keep connections warm
+        self._clients = ClientPool("groq", _create_client, _close_client)
 
     def _get_client(self, api_key: str = None) -> Optional[AsyncGroq]:
         """
@@ -25,95 +47,44 @@ class GroqService:
         if not key:
             logger.warning("No Groq API key provided or found in settings.")
             return None
-        
-        # In a real scenario, we might want to cache the client if the key is the same.
-        # But for request-scoped keys, creating a new client is safer.
-        return AsyncGroq(api_key=key)
+        return self._clients.get(key)
 
-    async def generate_description(self, content: str, title: str = None, api_key: str = None) -> str:
-        """
-        Generates a short description or summary for a document using Groq.
-        """
-        if not content or not isinstance(content, str):
-            return "No description available."
-            
-        client = self._get_client(api_key)
-        if not client:
-             return "No description available (API Key missing)."
-
-        prompt = (
-            f"Summarize the following document in 1-2 sentences for a user-facing description. "
-            f"Be concise and clear.\n\n"
-            f"Title: {title or ''}\n"
-            f"Content: {content[:2000]}"
-        )
-        try:
-            usage_tracker.increment()
-            response = await client.chat.completions.create(
-                model=GENERATIVE_MODEL_NAME,
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that summarizes documents concisely."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            logger.error(f"Failed to generate description: {e}")
-            return "No description available."
-            
-    async def generate_chat_title(self, query: str, api_key: str = None) -> str:
+    async def close_clients(self):
+        """Closes pooled clients on shutdown."""
+        await self._clients.close_all()
+
+    def _token_usage(self, response) -> tuple:
+        """(prompt, completion) token counts from a chat completion's usage block, if present."""
+        usage = getattr(response, "usage", None)
+        if not usage:
+            return None, None
+        return usage.prompt_tokens, usage.completion_tokens
+
+    @traced("groq.complete")
+    async def complete(self, prompt: str, api_key: str = None, model: str = None, system: str = None, operation: str = "answer") -> str:
         """
-        Generates a simple, short title for a chat session based on the first query.
+        Makes a single chat completion call and returns the text.
+        Raises on any failure; deadlines, retries and failover are handled by llm_gateway.
         """
-        if not query or not isinstance(query, str):
-            return "New Chat"
-            
-        client = self._get_client(api_key)
-        if not client:
-            return "New Chat"
-        
-        # Use Groq to generate a creative and concise title
-        prompt = (
-            f"Generate a very short, concise title (max 4-5 words) for a chat session that starts with this user query: "
-            f"'{query}'\n\n"
-            f"Title:"
-        )
-        try:
-            usage_tracker.increment()
-            response = await client.chat.completions.create(
-                model=GENERATIVE_MODEL_NAME,
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that generates short titles."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            title = response.choices[0].message.content.strip()
-            # Clean up the title (remove quotes, extra whitespace)
-            title = title.strip().strip('"').strip("'")
-            return title if len(title) <= 50 else title[:47] + "..."
-        except Exception as e:
-            logger.error(f"Failed to generate chat title: {e}")
-            return "New Chat"
-        
-    async def generate_answer(self, prompt: str, api_key: str = None) -> str:
-        """Generates a text response based on a prompt using an async call."""
         client = self._get_client(api_key)
         if not client:
-            logger.error("Groq client could not be initialized (Missing Key).")
-            return "Sorry, the generation service is not available (Missing API Key)."
-            
-        try:
-            usage_tracker.increment()
+            raise ValueError("Groq API key is missing")
+
+        messages = [{"role": "system", "content": system}] if system else []
+        messages.append({"role": "user", "content": prompt})
+
+        model_name = model or GENERATIVE_MODEL_NAME
+        with metrics_service.track_llm("groq", model_name, operation, known_models=(GENERATIVE_MODEL_NAME,)) as call:
             response = await client.chat.completions.create(
-                model=GENERATIVE_MODEL_NAME,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
+                model=model_name,
+                messages=messages
             )
-            return response.choices[0].message.content
-        except Exception as e:
-            logger.error(f"Failed to generate answer: {e}")
-            return "Sorry, I couldn't generate an answer at this time."
+            call.record_usage(*self._token_usage(response))
+
+        content = response.choices[0].message.content
+        if not content:
+            raise ValueError("Groq returned an empty response")
+        return content
 
 # Singleton instance
 groq_service = GroqService()
@@ -0,0 +1,231 @@
+import asyncio
+import logging
+from array import array
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from bson import Binary
+from pymongo.errors import DuplicateKeyError
+
+from lib.config import settings
+from service.infrastructure.database_service import database_service
+from lib.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+# Leading text kept per entry: enough for placeholder and LLM descriptions
+PREVIEW_CHARS = 2000
+# Chunk rows written per insert_many round trip
+INSERT_BATCH_SIZE = 1000
+# An entry left "building" this long (worker died mid-save) may be rebuilt
+STALE_BUILD_SECONDS = 3600
+
+PARENT_ROW = "p"
+CHILD_ROW = "c"
+
+
+class IngestionStoreService:
+    """
+    Content-addressed store of ingestion results, keyed by the sha256 of the
+    uploaded file.
+
+    The first upload of a file saves its text preview, description, parent
+    chunks and child chunk embeddings here. Any later upload of the same bytes,
+    by any user, skips extraction, chunking, embedding and the description call
+    and gets its own copy of the index under fresh IDs, so vectors and parent
+    chunks stay tenant-scoped (`username` metadata) and are deleted per user as
+    before.
+
+    Entries are also keyed by the indexing pipeline (embedding model and chunk
+    sizes), so changing either never reuses incompatible embeddings. Embeddings
+    are stored as packed float32.
+
+    Entries live as long as a user document references their file: user
+    documents record the file's content_hash, and deleting the last of them
+    removes the file's entries through `forget`.
+    """
+
+    def __init__(self):
+        self.enabled = settings.ingestion_store_enabled
+        # Background saves, referenced so they are not garbage collected mid-flight
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _key(self, content_hash: str, pipeline: str) -> str:
+        return f"{content_hash}:{pipeline}"
+
+    async def get_collections(self):
+        """Helper to get the (entries, chunk rows) collections."""
+        if database_service.db is None:
+            await database_service.connect()
+        return database_service.db.ingestion_store, database_service.db.ingestion_chunks
+
+    @traced("mongo.ingestion_store.lookup")
+    async def lookup(self, content_hash: str, pipeline: str) -> Optional[Dict[str, Any]]:
+        """
+        The stored ingestion of a file, or None on a miss.
+        Returns {"content_hash", "preview", "description", "parents": [content],
+        "children": [{"content", "parent", "chunk_index", "values"}]}, where
+        `parent` indexes into `parents`.
+        """
+        if not self.enabled:
+            return None
+        try:
+            entries, chunks = await self.get_collections()
+            key = self._key(content_hash, pipeline)
+            entry = await entries.find_one({"_id": key, "status": "complete"})
+            if entry is None:
+                return None
+
+            parents: List[str] = []
+            children: List[Dict[str, Any]] = []
+            async for row in chunks.find({"key": key}, {"_id": 0, "key": 0}).sort([("kind", 1), ("index", 1)]):
+                if row["kind"] == PARENT_ROW:
+                    parents.append(row["content"])
+                else:
+                    children.append({
+                        "content": row["content"],
+                        "parent": row["parent"],
+                        "chunk_index": row["index"],
+                        "values": array("f", bytes(row["embedding"])).tolist()
+                    })
+            if len(parents) != entry.get("parents") or len(children) != entry.get("children"):
+                logger.warning(f"Ingestion store entry {content_hash[:12]} is incomplete; ignoring it")
+                return None
+
+            logger.info(f"Ingestion store hit for {content_hash[:12]}: {len(children)} embedded chunks reused")
+            return {
+                "content_hash": content_hash,
+                "preview": entry.get("preview", ""),
+                "description": entry.get("description"),
+                "parents": parents,
+                "children": children
+            }
+        except Exception as e:
+            logger.error(f"Error reading ingestion store entry {content_hash[:12]}: {e}")
+            return None
+
+    def schedule_save(self, content_hash: str, pipeline: str, content: str, parent_chunks: List[Dict[str, Any]], vectors: List[Dict[str, Any]]):
+        """Saves a fresh ingestion in the background, off the upload's request path."""
+        if not self.enabled or not vectors:
+            return
+        task = asyncio.create_task(self.save(content_hash, pipeline, content[:PREVIEW_CHARS], parent_chunks, vectors))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @traced("mongo.ingestion_store.save")
+    async def save(self, content_hash: str, pipeline: str, preview: str, parent_chunks: List[Dict[str, Any]], vectors: List[Dict[str, Any]]) -> bool:
+        """
+        Stores the parent chunks and embedded child chunks of an indexed file.
+        Only the first of several concurrent saves of the same file writes
+        anything; returns whether this call did.
+        """
+        try:
+            entries, chunks = await self.get_collections()
+            key = self._key(content_hash, pipeline)
+            if not await self._claim(entries, chunks, key, content_hash, pipeline):
+                return False
+
+            try:
+                parent_positions = {parent["id"]: index for index, parent in enumerate(parent_chunks)}
+                rows = [
+                    {"key": key, "kind": PARENT_ROW, "index": index, "content": parent["metadata"]["content"]}
+                    for index, parent in enumerate(parent_chunks)
+                ]
+                children = 0
+                for vector in vectors:
+                    metadata = vector["metadata"]
+                    if metadata.get("parent_id") not in parent_positions:
+                        continue
+                    rows.append({
+                        "key": key,
+                        "kind": CHILD_ROW,
+                        "index": metadata.get("chunk_index", children),
+                        "parent": parent_positions[metadata["parent_id"]],
+                        "content": metadata["content"],
+                        "embedding": Binary(array("f", vector["values"]).tobytes())
+                    })
+                    children += 1
+
+                for start in range(0, len(rows), INSERT_BATCH_SIZE):
+                    await chunks.insert_many(rows[start:start + INSERT_BATCH_SIZE], ordered=False)
+                await entries.update_one(
+                    {"_id": key},
+                    {"$set": {
+                        "status": "complete",
+                        "preview": preview,
+                        "parents": len(parent_chunks),
+                        "children": children,
+                        "completed_at": datetime.utcnow()
+                    }}
+                )
+            except Exception:
+                # Never leave a half-written entry behind
+                await chunks.delete_many({"key": key})
+                await entries.delete_one({"_id": key})
+                raise
+
+            logger.info(f"Saved ingestion {content_hash[:12]} ({children} embedded chunks) to the ingestion store")
+            return True
+        except Exception as e:
+            logger.error(f"Error saving ingestion {content_hash[:12]}: {e}")
+            return False
+
+    async def _claim(self, entries, chunks, key: str, content_hash: str, pipeline: str) -> bool:
+        """Creates the entry in "building" state; False if it already exists and is not stale."""
+        entry = {"_id": key, "content_hash": content_hash, "pipeline": pipeline, "status": "building", "created_at": datetime.utcnow()}
+        try:
+            await entries.insert_one(entry)
+            return True
+        except DuplicateKeyError:
+            pass
+
+        stale = await entries.delete_one({
+            "_id": key,
+            "status": "building",
+            "created_at": {"$lt": datetime.utcnow() - timedelta(seconds=STALE_BUILD_SECONDS)}
+        })
+        if not stale.deleted_count:
+            return False
+        await chunks.delete_many({"key": key})
+        try:
+            await entries.insert_one(entry)
+            return True
+        except DuplicateKeyError:
+            return False
+
+    @traced("mongo.ingestion_store.forget")
+    async def forget(self, content_hashes: List[str]) -> int:
+        """
+        Deletes the stored ingestions (every pipeline) of files no document
+        references anymore. Returns the number of entries removed.
+        """
+        if not content_hashes:
+            return 0
+        try:
+            entries, chunks = await self.get_collections()
+            keys = await entries.distinct("_id", {"content_hash": {"$in": list(content_hashes)}})
+            if not keys:
+                return 0
+            # Chunk rows first, so a failure never leaves rows without an entry
+            await chunks.delete_many({"key": {"$in": keys}})
+            result = await entries.delete_many({"_id": {"$in": keys}})
+            logger.info(f"Removed {result.deleted_count} unreferenced ingestion store entries")
+            return result.deleted_count
+        except Exception as e:
+            logger.error(f"Error removing ingestion store entries: {e}")
+            return 0
+
+    @traced("mongo.ingestion_store.set_description")
+    async def set_description(self, content_hash: str, description: str):
+        """Records the LLM description of a file so later uploads of it need no LLM call."""
+        if not self.enabled:
+            return
+        try:
+            entries, _ = await self.get_collections()
+            await entries.update_many({"content_hash": content_hash}, {"$set": {"description": description}})
+        except Exception as e:
+            logger.error(f"Error saving description for ingestion {content_hash[:12]}: {e}")
+
+
+# Singleton instance
+ingestion_store_service = IngestionStoreService()
@@ -0,0 +1,346 @@
+from typing import Dict, List, Optional, Tuple
+from collections import deque
+from lib.config import settings
+from lib.tracing import tracer
+from service.rag.gemini_service import gemini_service, GENERATIVE_MODEL_NAME as GEMINI_DEFAULT_MODEL
+from service.rag.groq_service import groq_service, GENERATIVE_MODEL_NAME as GROQ_DEFAULT_MODEL
+from service.monitoring.metrics_service import metrics_service
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# Provider registry: service, default model, the api_keys entry holding its key,
+# and the substring that identifies one of its model names
+PROVIDERS = {
+    "gemini": {"service": gemini_service, "default_model": GEMINI_DEFAULT_MODEL, "key_name": "google_api_key", "model_marker": "gemini"},
+    "groq": {"service": groq_service, "default_model": GROQ_DEFAULT_MODEL, "key_name": "groq_api_key", "model_marker": "llama"},
+}
+
+# End-to-end deadline per operation, covering retries, hedges and failover
+OPERATION_DEADLINES = {
+    "answer": 60.0,
+    "hyde": 12.0,
+    "chat_title": 10.0,
+    "description": 20.0,
+    "description_batch": 45.0,
+    "summary": 30.0,
+    "sql": 30.0,
+}
+DEFAULT_DEADLINE_SECONDS = 45.0
+# Share of the deadline held back for each failover provider; the primary
+# provider gets the rest, plus whatever a failed fallback did not use
+FAILOVER_DEADLINE_SHARE = 0.25
+
+MAX_RETRIES = 2
+BACKOFF_BASE_SECONDS = 0.25
+BACKOFF_MAX_SECONDS = 2.0
+
+# Hedging: once enough latencies are known, fire a second request when the
+# first has not answered by the observed p95
+LATENCY_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_DELAY_SECONDS = 0.5
+# Only short calls are hedged; duplicating long generations doubles their cost
+HEDGED_OPERATIONS = frozenset({"hyde", "chat_title", "description"})
+
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+# Batched descriptions: documents per LLM call, content sent per document,
+# and calls in flight at once for one batch upload
+DESCRIPTIONS_PER_CALL = 8
+BATCH_DESCRIPTION_CHARS = 1500
+DESCRIPTION_CALL_CONCURRENCY = 2
+NO_DESCRIPTION = "No description available."
+
+JSON_ARRAY_PATTERN = re.compile(r"\[.*\]", re.DOTALL)
+
+
+class LLMGatewayError(Exception):
+    """Raised when every provider attempt for a call has failed or the deadline passed."""
+
+
+def _is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    # groq exposes status_code, google-genai exposes code
+    status_code = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if isinstance(status_code, int):
+        return status_code in RETRYABLE_STATUS_CODES or status_code >= 500
+    name = type(error).__name__
+    return "Timeout" in name or "Connect" in name
+
+
+class LLMGateway:
+    """
+    Single entry point for LLM calls.
+
+    Resolves the provider from the requested model, enforces a per-call deadline,
+    retries transient errors with jittered exponential backoff, hedges slow short
+    calls with a second request after the observed p95 latency, and fails over to
+    the other provider when the first one cannot answer.
+    """
+
+    def __init__(self):
+        # (provider, operation) -> recent successful latencies in seconds
+        self._latencies: Dict[Tuple[str, str], deque] = {}
+
+    def provider_for_model(self, model: Optional[str]) -> str:
+        """Maps a model name (e.g. 'llama-3.3-70b-versatile', 'gemini-2.5-flash') to its provider."""
+        model = (model or "").lower()
+        if "groq" in model or "llama" in model:
+            return "groq"
+        return "gemini"
+
+    def _api_key(self, provider: str, api_keys: Optional[Dict[str, str]], failover: bool = False) -> Optional[str]:
+        api_keys = api_keys or {}
+        key = api_keys.get(PROVIDERS[provider]["key_name"])
+        if key:
+            return key
+        # Failover never moves users with keys of their own onto the server's keys
+        if failover and any(api_keys.get(entry["key_name"]) for entry in PROVIDERS.values()):
+            return None
+        return settings.groq_api_key if provider == "groq" else settings.google_api_key
+
+    def _model_for(self, provider: str, model: Optional[str]) -> str:
+        marker = PROVIDERS[provider]["model_marker"]
+        if model and marker in model.lower():
+            return model
+        return PROVIDERS[provider]["default_model"]
+
+    def _plan(self, model: Optional[str], api_keys: Optional[Dict[str, str]], provider: Optional[str], failover: bool) -> List[Tuple[str, str, str]]:
+        """Ordered (provider, model, api_key) candidates that have a key configured."""
+        primary = provider or self.provider_for_model(model)
+        order = [primary] + [name for name in PROVIDERS if name != primary] if failover else [primary]
+
+        plan = []
+        for name in order:
+            key = self._api_key(name, api_keys, failover=name != primary)
+            if key:
+                plan.append((name, self._model_for(name, model), key))
+        return plan
+
+    def _hedge_delay(self, stats_key: Tuple[str, str]) -> Optional[float]:
+        samples = self._latencies.get(stats_key)
+        if not samples or len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        p95 = ordered[int(HEDGE_PERCENTILE * (len(ordered) - 1))]
+        return max(p95, HEDGE_MIN_DELAY_SECONDS)
+
+    async def _timed_complete(self, provider: str, model: str, api_key: str, prompt: str, system: Optional[str], operation: str) -> str:
+        started = time.monotonic()
+        text = await PROVIDERS[provider]["service"].complete(
+            prompt, api_key=api_key, model=model, system=system, operation=operation
+        )
+        stats_key = (provider, operation)
+        if stats_key not in self._latencies:
+            self._latencies[stats_key] = deque(maxlen=LATENCY_WINDOW)
+        self._latencies[stats_key].append(time.monotonic() - started)
+        return text
+
+    async def _attempt(self, provider: str, model: str, api_key: str, prompt: str, system: Optional[str], operation: str, timeout: float, hedge: bool) -> str:
+        """One logical attempt: the call plus an optional hedge, bounded by timeout."""
+        def start():
+            return asyncio.create_task(self._timed_complete(provider, model, api_key, prompt, system, operation))
+
+        hedge_after = self._hedge_delay((provider, operation)) if hedge else None
+        tasks = [start()]
+        try:
+            async with asyncio.timeout(timeout):
+                if hedge_after is not None and hedge_after < timeout:
+                    done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+                    if not done:
+                        logger.info(f"Hedging {provider} {operation} call after {hedge_after:.2f}s")
+                        metrics_service.record_gateway_event(provider, operation, "hedge")
+                        tasks.append(start())
+
+                # First success wins; a failed request only counts once all are done
+                pending = set(tasks)
+                last_error: Optional[BaseException] = None
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.exception() is None:
+                            return task.result()
+                        last_error = task.exception()
+                raise last_error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def generate(
+        self,
+        prompt: str,
+        api_keys: Optional[Dict[str, str]] = None,
+        model: Optional[str] = None,
+        operation: str = "answer",
+        system: Optional[str] = None,
+        provider: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ) -> str:
+        """
+        Generates text for a prompt.
+
+        Args:
+            prompt: The user prompt
+            api_keys: Request-scoped keys ('google_api_key', 'groq_api_key'); server keys are the
+                fallback for the primary provider, and for failover only when the user has no keys
+            model: Requested model; also selects the primary provider
+            operation: Call type, used for deadlines, latency stats and metrics
+            system: Optional system instruction
+            provider: Preferred provider, overriding the one implied by model
+            deadline: End-to-end deadline in seconds (defaults per operation)
+
+        Raises:
+            LLMGatewayError: If no provider produced an answer within the deadline
+        """
+        plan = self._plan(model, api_keys, provider, settings.llm_failover_enabled)
+        if not plan:
+            raise LLMGatewayError("No LLM provider is configured (missing API keys)")
+
+        budget = deadline or OPERATION_DEADLINES.get(operation, DEFAULT_DEADLINE_SECONDS)
+        deadline_at = time.monotonic() + budget
+        hedge = settings.llm_hedging_enabled and operation in HEDGED_OPERATIONS
+        errors = []
+
+        with tracer.span("llm.gateway", operation=operation, primary=plan[0][0]):
+            for index, (provider_name, model_name, api_key) in enumerate(plan):
+                if index > 0:
+                    logger.warning(f"Failing over {operation} call from {plan[index - 1][0]} to {provider_name}")
+                    metrics_service.record_gateway_event(provider_name, operation, "failover")
+
+                # Hold back a share of the deadline for providers still to be tried
+                provider_deadline_at = deadline_at - FAILOVER_DEADLINE_SHARE * budget * (len(plan) - index - 1)
+                for attempt in range(MAX_RETRIES + 1):
+                    timeout = provider_deadline_at - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        return await self._attempt(
+                            provider_name, model_name, api_key, prompt, system, operation,
+                            timeout, hedge
+                        )
+                    except Exception as e:
+                        errors.append(f"{provider_name}: {type(e).__name__}: {e}")
+                        if not _is_retryable(e) or attempt == MAX_RETRIES:
+                            break
+                        backoff = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+                        if time.monotonic() + backoff >= provider_deadline_at:
+                            break
+                        metrics_service.record_gateway_event(provider_name, operation, "retry")
+                        await asyncio.sleep(backoff)
+
+        raise LLMGatewayError(f"LLM {operation} call failed: {'; '.join(errors[-3:]) or 'deadline exceeded'}")
+
+    async def generate_chat_title(self, query: str, api_keys: Optional[Dict[str, str]] = None) -> str:
+        """Generates a short title for a chat session from its first query ('New Chat' on failure)."""
+        if not query or not isinstance(query, str):
+            return "New Chat"
+
+        prompt = (
+            f"Generate a very short, concise title (max 4-5 words) for a chat session that starts with this user query: "
+            f"'{query}'\n\n"
+            f"Title:"
+        )
+        try:
+            # Titles prefer Groq when a key is available; it is the faster provider
+            title = await self.generate(
+                prompt, api_keys=api_keys, operation="chat_title", provider="groq",
+                system="You are a helpful assistant that generates short titles."
+            )
+        except LLMGatewayError as e:
+            logger.error(f"Failed to generate chat title: {e}")
+            return "New Chat"
+
+        # Clean up the title (remove quotes, extra whitespace)
+        title = title.strip().strip('"').strip("'")
+        return title if len(title) <= 50 else title[:47] + "..."
+
+    async def generate_description(self, content: str, title: str = None, api_keys: Optional[Dict[str, str]] = None) -> str:
+        """Generates a 1-2 sentence document description ('No description available.' on failure)."""
+        if not content or not isinstance(content, str):
+            return NO_DESCRIPTION
+
+        prompt = (
+            f"Summarize the following document in 1-2 sentences for a user-facing description. "
+            f"Be concise and clear.\n\n"
+            f"Title: {title or ''}\n"
+            f"Content: {content[:2000]}"
+        )
+        try:
+            description = await self.generate(
+                prompt, api_keys=api_keys, operation="description", provider="groq",
+                system="You are a helpful assistant that summarizes documents concisely."
+            )
+            return description.strip()
+        except LLMGatewayError as e:
+            logger.error(f"Failed to generate description: {e}")
+            return NO_DESCRIPTION
+
+    async def generate_descriptions(self, documents: List[Tuple[str, str]], api_keys: Optional[Dict[str, str]] = None) -> List[str]:
+        """
+        Generates descriptions for many (title, content) documents, several per LLM call.
+        Returns one description per document, in order; documents the model did
+        not describe get 'No description available.'.
+        """
+        descriptions = [NO_DESCRIPTION] * len(documents)
+        semaphore = asyncio.Semaphore(DESCRIPTION_CALL_CONCURRENCY)
+
+        async def describe_group(start: int):
+            group = documents[start:start + DESCRIPTIONS_PER_CALL]
+            async with semaphore:
+                results = await self._describe_group(group, api_keys)
+            for offset, description in enumerate(results):
+                if description:
+                    descriptions[start + offset] = description
+
+        await asyncio.gather(*(describe_group(start) for start in range(0, len(documents), DESCRIPTIONS_PER_CALL)))
+        return descriptions
+
+    async def _describe_group(self, group: List[Tuple[str, str]], api_keys: Optional[Dict[str, str]]) -> List[Optional[str]]:
+        """One LLM call describing up to DESCRIPTIONS_PER_CALL documents."""
+        sections = [
+            f"Document {index}\nTitle: {title or ''}\nContent: {(content or '')[:BATCH_DESCRIPTION_CHARS]}"
+            for index, (title, content) in enumerate(group, start=1)
+        ]
+        prompt = (
+            f"Summarize each of the following {len(group)} documents in 1-2 sentences for a user-facing description. "
+            f"Be concise and clear.\n"
+            f"Respond with only a JSON array of {len(group)} strings, one per document, in the same order.\n\n"
+            + "\n\n".join(sections)
+        )
+        try:
+            response = await self.generate(
+                prompt, api_keys=api_keys, operation="description_batch", provider="groq",
+                system="You are a helpful assistant that summarizes documents concisely and answers in JSON."
+            )
+        except LLMGatewayError as e:
+            logger.error(f"Failed to generate batched descriptions: {e}")
+            return [None] * len(group)
+
+        match = JSON_ARRAY_PATTERN.search(response)
+        try:
+            parsed = json.loads(match.group(0)) if match else None
+        except ValueError:
+            parsed = None
+        if not isinstance(parsed, list):
+            logger.warning(f"Batched description response was not a JSON array; got {response[:200]!r}")
+            return [None] * len(group)
+        if len(parsed) != len(group):
+            logger.warning(f"Batched description returned {len(parsed)} items for {len(group)} documents")
+
+        return [
+            parsed[index].strip() if index < len(parsed) and isinstance(parsed[index], str) and parsed[index].strip() else None
+            for index in range(len(group))
+        ]
+
+
+# Singleton instance
+llm_gateway = LLMGateway()
@@ -1,9 +1,14 @@
 import logging
 from typing import List, Dict, Any, Optional
+from pymongo import UpdateOne
 from service.infrastructure.database_service import database_service
+from lib.tracing import traced
 
 logger = logging.getLogger(__name__)
 
+# Upserts sent per bulk_write round trip
+BULK_WRITE_BATCH_SIZE = 1000
+
 class ParentChunksService:
     """Service for managing parent chunks using MongoDB."""
     
@@ -15,41 +20,31 @@ class ParentChunksService:
             await database_service.connect()
         return database_service.db.parent_chunks
     
+    @traced("mongo.parent_chunks.insert")
     async def store_parent_chunks(self, parent_chunks: List[Dict[str, Any]]) -> bool:
-        """Store parent chunks in MongoDB."""
+        """Store parent chunks in MongoDB (upserted by id, in unordered bulk writes)."""
         try:
             if not parent_chunks:
                 return True
                 
             collection = await self.get_collection()
             
-            # Use chunks id as _id for deduplication
-            ops = []
-            for chunk in parent_chunks:
-                # Ensure we don't duplicate
-                chunk_data = chunk.copy()
-                chunk_id = chunk_data.get("id")
-                if not chunk_id:
-                    continue
-                    
-                # We can use update_one with upsert=True to avoid duplicates
-                # Or insert_many with ordered=False and ignore duplicate key errors
-                # Given the scale, loop with explicit upsert is safer for now.
-                # For bulk performance, we could use bulk_write, but let's keep it simple for now.
-                
-                # Check if exists first? No, upsert is better.
-                await collection.update_one(
-                    {"id": chunk_id},
-                    {"$set": chunk_data},
-                    upsert=True
-                )
+            # Upsert on the chunk id so re-indexing never duplicates a parent
+            ops = [
+                UpdateOne({"id": chunk["id"]}, {"$set": dict(chunk)}, upsert=True)
+                for chunk in parent_chunks
+                if chunk.get("id")
+            ]
+            for start in range(0, len(ops), BULK_WRITE_BATCH_SIZE):
+                await collection.bulk_write(ops[start:start + BULK_WRITE_BATCH_SIZE], ordered=False)
                 
-            logger.info(f"Stored {len(parent_chunks)} parent chunks in MongoDB")
+            logger.info(f"Stored {len(ops)} parent chunks in MongoDB")
             return True
         except Exception as e:
             logger.error(f"Error storing parent chunks: {e}")
             return False
 
+    @traced("mongo.parent_chunks.find")
     async def fetch_parent_chunks(self, parent_ids: List[str]) -> Dict[str, Dict[str, Any]]:
         """Retrieve parent chunks from MongoDB by their IDs."""
         try:
@@ -69,6 +64,7 @@ class ParentChunksService:
             logger.error(f"Error fetching parent chunks: {e}")
             return {}
     
+    @traced("mongo.parent_chunks.delete")
     async def delete_parent_chunks(self, parent_ids: List[str]) -> int:
         """Delete parent chunks from MongoDB by their IDs."""
         try:
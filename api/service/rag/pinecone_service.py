@@ -1,10 +1,13 @@
 from typing import List, Dict, Any, Optional
 from lib.config import settings
 import logging
+import asyncio
 import pinecone
 from pinecone import Pinecone, ServerlessSpec
 import os
 import os
+from lib.tracing import traced
+from service.monitoring.metrics_service import metrics_service, timed
 
 logger = logging.getLogger(__name__)
 
@@ -62,6 +65,8 @@ class PineconeService:
             logger.error(f"Failed to initialize Pinecone client: {e}")
             return False
 
+    @traced("pinecone.upsert")
+    @timed("vector_store", "upsert")
     async def upsert_vectors(self, vectors: List[Dict[str, Any]]) -> bool:
         """
         Upserts vectors to Pinecone.
@@ -82,9 +87,12 @@ class PineconeService:
             logger.info(f"Upserted {len(vectors)} vectors to Pinecone.")
             return True
         except Exception as e:
+            metrics_service.record_error("vector_store", "upsert")
             logger.error(f"Failed to upsert vectors to Pinecone: {e}")
             return False
 
+    @traced("pinecone.query")
+    @timed("vector_store", "query")
     async def query_vectors(self, query_vector: List[float], top_k: int = 5, username: str = None, documents: List[str] = None) -> List[Dict[str, Any]]:
         """
         Query Pinecone index.
@@ -104,7 +112,10 @@ class PineconeService:
             # If no filters, pass None (Pinecone client handles empty dict, but explicit is better)
             metadata_filter = filter_dict if filter_dict else None
 
-            results = self.index.query(
+            # The Pinecone client is synchronous; run it in a thread so the
+            # concurrent RAG stages are not blocked behind the network call
+            results = await asyncio.to_thread(
+                self.index.query,
                 vector=query_vector,
                 top_k=top_k,
                 include_metadata=True,
@@ -126,9 +137,12 @@ class PineconeService:
             return formatted_results
             
         except Exception as e:
+            metrics_service.record_error("vector_store", "query")
             logger.error(f"Failed to query Pinecone: {e}")
             return []
 
+    @traced("pinecone.fetch")
+    @timed("vector_store", "fetch")
     async def get_parent_ids_from_chunks(self, chunk_ids: list) -> list:
         """Fetch parent IDs from chunk vectors before deletion."""
         if not self.index:
@@ -157,9 +171,12 @@ class PineconeService:
             logger.info(f"Found {len(parent_ids)} unique parent IDs from {len(chunk_ids)} chunks")
             return list(parent_ids)
         except Exception as e:
+            metrics_service.record_error("vector_store", "fetch")
             logger.error(f"Failed to fetch parent IDs from Pinecone: {e}")
             return []
 
+    @traced("pinecone.delete")
+    @timed("vector_store", "delete")
     async def delete_vectors_by_chunk_ids(self, chunk_ids: list) -> int:
         """Delete vectors by their IDs."""
         if not self.index:
@@ -179,9 +196,12 @@ class PineconeService:
             logger.info(f"Deleted {len(chunk_ids)} vectors from Pinecone.")
             return len(chunk_ids)
         except Exception as e:
+            metrics_service.record_error("vector_store", "delete")
             logger.error(f"Failed to delete vectors from Pinecone: {e}")
             return 0
 
+    @traced("pinecone.delete")
+    @timed("vector_store", "delete")
     async def delete_vectors_by_filter(self, filter_dict: Dict[str, Any]) -> bool:
         """Delete vectors using a metadata filter."""
         if not self.index:
@@ -192,6 +212,7 @@ class PineconeService:
             self.index.delete(filter=filter_dict)
             return True
         except Exception as e:
+            metrics_service.record_error("vector_store", "delete")
             logger.error(f"Failed to delete vectors by filter: {e}")
             return False
 
@@ -0,0 +1,179 @@
+import asyncio
+import copy
+import functools
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+from service.rag.rag_service import rag_service
+
+logger = logging.getLogger(__name__)
+
+# How long a speculative retrieval result stays reusable
+PREFETCH_TTL_SECONDS = 30
+# Entries kept per user; drafts of the same question overwrite each other quickly
+MAX_ENTRIES_PER_USER = 3
+# Users with cached entries; the least recently prefetched are dropped beyond this
+MAX_CACHED_USERS = 1000
+# Token-set (Jaccard) similarity required to reuse a draft's retrieval for the final query
+MIN_QUERY_SIMILARITY = 0.8
+# Drafts shorter than this are not worth a retrieval round-trip
+MIN_DRAFT_LENGTH = 8
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class PrefetchService:
+    """
+    Speculative retrieval on draft queries while the user is typing.
+
+    Draft queries run embedding, vector search and parent fetch in the
+    background and park the chunks in a short-TTL, per-user in-memory cache.
+    `orchestrate_rag_flow` reuses them when the final query is close enough,
+    taking retrieval off the critical path.
+    """
+
+    def __init__(self):
+        # Per-user entries, ordered by the user's latest prefetch (oldest first)
+        self._cache: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def _tokens(self, query: str) -> frozenset:
+        return frozenset(WORD_PATTERN.findall(query.lower()))
+
+    def _similarity(self, a: frozenset, b: frozenset) -> float:
+        if not a or not b:
+            return 0.0
+        return len(a & b) / len(a | b)
+
+    def _documents_key(self, documents: Optional[List[str]]) -> tuple:
+        return tuple(sorted(documents)) if documents else ()
+
+    def _prune(self, username: str):
+        now = time.monotonic()
+        entries = [e for e in self._cache.get(username, []) if e["expires_at"] > now]
+        if entries:
+            self._cache[username] = entries[-MAX_ENTRIES_PER_USER:]
+        else:
+            self._cache.pop(username, None)
+
+    def _sweep(self):
+        """
+        Drops users whose entries have all expired, across all users. Every
+        entry has the same TTL and users are ordered by their latest prefetch,
+        so expired users sit at the front and the sweep stops at the first
+        user with a fresh entry.
+        """
+        now = time.monotonic()
+        while self._cache:
+            username, entries = next(iter(self._cache.items()))
+            if entries[-1]["expires_at"] > now:
+                break
+            del self._cache[username]
+
+    def schedule_prefetch(self, query: str, username: str, top_k: int, documents: Optional[List[str]] = None) -> bool:
+        """
+        Starts a speculative retrieval for a draft query. A newer draft from the
+        same user supersedes (cancels) one that is still running.
+        Returns False if the draft was skipped.
+        """
+        query = (query or "").strip()
+        if len(query) < MIN_DRAFT_LENGTH:
+            return False
+
+        tokens = self._tokens(query)
+        documents_key = self._documents_key(documents)
+
+        # Skip if a fresh entry already covers this draft
+        self._prune(username)
+        for entry in self._cache.get(username, []):
+            if entry["documents"] == documents_key and entry["top_k"] >= top_k and entry["tokens"] == tokens:
+                return False
+
+        previous = self._inflight.pop(username, None)
+        if previous and not previous.done():
+            previous.cancel()
+
+        task = asyncio.create_task(self._prefetch(query, tokens, username, top_k, documents))
+        self._inflight[username] = task
+        task.add_done_callback(functools.partial(self._clear_inflight, username))
+        return True
+
+    def _clear_inflight(self, username: str, task: asyncio.Task):
+        if self._inflight.get(username) is task:
+            del self._inflight[username]
+
+    async def _prefetch(self, query: str, tokens: frozenset, username: str, top_k: int, documents: Optional[List[str]]):
+        try:
+            chunks = await rag_service.retrieval_module(
+                query,
+                top_k=top_k,
+                username=username,
+                documents=documents,
+                similarity_threshold=0.3
+            )
+            if not chunks:
+                return
+
+            self._cache.setdefault(username, []).append({
+                "tokens": tokens,
+                "documents": self._documents_key(documents),
+                "top_k": top_k,
+                "chunks": chunks,
+                "expires_at": time.monotonic() + PREFETCH_TTL_SECONDS
+            })
+            self._cache.move_to_end(username)
+            self._prune(username)
+            self._sweep()
+            while len(self._cache) > MAX_CACHED_USERS:
+                self._cache.popitem(last=False)
+            logger.info(f"Prefetched {len(chunks)} parent chunks for draft query of user '{username}'")
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning(f"Speculative retrieval failed for user '{username}': {e}")
+
+    def lookup(self, query: str, username: str, top_k: int, documents: Optional[List[str]] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Returns prefetched chunks for the final query if a fresh draft is close
+        enough and was retrieved with the same document filter and at least the
+        same pool size, trimmed to top_k. The returned chunks are copies safe
+        to mutate.
+        """
+        self._sweep()
+        self._prune(username)
+        entries = self._cache.get(username)
+        if not entries:
+            return None
+
+        tokens = self._tokens(query)
+        documents_key = self._documents_key(documents)
+
+        best, best_score = None, 0.0
+        for entry in entries:
+            if entry["documents"] != documents_key or entry["top_k"] < top_k:
+                continue
+            score = self._similarity(tokens, entry["tokens"])
+            if score > best_score:
+                best, best_score = entry, score
+
+        if best is None or best_score < MIN_QUERY_SIMILARITY:
+            return None
+
+        logger.info(f"Reusing prefetched retrieval for user '{username}' (similarity {best_score:.2f})")
+        return copy.deepcopy(best["chunks"][:top_k])
+
+    def invalidate(self, username: str):
+        """
+        Drops cached retrievals for a user, e.g. after their documents change,
+        and cancels a running one so it cannot cache chunks of old documents.
+        """
+        self._cache.pop(username, None)
+        task = self._inflight.pop(username, None)
+        if task and not task.done():
+            task.cancel()
+
+
+# Singleton instance
+prefetch_service = PrefetchService()
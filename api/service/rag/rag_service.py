@@ -1,20 +1,27 @@
-from typing import List, Dict, Any, Tuple
-from service.rag.gemini_service import gemini_service
-from service.rag.groq_service import groq_service
+from typing import List, Dict, Any, Optional, Tuple
+from service.rag.llm_gateway import llm_gateway
 from service.rag.embedding_service import embedding_service
 from service.rag.pinecone_service import pinecone_service
 from service.rag.parent_chunks_service import parent_chunks_service
+from service.rag.ingestion_store_service import ingestion_store_service
 from service.rag.rerank_service import rerank_service
+from service.rag.context_packer_service import context_packer_service
+from service.features.file_processing_service import EXTRACTOR_VERSION
 from lib.signature_guard import verify_signature
 import logging
 import uuid
 import re
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
+from lib.tracing import traced
+from lib.text_normalization import markdown_to_speech, strip_markdown
 
 verify_signature()  # Critical - DO NOT REMOVE
 logger = logging.getLogger(__name__)
 
+# Sentence boundaries for child chunks, skipping abbreviations like "e.g." and "Mr."
+SENTENCE_SPLIT_PATTERN = re.compile(r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\?|\!)\s+')
+
 class RAGService:
     """
     Implements the core modules of a Modular RAG system, based on advanced
@@ -29,7 +36,14 @@ class RAGService:
         # Async processing configuration
         self.max_concurrent_embeddings = 10  # Process up to 10 embeddings concurrently (Increased for speed)
         self.batch_size = 50  # Process embeddings in larger batches (Increased for speed)
+        self.pooled_embedding_batch = 512  # Child chunks per embedding call when indexing many documents
+
+    @property
+    def index_pipeline(self) -> str:
+        """Identifies how text is extracted, cut and embedded; stored ingestions are only reused within one pipeline."""
+        return f"{embedding_service.model_name}:p{self.parent_chunk_size}:o{self.chunk_overlap}:x{EXTRACTOR_VERSION}"
 
+    @traced("rag.indexing")
     async def indexing_module(self, document: Dict[str, Any]) -> List[str]:
         """
         [Module: Indexing] Implements a "Small-to-Big" chunking and embedding strategy.
@@ -39,21 +53,29 @@ class RAGService:
         Concept from Paper: Chunk Optimization -> Small-to-Big
         
         OPTIMIZED: Uses async batch processing for embeddings to significantly improve speed.
+        A document with an "ingestion" (an ingestion store hit) reuses its stored
+        chunks and embeddings; one with only a "content_hash" is saved to the
+        ingestion store once indexed.
         """
         try:
             # Prepare metadata for vectors, excluding description to save space
             clean_metadata = document.get("metadata", {}).copy()
             clean_metadata.pop('description', None)
+            ingestion = document.get("ingestion")
             
-            # 1. Chunk the document into parent and child chunks
-            parent_chunks, child_chunks = self._chunk_document_small_to_big(
-                document["content"], document.get("title", "")
-            )
-            
-            logger.info(f"Created {len(parent_chunks)} parent chunks and {len(child_chunks)} child chunks")
-            
-            # 2. Generate embeddings for child chunks using async batch processing
-            vectors = await self._generate_embeddings_batch(child_chunks, clean_metadata, document)
+            if ingestion:
+                # Same file indexed before: copy its chunks and embeddings
+                parent_chunks, vectors = self._reuse_ingestion(ingestion, document, clean_metadata)
+            else:
+                # 1. Chunk the document into parent and child chunks
+                parent_chunks, child_chunks = self._chunk_document_small_to_big(
+                    document["content"], document.get("title", "")
+                )
+                
+                logger.info(f"Created {len(parent_chunks)} parent chunks and {len(child_chunks)} child chunks")
+                
+                # 2. Generate embeddings for child chunks using async batch processing
+                vectors = await self._generate_embeddings_batch(child_chunks, clean_metadata, document)
             
             if not vectors:
                 logger.error("No embeddings were generated successfully")
@@ -75,6 +97,8 @@ class RAGService:
                     raise Exception(error_msg)
             
             logger.info(f"Successfully indexed {len(vectors)} child chunks for document '{document.get('title', 'Unknown')}'")
+            if document.get("content_hash") and not ingestion:
+                ingestion_store_service.schedule_save(document["content_hash"], self.index_pipeline, document["content"], parent_chunks, vectors)
             
             # Return both child chunk IDs and parent chunk IDs for better tracking
             return {
@@ -86,6 +110,138 @@ class RAGService:
             logger.error(f"Error in indexing module: {e}")
             return {"chunk_ids": [], "parent_ids": []}
 
+    @traced("rag.indexing_batch")
+    async def indexing_module_batch(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        [Module: Indexing] Small-to-Big indexing for many documents at once.
+
+        Child chunks of all documents are pooled into large shared embedding
+        batches, and vectors and parent chunks are written in bulk, instead of
+        one embedding batch and one set of writes per document. Documents carry
+        the same optional "ingestion" / "content_hash" keys as for
+        `indexing_module`.
+
+        Returns one {"chunk_ids", "parent_ids"} entry per input document, in
+        order; a document whose chunks could not be embedded or stored gets
+        empty lists.
+        """
+        outcome = [{"chunk_ids": [], "parent_ids": []} for _ in documents]
+        if not documents:
+            return outcome
+
+        try:
+            # 1. Chunk every document not found in the ingestion store (CPU-bound, off the event loop)
+            fresh = [index for index, doc in enumerate(documents) if not doc.get("ingestion")]
+            chunked_fresh = await asyncio.to_thread(
+                lambda: [self._chunk_document_small_to_big(documents[index]["content"], documents[index].get("title", "")) for index in fresh]
+            )
+            doc_parents: List[List[Dict[str, Any]]] = [[] for _ in documents]
+            for index, (parents, _) in zip(fresh, chunked_fresh):
+                doc_parents[index] = parents
+
+            # 2. Embed all child chunks in pooled batches
+            pooled = [(doc_index, child) for doc_index, (_, children) in zip(fresh, chunked_fresh) for child in children]
+            embeddings: List[List[float]] = []
+            for start in range(0, len(pooled), self.pooled_embedding_batch):
+                texts = [child["content"] for _, child in pooled[start:start + self.pooled_embedding_batch]]
+                batch = await embedding_service.get_embeddings_batch(texts)
+                embeddings.extend(batch if len(batch) == len(texts) else [[] for _ in texts])
+
+            doc_vectors: List[List[Dict[str, Any]]] = [[] for _ in documents]
+            chunk_counters = [0] * len(documents)
+            for (doc_index, child), embedding in zip(pooled, embeddings):
+                chunk_index = chunk_counters[doc_index]
+                chunk_counters[doc_index] += 1
+                if not embedding:
+                    continue
+                document = documents[doc_index]
+                clean_metadata = document.get("metadata", {}).copy()
+                clean_metadata.pop('description', None)
+                doc_vectors[doc_index].append({
+                    "id": child["id"],
+                    "values": embedding,
+                    "metadata": {
+                        "content": child["content"],
+                        "parent_id": child["parent_id"],
+                        "title": document.get("title", ""),
+                        "chunk_index": chunk_index,
+                        "is_fallback": False,
+                        **clean_metadata
+                    }
+                })
+
+            # Documents found in the ingestion store get copies of their stored chunks
+            for index, document in enumerate(documents):
+                if document.get("ingestion"):
+                    clean_metadata = document.get("metadata", {}).copy()
+                    clean_metadata.pop('description', None)
+                    doc_parents[index], doc_vectors[index] = self._reuse_ingestion(document["ingestion"], document, clean_metadata)
+
+            # Only documents with at least one embedded chunk are stored
+            indexed = [index for index, doc_vector in enumerate(doc_vectors) if doc_vector]
+            vectors = [vector for index in indexed for vector in doc_vectors[index]]
+            parent_chunks = [parent for index in indexed for parent in doc_parents[index]]
+            if not vectors:
+                logger.error("No embeddings were generated successfully for the batch")
+                return outcome
+
+            # 3. Store all vectors and parent chunks concurrently, in bulk
+            results = await asyncio.gather(
+                pinecone_service.upsert_vectors(vectors),
+                parent_chunks_service.store_parent_chunks(parent_chunks),
+                return_exceptions=True
+            )
+            for i, result in enumerate(results):
+                if isinstance(result, Exception) or result is False:
+                    raise Exception(f"Failed to store {'vectors' if i == 0 else 'parent chunks'}")
+
+            logger.info(f"Indexed {len(vectors)} child chunks across {len(indexed)}/{len(documents)} documents")
+            for index in indexed:
+                outcome[index] = {
+                    "chunk_ids": [vector["id"] for vector in doc_vectors[index]],
+                    "parent_ids": [parent["id"] for parent in doc_parents[index]]
+                }
+                document = documents[index]
+                if document.get("content_hash") and not document.get("ingestion"):
+                    ingestion_store_service.schedule_save(
+                        document["content_hash"], self.index_pipeline, document["content"], doc_parents[index], doc_vectors[index]
+                    )
+            return outcome
+
+        except Exception as e:
+            logger.error(f"Error in batch indexing module: {e}")
+            return [{"chunk_ids": [], "parent_ids": []} for _ in documents]
+
+    def _reuse_ingestion(self, ingestion: Dict[str, Any], document: Dict[str, Any], clean_metadata: Dict) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Copies a stored ingestion under fresh chunk IDs, with this document's
+        title and metadata (username, source_filename), so every upload owns
+        its own vectors and parent chunks.
+        """
+        title = document.get("title", "")
+        parent_ids = [f"parent_{uuid.uuid4().hex}" for _ in ingestion["parents"]]
+        parent_chunks = [
+            {"id": parent_id, "metadata": {"content": content, "title": title}}
+            for parent_id, content in zip(parent_ids, ingestion["parents"])
+        ]
+        vectors = [
+            {
+                "id": f"child_{uuid.uuid4().hex}",
+                "values": child["values"],
+                "metadata": {
+                    "content": child["content"],
+                    "parent_id": parent_ids[child["parent"]],
+                    "title": title,
+                    "chunk_index": child["chunk_index"],
+                    "is_fallback": False,
+                    **clean_metadata
+                }
+            }
+            for child in ingestion["children"]
+        ]
+        return parent_chunks, vectors
+
+    @traced("rag.pre_retrieval")
     async def pre_retrieval_module(self, query: str, api_keys: Dict[str, str] = {}) -> str:
         """
         [Module: Pre-Retrieval] Enhances the query using Hypothetical Document Embeddings (HyDE).
@@ -99,15 +255,10 @@ class RAGService:
                 f"Please write a short, hypothetical passage that answers the following question. "
                 f"This passage will be used to retrieve relevant documents.\n\nQuestion: {query}"
             )
-            model = api_keys.get("model", "gemini-2.5-flash")
-            
-            if "groq" in model.lower() or "llama" in model.lower():
-                groq_key = api_keys.get("groq_api_key")
-                hypothetical_answer = await groq_service.generate_answer(hyde_prompt, api_key=groq_key)
-            else:
-                google_key = api_keys.get("google_api_key")
-                hypothetical_answer = await gemini_service.generate_answer(hyde_prompt, api_key=google_key)
-                
+            hypothetical_answer = await llm_gateway.generate(
+                hyde_prompt, api_keys=api_keys, model=api_keys.get("model", "gemini-2.5-flash"), operation="hyde"
+            )
+
             enhanced_query = f"{query}\n\n{hypothetical_answer}"
             logger.info(f"Generated hypothetical document for query: '{query}'")
             return enhanced_query # The embedding of this is used for retrieval
@@ -115,6 +266,7 @@ class RAGService:
             logger.error(f"Error in pre-retrieval (HyDE) module: {e}")
             return query  # Fallback to original query
 
+    @traced("rag.retrieval")
     async def retrieval_module(self, query: str, top_k: int = 10, username: str = None, documents: List[str] = None, similarity_threshold: float = 0.3) -> List[Dict[str, Any]]:
         """
         [Module: Retrieval] Enhanced retrieval with relevance filtering and diversity.
@@ -220,6 +372,7 @@ class RAGService:
             logger.error(f"Error in retrieval module: {e}")
             return []
 
+    @traced("rag.post_retrieval")
     async def post_retrieval_module(self, chunks: List[Dict[str, Any]], query: str, target_count: int = 5, min_relevance_score: float = 0.4) -> List[Dict[str, Any]]:
         """
         [Module: Post-Retrieval] Enhanced reranking with adaptive selection.
@@ -251,7 +404,10 @@ class RAGService:
             
             # Use FlashRank to rerank documents locally
             # This implements the Post-Retrieval Mechanism (Section 4.1) from Modular RAG docs
-            reranked_chunks = rerank_service.rerank_documents(query=query, documents=chunks, top_n=keep_count)
+            # Cross-encoder inference is CPU-bound; keep it off the event loop
+            reranked_chunks = await asyncio.to_thread(
+                rerank_service.rerank_documents, query=query, documents=chunks, top_n=keep_count
+            )
             
             # Apply relevance scoring and filtering
             # Note: FlashRank provides normalized scores
@@ -345,47 +501,40 @@ class RAGService:
 
 
 
-    async def generation_module(self, query: str, context_chunks: List[Dict[str, Any]], chat_history: List[Dict[str, Any]] = None, document_descriptions: List[str] = None, api_keys: Dict[str, str] = {}) -> str:
+    @traced("rag.generation")
+    async def generation_module(self, query: str, context_chunks: List[Dict[str, Any]], chat_history: List[Dict[str, Any]] = None, document_descriptions: List[str] = None, api_keys: Dict[str, str] = {}, conversation_summary: str = "", overview_cache_key: Optional[tuple] = None) -> str:
         """
         [Module: Generation] Generates answers optimized for TTS with adaptive detail level.
-        Uses full chat history and retrieved context for context-aware responses.
+        Chat history and retrieved context are packed into a per-model token budget
+        so prompt size stays bounded for long sessions.
         Adapts response length and detail based on validation by the LLM itself.
         
         Args:
             query: The user's current question
             context_chunks: Retrieved and reranked document chunks
-            chat_history: Previous messages in the conversation (optional)
+            chat_history: Recent messages in the conversation not covered by the summary (optional)
             document_descriptions: List of descriptions of available documents (always included)
             api_keys: Dictionary containing user-specific API keys
+            conversation_summary: Running summary of earlier turns in the session (optional)
+            overview_cache_key: Identifies document_descriptions for reuse of the packed overview (optional)
         """
         try:
             model = api_keys.get("model", "gemini-2.5-flash")
             logger.info(f"Using model: {model} for generation")
-            # Build context from chunks - include ALL retrieved content
-            context_parts = [chunk.get("metadata", {}).get("content", "") for chunk in context_chunks]
-            context = "\n\n---\n\n".join(context_parts)
-            
-            # Build conversation history string - include full history for context
-            conversation_context = ""
-            if chat_history and len(chat_history) > 0:
-                # Include up to last 20 messages for better context understanding
-                recent_history = chat_history[-20:]
-                history_parts = []
-                for msg in recent_history:
-                    role = msg.get('role', 'user')
-                    content = msg.get('content', '')
-                    if role == 'user':
-                        history_parts.append(f"User: {content}")
-                    else:
-                        # Include full assistant responses for complete context
-                        history_parts.append(f"Assistant: {content}")
-                
-                conversation_context = "\n".join(history_parts)
+            # Pack chunks, history and document overview into the model's token budget
+            packed = context_packer_service.pack(
+                context_chunks=context_chunks,
+                chat_history=chat_history,
+                document_descriptions=document_descriptions,
+                model=model,
+                conversation_summary=conversation_summary,
+                overview_cache_key=overview_cache_key
+            )
+            context = packed["context"]
+            conversation_context = packed["conversation"]
             
             # Prepare document overview section
-            doc_overview = ""
-            if document_descriptions:
-                doc_overview = "DOCUMENT OVERVIEW:\n" + "\n".join([f"- {desc}" for desc in document_descriptions]) + "\n\n"
+            doc_overview = f"DOCUMENT OVERVIEW:\n{packed['overview']}\n\n" if packed["overview"] else ""
             
             # Unified Claude/ChatGPT-style prompt for all response styles
             history_header = f"PREVIOUS CONVERSATION:\n{conversation_context}\n\n" if conversation_context else ""
@@ -417,12 +566,7 @@ You are an expert assistant. Your goal is to provide a comprehensive, well-struc
 Answer:
 """
             
-            if "groq" in model.lower() or "llama" in model.lower():
-                groq_key = api_keys.get("groq_api_key")
-                answer = await groq_service.generate_answer(prompt, api_key=groq_key)
-            else:
-                google_key = api_keys.get("google_api_key")
-                answer = await gemini_service.generate_answer(prompt, api_key=google_key)
+            answer = await llm_gateway.generate(prompt, api_keys=api_keys, model=model, operation="answer")
             
             # Keep the markdown formatting - don't strip it
             logger.info(f"Generated markdown answer for query: {query[:50]}... (length: {len(answer)} chars)")
@@ -437,128 +581,20 @@ Answer:
         Strip markdown formatting for Text-to-Speech compatibility.
         Used only when converting to speech, not for display.
         """
-        # Remove markdown bold/italic but preserve the text
-        text = re.sub(r'\*\*(.+?)\*\*', r'\1', text)
-        text = re.sub(r'__(.+?)__', r'\1', text)
-        text = re.sub(r'\*(.+?)\*', r'\1', text)
-        text = re.sub(r'_(.+?)_', r'\1', text)
-        
-        # Remove headers but keep the text on new line
-        text = re.sub(r'^#{1,6}\s+(.+)$', r'\1', text, flags=re.MULTILINE)
-        
-        # Remove inline code backticks
-        text = re.sub(r'`(.+?)`', r'\1', text)
-        
-        # Remove code blocks but keep the content
-        text = re.sub(r'```[a-z]*\n?(.+?)\n?```', r'\1', text, flags=re.DOTALL)
-        
-        # Remove emojis
-        emoji_pattern = re.compile(
-            "["
-            "\U0001F600-\U0001F64F"  # emoticons
-            "\U0001F300-\U0001F5FF"  # symbols & pictographs
-            "\U0001F680-\U0001F6FF"  # transport & map symbols
-            "\U0001F1E0-\U0001F1FF"  # flags
-            "\U00002702-\U000027B0"  # dingbats
-            "\U000024C2-\U0001F251"  # enclosed characters
-            "]+",
-            flags=re.UNICODE
-        )
-        text = emoji_pattern.sub('', text)
-        
-        # Expand common abbreviations for better TTS
-        text = text.replace(' e.g. ', ' for example ')
-        text = text.replace(' E.g. ', ' For example ')
-        text = text.replace(' i.e. ', ' that is ')
-        text = text.replace(' I.e. ', ' That is ')
-        text = text.replace(' etc.', ' and so on')
-        text = text.replace(' vs. ', ' versus ')
-        text = text.replace(' vs ', ' versus ')
-        
-        # Clean up spacing
-        text = re.sub(r'\n{3,}', '\n\n', text)  # Max 2 newlines
-        text = re.sub(r' {2,}', ' ', text)  # Remove multiple spaces
-        text = re.sub(r'\n ', '\n', text)  # Remove spaces after newlines
-        text = re.sub(r' \n', '\n', text)  # Remove spaces before newlines
-        
-        # Ensure proper sentence endings
-        text = re.sub(r'([.!?])([A-Z])', r'\1 \2', text)
-        
-        return text.strip()
+        return markdown_to_speech(text)
     
     def _clean_for_tts(self, text: str) -> str:
         """
         Clean text to be fully TTS-compatible.
         Removes all formatting and symbols that break text-to-speech.
         """
-        # Remove markdown bold/italic
-        text = re.sub(r'\*\*(.+?)\*\*', r'\1', text)
-        text = re.sub(r'__(.+?)__', r'\1', text)
-        text = re.sub(r'\*(.+?)\*', r'\1', text)
-        text = re.sub(r'_(.+?)_', r'\1', text)
-        
-        # Remove headers
-        text = re.sub(r'^#{1,6}\s+', '', text, flags=re.MULTILINE)
-        
-        # Remove inline code
-        text = re.sub(r'`(.+?)`', r'\1', text)
-        
-        # Remove code blocks
-        text = re.sub(r'```[a-z]*\n?(.+?)\n?```', r'\1', text, flags=re.DOTALL)
-        
-        # Remove bullet points and convert to sentences
-        text = re.sub(r'^\s*[-•●◦▪]\s*', '', text, flags=re.MULTILINE)
-        text = re.sub(r'^\s*\d+\.\s*', '', text, flags=re.MULTILINE)
-        
-        # Remove emojis (common Unicode ranges)
-        emoji_pattern = re.compile(
-            "["
-            "\U0001F600-\U0001F64F"  # emoticons
-            "\U0001F300-\U0001F5FF"  # symbols & pictographs
-            "\U0001F680-\U0001F6FF"  # transport & map symbols
-            "\U0001F1E0-\U0001F1FF"  # flags
-            "\U00002702-\U000027B0"  # dingbats
-            "\U000024C2-\U0001F251"  # enclosed characters
-            "]+",
-            flags=re.UNICODE
-        )
-        text = emoji_pattern.sub('', text)
-        
-        # Replace common abbreviations
-        text = text.replace(' e.g. ', ' for example ')
-        text = text.replace(' i.e. ', ' that is ')
-        text = text.replace(' etc.', ' and so on.')
-        text = text.replace(' vs. ', ' versus ')
-        text = text.replace(' vs ', ' versus ')
-        
-        # Remove excessive whitespace and normalize
-        text = re.sub(r'\n{3,}', '\n\n', text)
-        text = re.sub(r' {2,}', ' ', text)
-        
-        return text.strip()
+        return markdown_to_speech(text)
     
     def _remove_markdown_formatting(self, text: str) -> str:
         """
         Helper method to remove common Markdown formatting from text.
         """
-        # Remove bold formatting (**text** or __text__)
-        text = re.sub(r'\*\*(.+?)\*\*', r'\1', text)
-        text = re.sub(r'__(.+?)__', r'\1', text)
-        
-        # Remove italic formatting (*text* or _text_)
-        text = re.sub(r'\*(.+?)\*', r'\1', text)
-        text = re.sub(r'_(.+?)_', r'\1', text)
-        
-        # Remove headers (# or ## or ### etc.)
-        text = re.sub(r'^#{1,6}\s+', '', text, flags=re.MULTILINE)
-        
-        # Remove inline code (`code`)
-        text = re.sub(r'`(.+?)`', r'\1', text)
-        
-        # Remove code blocks (```code```)
-        text = re.sub(r'```[a-z]*\n(.+?)\n```', r'\1', text, flags=re.DOTALL)
-        
-        return text.strip()
+        return strip_markdown(text)
 
     async def _generate_embeddings_batch(self, child_chunks: List[Dict], clean_metadata: Dict, document: Dict) -> List[Dict]:
         """
@@ -706,9 +742,6 @@ Answer:
         parent_chunks = []
         child_chunks = []
         
-        # Pre-compile regex for better performance
-        sentence_pattern = re.compile(r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\?|\!)\s+')
-        
         # Create parent chunks with optimized processing
         start = 0
         parent_index = 0
@@ -725,7 +758,7 @@ Answer:
                 })
                 
                 # Create child chunks from this parent chunk using optimized sentence splitting
-                sentences = sentence_pattern.split(parent_content)
+                sentences = SENTENCE_SPLIT_PATTERN.split(parent_content)
                 
                 # Filter and process sentences more efficiently
                 valid_sentences = [
@@ -2,6 +2,8 @@ from typing import List, Dict, Any
 import logging
 from flashrank import Ranker, RerankRequest
 from lib.config import settings
+from lib.tracing import traced
+from service.monitoring.metrics_service import metrics_service, timed
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +34,8 @@ class RerankService:
             logger.error(f"Failed to initialize FlashRank Service: {e}")
             self.ranker = None
 
+    @traced("flashrank.rerank")
+    @timed("rerank", "rerank")
     def rerank_documents(self, query: str, documents: List[Dict[str, Any]], top_n: int = 5) -> List[Dict[str, Any]]:
         """
         Rerank a list of documents based on their relevance to the query.
@@ -98,6 +102,7 @@ class RerankService:
             return reranked_docs[:top_n]
             
         except Exception as e:
+            metrics_service.record_error("rerank", "rerank")
             logger.error(f"Error during local reranking: {e}")
             # Fallback to original order
             return documents[:top_n]
@@ -17,7 +17,9 @@ export function ChatSidebar({
   onClose,
   showUpload: externalShowUpload,
   onShowUploadChange,
-  onRenameSession
+  onRenameSession,
+  hasMoreSessions = false,
+  onLoadMoreSessions
 }) {
   const [internalShowUpload, setInternalShowUpload] = useState(false);
 
@@ -207,6 +209,14 @@ export function ChatSidebar({
                 </div>
               </div>
             ))}
+            {hasMoreSessions && (
+              <button
+                onClick={onLoadMoreSessions}
+                className="w-full px-3 py-2 text-xs font-medium text-gray-500 hover:text-gray-900 hover:bg-gray-100 rounded-lg transition-all"
+              >
+                Load older chats
+              </button>
+            )}
           </div>
         )}
       </div>
@@ -1,4 +1,4 @@
-import { useState, useRef, useEffect } from "react";
+import { useState, useRef, useEffect, useCallback } from "react";
 import { MessageBubble } from "./MessageBubble";
 import { QueryInput } from "./QueryInput";
 import { TypingIndicator } from "./TypingIndicator";
@@ -31,6 +31,16 @@ export function ChatInterface({
   const validDocs = availableDocuments.filter(doc => selectedDocuments.includes(doc.filename));
   const docCount = validDocs.length;
 
+  // Keep the latest selection in a ref so the draft handler stays stable across renders
+  const validDocsRef = useRef(validDocs);
+  validDocsRef.current = validDocs;
+
+  const handleDraftChange = useCallback((draft) => {
+    const docs = validDocsRef.current;
+    if (!docs || docs.length === 0) return;
+    ragService.prefetch(draft, 5, docs.map(d => d.filename));
+  }, []);
+
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
   };
@@ -270,6 +280,7 @@ export function ChatInterface({
             <div className="w-full">
               <QueryInput
                 onSend={handleSendMessage}
+                onDraftChange={handleDraftChange}
                 disabled={isLoading}
                 responseStyle={responseStyle}
                 onResponseStyleChange={setResponseStyle}
@@ -322,6 +333,7 @@ export function ChatInterface({
           <div className="max-w-4xl mx-auto">
             <QueryInput
               onSend={handleSendMessage}
+              onDraftChange={handleDraftChange}
               disabled={isLoading}
               responseStyle={responseStyle}
               onResponseStyleChange={setResponseStyle}
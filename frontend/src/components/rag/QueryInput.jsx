@@ -1,7 +1,9 @@
 import { useState, useRef, useEffect } from 'react';
 import { VoiceInput } from './VoiceInput';
 
-export function QueryInput({ onSend, disabled, onExportChat, responseStyle = 'auto', onResponseStyleChange, onAttachClick, showDisclaimer = true, model = 'gemini-2.5-flash', onModelChange }) {
+const PREFETCH_DEBOUNCE_MS = 400;
+
+export function QueryInput({ onSend, onDraftChange, disabled, onExportChat, responseStyle = 'auto', onResponseStyleChange, onAttachClick, showDisclaimer = true, model = 'gemini-2.5-flash', onModelChange }) {
   const [query, setQuery] = useState('');
   const [showExportMenu, setShowExportMenu] = useState(false);
   const [showStyleMenu, setShowStyleMenu] = useState(false);
@@ -16,6 +18,15 @@ export function QueryInput({ onSend, disabled, onExportChat, responseStyle = 'au
     }
   }, [query]);
 
+  // Debounced draft notification so the backend can prefetch retrieval while typing
+  useEffect(() => {
+    if (!onDraftChange || disabled) return;
+    const draft = query.trim();
+    if (draft.length < 8) return;
+    const timer = setTimeout(() => onDraftChange(draft), PREFETCH_DEBOUNCE_MS);
+    return () => clearTimeout(timer);
+  }, [query, onDraftChange, disabled]);
+
   const [showModelMenu, setShowModelMenu] = useState(false);
   const modelMenuRef = useRef(null);
 
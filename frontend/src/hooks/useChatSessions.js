@@ -9,9 +9,10 @@ export function useChatSessions() {
   const [currentSessionId, setCurrentSessionId] = useState(null);
   const [currentSession, setCurrentSession] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
   const { showToast } = useToast();
 
-  // Load all sessions
+  // Load the first page of sessions
   const loadSessions = async () => {
     try {
       const data = await chatService.getSessions();
@@ -19,6 +20,7 @@ export function useChatSessions() {
       // Enforce strict reverse chronological order
       fetchedSessions.sort((a, b) => new Date(b.updated_at) - new Date(a.updated_at));
       setSessions(fetchedSessions);
+      setNextCursor(data.next_cursor || null);
 
       // If no current session and sessions exist, select the first one
       if (!currentSessionId && data.sessions && data.sessions.length > 0) {
@@ -29,6 +31,23 @@ export function useChatSessions() {
     }
   };
 
+  // Append the next page of older sessions
+  const loadMoreSessions = async () => {
+    if (!nextCursor) return;
+
+    try {
+      const data = await chatService.getSessions({ cursor: nextCursor });
+      const fetchedSessions = data.sessions || [];
+      setSessions(prev => {
+        const known = new Set(prev.map(s => s.session_id));
+        return [...prev, ...fetchedSessions.filter(s => !known.has(s.session_id))];
+      });
+      setNextCursor(data.next_cursor || null);
+    } catch (error) {
+      console.error('Error loading more sessions:', error);
+    }
+  };
+
   // Load specific session
   const loadSession = async (sessionId) => {
     if (!sessionId) return;
@@ -49,7 +68,7 @@ export function useChatSessions() {
     setLoading(true);
     try {
       const session = await chatService.createSession(title);
-      setSessions(prev => [session, ...prev]);
+      setSessions(prev => [{ ...session, message_count: 0 }, ...prev]);
       setCurrentSessionId(session.session_id);
       setCurrentSession(session);
       // Toast removed - not necessary for every new chat
@@ -97,10 +116,7 @@ export function useChatSessions() {
         const data = await chatService.getSessions();
         const sessionsList = data.sessions || [];
         setSessions(sessionsList);
-
-        // Always check if the most recent session is empty and reuse it
-        const mostRecentEmpty = sessionsList.length > 0 &&
-          (!sessionsList[0].messages || sessionsList[0].messages.length === 0);
+        setNextCursor(data.next_cursor || null);
 
         // Priority 1: URL param
         const urlSessionId = searchParams.get('session_id');
@@ -117,7 +133,7 @@ export function useChatSessions() {
         if (sessionsList.length > 0) {
           const mostRecent = sessionsList[0];
           // If the most recent session has messages, start a fresh VIRTUAL session
-          if (mostRecent.messages && mostRecent.messages.length > 0) {
+          if (mostRecent.message_count > 0) {
             setCurrentSessionId(null);
           } else {
             // If the latest session is actually empty, we can reuse it to reduce clutter
@@ -158,6 +174,8 @@ export function useChatSessions() {
     createSession,
     deleteSession,
     selectSession,
+    hasMoreSessions: Boolean(nextCursor),
+    loadMoreSessions,
     refreshSessions: loadSessions,
     refreshCurrentSession: async () => {
       // Refresh both current session and sessions list (for title update)
@@ -19,6 +19,8 @@ export function ChatPage() {
     createSession,
     deleteSession,
     selectSession,
+    hasMoreSessions,
+    loadMoreSessions,
     refreshSessions,
     refreshCurrentSession,
     loading: sessionsLoading,
@@ -208,6 +210,8 @@ export function ChatPage() {
                 showUpload={showUploadInSidebar}
                 onShowUploadChange={setShowUploadInSidebar}
                 onRenameSession={handleRenameSession}
+                hasMoreSessions={hasMoreSessions}
+                onLoadMoreSessions={loadMoreSessions}
               />
             </div>
 
@@ -18,6 +18,10 @@ export const authService = {
 
   async updateApiKeys(apiKeys) {
     const response = await api.put('/me/api-keys', { api_keys: apiKeys });
+    // The server re-issues the token with the new key version
+    if (response.data?.access_token) {
+      localStorage.setItem('token', response.data.access_token);
+    }
     return response.data;
   }
 };
@@ -6,8 +6,8 @@ export const chatService = {
     return response.data;
   },
 
-  async getSessions() {
-    const response = await api.get('/chat/sessions');
+  async getSessions({ cursor, limit } = {}) {
+    const response = await api.get('/chat/sessions', { params: { cursor, limit } });
     return response.data;
   },
 
@@ -16,6 +16,11 @@ export const chatService = {
     return response.data;
   },
 
+  async getSessionMessages(sessionId, { before, limit } = {}) {
+    const response = await api.get(`/chat/sessions/${sessionId}/messages`, { params: { before, limit } });
+    return response.data;
+  },
+
   async deleteSession(sessionId) {
     const response = await api.delete(`/chat/sessions/${sessionId}`);
     return response.data;
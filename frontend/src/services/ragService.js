@@ -46,6 +46,20 @@ export const ragService = {
     }
   },
 
+  async prefetch(draftText, topK = 5, selectedDocuments = []) {
+    // Speculative retrieval while typing; failures are harmless, the real query retrieves anyway
+    try {
+      const params = new URLSearchParams();
+      if (selectedDocuments && selectedDocuments.length > 0) {
+        selectedDocuments.forEach(doc => params.append('documents', doc));
+      }
+      const url = params.toString() ? `/rag/prefetch?${params.toString()}` : '/rag/prefetch';
+      await api.post(url, { query: draftText, top_k: topK });
+    } catch (error) {
+      console.debug('Prefetch skipped:', error?.message);
+    }
+  },
+
   async indexDocument(document) {
     const response = await api.post("/rag/index", document);
     return response.data;
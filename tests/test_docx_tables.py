@@ -0,0 +1,81 @@
+"""
+Tests for DOCX table extraction: the body XML walk must lay out tables like
+python-docx's `row.cells`, including horizontally and vertically merged cells.
+"""
+import io
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "api"))
+
+from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+
+from service.features.file_processing_service import SpooledUpload, file_processing_service
+
+
+def _reference_markdown(table) -> str:
+    """The table as Markdown built from python-docx `row.cells`."""
+    rows = [[cell.text.strip() for cell in row.cells] for row in table.rows]
+    lines = ["| " + " | ".join(rows[0]) + " |", "| " + " | ".join(["---"] * len(rows[0])) + " |"]
+    lines.extend("| " + " | ".join(cells) + " |" for cells in rows[1:])
+    return "\n" + "\n".join(lines) + "\n"
+
+
+class DocxTableTests(unittest.TestCase):
+
+    def _extract(self, document) -> str:
+        buffer = io.BytesIO()
+        document.save(buffer)
+        return file_processing_service.extract_text("tables.docx", buffer.getvalue())["content"]
+
+    def _table(self, document, rows, cols):
+        table = document.add_table(rows=rows, cols=cols)
+        for row_index, row in enumerate(table.rows):
+            for col_index, cell in enumerate(row.cells):
+                cell.text = f"r{row_index}c{col_index}"
+        return table
+
+    def _assert_matches_reference(self, document):
+        content = self._extract(document)
+        for table in document.tables:
+            self.assertIn(_reference_markdown(table).strip(), content)
+
+    def test_plain_table(self):
+        document = Document()
+        self._table(document, 3, 3)
+        self._assert_matches_reference(document)
+
+    def test_horizontally_merged_cells_repeat_per_column(self):
+        document = Document()
+        table = self._table(document, 3, 4)
+        table.cell(0, 0).merge(table.cell(0, 2))
+        table.cell(1, 1).merge(table.cell(1, 3))
+        self._assert_matches_reference(document)
+        self.assertIn("| r1c0 | r1c1 r1c2 r1c3 | r1c1 r1c2 r1c3 | r1c1 r1c2 r1c3 |", self._extract(document).replace("\n", " "))
+
+    def test_vertically_merged_cells_repeat_in_covered_rows(self):
+        document = Document()
+        table = self._table(document, 4, 3)
+        table.cell(0, 1).merge(table.cell(2, 1))
+        table.cell(1, 0).merge(table.cell(3, 0))
+        self._assert_matches_reference(document)
+
+    def test_block_merge_and_omitted_leading_cell(self):
+        document = Document()
+        table = self._table(document, 4, 4)
+        table.cell(1, 1).merge(table.cell(2, 2))
+        # A row that starts one grid column late (w:gridBefore), as Word allows
+        tr = table.rows[3]._tr
+        tr.remove(tr.tc_lst[0])
+        tr.insert(0, parse_xml(f'<w:trPr {nsdecls("w")}><w:gridBefore w:val="1"/></w:trPr>'))
+        document.add_paragraph("after")
+        content = self._extract(document)
+        self.assertIn(_reference_markdown(table).strip(), content)
+        self.assertTrue(content.rstrip().endswith("after"))
+
+
+if __name__ == "__main__":
+    unittest.main()
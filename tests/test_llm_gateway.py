@@ -0,0 +1,45 @@
+"""
+Tests for the LLM gateway's provider plan: which providers and keys a call
+may use, including failover between Gemini and Groq.
+"""
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "api"))
+
+from service.rag.llm_gateway import llm_gateway, settings
+
+SYSTEM_KEYS = {"groq_api_key": "system-groq", "google_api_key": "system-google"}
+
+
+class LLMGatewayPlanTests(unittest.TestCase):
+
+    def setUp(self):
+        for name, value in SYSTEM_KEYS.items():
+            patch = mock.patch.object(settings, name, value)
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_user_with_only_gemini_key_does_not_fail_over_to_system_groq(self):
+        plan = llm_gateway._plan("gemini-2.5-flash", {"google_api_key": "user-google"}, None, failover=True)
+        self.assertEqual(plan, [("gemini", "gemini-2.5-flash", "user-google")])
+
+    def test_user_keys_fail_over_to_each_other(self):
+        plan = llm_gateway._plan(
+            "gemini-2.5-flash", {"google_api_key": "user-google", "groq_api_key": "user-groq"}, None, failover=True
+        )
+        self.assertEqual([(provider, key) for provider, _, key in plan], [("gemini", "user-google"), ("groq", "user-groq")])
+
+    def test_user_without_keys_fails_over_on_system_keys(self):
+        plan = llm_gateway._plan("gemini-2.5-flash", {"model": "gemini-2.5-flash"}, None, failover=True)
+        self.assertEqual([(provider, key) for provider, _, key in plan], [("gemini", "system-google"), ("groq", "system-groq")])
+
+    def test_primary_provider_falls_back_to_system_key(self):
+        plan = llm_gateway._plan(None, {"google_api_key": "user-google"}, "groq", failover=False)
+        self.assertEqual([(provider, key) for provider, _, key in plan], [("groq", "system-groq")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+"""
+Tests for the streaming text-to-speech WebSocket.
+
+The endpoint runs under a real uvicorn server and is exercised with a
+WebSocket client, so text and audio cross the same ASGI receive/send
+channels as in production. Only authentication and the SarvamAI client
+are replaced.
+"""
+import base64
+import json
+import socket
+import struct
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "api"))
+
+import uvicorn
+from fastapi import FastAPI
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.client import connect
+
+import controller.speech_controller as speech_controller_module
+from routes.speech import router as speech_router
+from service.features.speech_service import SentenceChunker, speech_service
+
+TOKEN = "valid-token"
+USER = {"username": "tester", "api_keys": {"sarvam_api_key": "test-key"}}
+
+
+def _wav(pcm: bytes) -> bytes:
+    header = struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + len(pcm), b'WAVE', b'fmt ', 16, 1, 1, 22050, 44100, 2, 16, b'data', len(pcm)
+    )
+    return header + pcm
+
+
+class FakeTextToSpeech:
+    """Returns the chunk text itself as the PCM data, so the audio can be read back."""
+
+    def __init__(self):
+        self.texts = []
+
+    def convert(self, text, **kwargs):
+        self.texts.append(text)
+        time.sleep(0.01)
+        return SimpleNamespace(audios=[base64.b64encode(_wav(text.encode())).decode()])
+
+
+async def _get_user(token):
+    return USER if token == TOKEN else None
+
+
+class StreamTextToSpeechTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        app = FastAPI()
+        app.include_router(speech_router)
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        cls.url = f"ws://127.0.0.1:{sock.getsockname()[1]}/speech/to-audio/stream"
+        cls.server = uvicorn.Server(uvicorn.Config(app, lifespan="off", log_level="warning"))
+        cls.thread = threading.Thread(target=cls.server.run, kwargs={"sockets": [sock]}, daemon=True)
+        cls.thread.start()
+        deadline = time.monotonic() + 10
+        while not cls.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("uvicorn did not start")
+            time.sleep(0.01)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.should_exit = True
+        cls.thread.join(timeout=10)
+
+    def setUp(self):
+        self.tts = FakeTextToSpeech()
+        client = SimpleNamespace(text_to_speech=self.tts)
+        patches = [
+            mock.patch.object(speech_controller_module, "get_user_from_token", _get_user),
+            mock.patch.object(speech_service, "_get_client", lambda api_key=None: client),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _receive_until_done(self, ws):
+        """Collects audio frames until the closing {"done": true}."""
+        audio = b""
+        while True:
+            message = ws.recv(timeout=10)
+            if isinstance(message, bytes):
+                audio += message
+                continue
+            self.assertEqual(json.loads(message), {"done": True})
+            return audio
+
+    def test_streams_audio_for_every_piece_of_text(self):
+        pieces = []
+        for i in range(40):
+            pieces += [f"Sentence **number** {i} is", f" spoken in order{'.' if i % 2 else '!'} "]
+        chunker = SentenceChunker(speech_service._split_text_into_chunks)
+        expected = [chunk for piece in pieces for chunk in chunker.feed(piece)] + chunker.flush()
+
+        with connect(self.url) as ws:
+            ws.send(json.dumps({"token": TOKEN}))
+            ws.send(json.dumps({"text": pieces[0]}))
+            ws.send(json.dumps({"text": pieces[1]}))
+            # The first sentence is spoken while the rest is still unsent
+            first = ws.recv(timeout=10)
+            self.assertIsInstance(first, bytes)
+            self.assertEqual(first[:4], b"RIFF")
+            self.assertEqual(struct.unpack('<I', first[40:44])[0], 0xFFFFFFFF)
+            for piece in pieces[2:]:
+                ws.send(json.dumps({"text": piece}))
+            ws.send(json.dumps({"done": True}))
+            audio = first + self._receive_until_done(ws)
+
+        self.assertEqual(self.tts.texts, expected)
+        self.assertEqual(audio[44:].decode(), "".join(expected))
+
+    def test_rejects_invalid_token(self):
+        with connect(self.url) as ws:
+            ws.send(json.dumps({"token": "wrong"}))
+            self.assertEqual(json.loads(ws.recv(timeout=10)), {"error": "Could not validate credentials"})
+            with self.assertRaises(ConnectionClosed) as closed:
+                ws.recv(timeout=10)
+        self.assertEqual(closed.exception.rcvd.code, 1008)
+        self.assertEqual(self.tts.texts, [])
+
+    def test_rejects_empty_text(self):
+        with connect(self.url) as ws:
+            ws.send(json.dumps({"token": TOKEN}))
+            ws.send(json.dumps({"text": "  "}))
+            ws.send(json.dumps({"done": True}))
+            self.assertEqual(json.loads(ws.recv(timeout=10)), {"error": "Text cannot be empty"})
+            with self.assertRaises(ConnectionClosed) as closed:
+                ws.recv(timeout=10)
+        self.assertEqual(closed.exception.rcvd.code, 1003)
+
+    def test_rejects_malformed_message(self):
+        with connect(self.url) as ws:
+            ws.send(json.dumps({"token": TOKEN}))
+            ws.send("not json")
+            self.assertIn("error", json.loads(ws.recv(timeout=10)))
+            with self.assertRaises(ConnectionClosed) as closed:
+                ws.recv(timeout=10)
+        self.assertEqual(closed.exception.rcvd.code, 1003)
+
+
+if __name__ == "__main__":
+    unittest.main()